@@ -0,0 +1 @@
+python3 bench/benchmark.py "$@"
\ No newline at end of file
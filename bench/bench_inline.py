@@ -0,0 +1,48 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from textnode import scan_inline, text_to_textnodes_split
+
+words = ["the", "ring", "of", "power", "shire", "elf", "dwarf", "wizard", "mountain", "river"]
+
+def paragraph(length, seed):
+    generator = random.Random(seed)
+    parts = []
+    for index in range(length):
+        word = generator.choice(words)
+        kind = generator.randrange(12)
+        if kind == 0:
+            parts.append(f"**{word}**")
+        elif kind == 1:
+            parts.append(f"*{word}*")
+        elif kind == 2:
+            parts.append(f"`{word}`")
+        elif kind == 3:
+            parts.append(f"[{word}](/{word}/{index})")
+        elif kind == 4:
+            parts.append(f"![{word}](/images/{word}.png)")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the inline scanner with the splitting pipeline")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for length in [100, 1000, 10000]:
+        text = paragraph(length, length)
+        if scan_inline(text) != [node for node in text_to_textnodes_split(text) if node.text != ""]:
+            raise Exception("Inline parsers disagree")
+
+        split = min(timeit.repeat(lambda: text_to_textnodes_split(text), number=1, repeat=args.repeat))
+        scanner = min(timeit.repeat(lambda: scan_inline(text), number=1, repeat=args.repeat))
+        print(f"{length:>6} words   split {split * 1000:9.2f} ms   scanner {scanner * 1000:9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, text_to_textnodes, text_type_text
+
+class DictHTMLNode:
+    # The node classes as they were before __slots__, kept here as the baseline
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, value, tag=None, props=None):
+        super().__init__(tag, value, None, props)
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+def allocated_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodes
+    return after - before
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory used per node")
+    parser.add_argument("--nodes", type=int, default=100000)
+    args = parser.parse_args()
+
+    count = args.nodes
+    # The text is shared so only the node objects themselves are measured
+    text = "All that is gold does not glitter"
+    cases = [
+        ("LeafNode", lambda: [DictLeafNode(text) for _ in range(count)], lambda: [LeafNode(text) for _ in range(count)]),
+        ("ParentNode", lambda: [DictParentNode("p", None) for _ in range(count)], lambda: [ParentNode("p", None) for _ in range(count)]),
+        ("TextNode", lambda: [DictTextNode(text, text_type_text) for _ in range(count)], lambda: [TextNode(text, text_type_text) for _ in range(count)]),
+    ]
+
+    print(f"{'node':<12} {'before':>14} {'after':>14}")
+    for name, before, after in cases:
+        before_bytes = allocated_bytes(before) / count
+        after_bytes = allocated_bytes(after) / count
+        print(f"{name:<12} {before_bytes:>8.1f} B/node {after_bytes:>8.1f} B/node")
+
+    paragraph = "Some **bold** and *italic* text with a [link](/somewhere) " * 200
+    page_bytes = allocated_bytes(lambda: [node.to_html_node() for node in text_to_textnodes(paragraph)])
+    print(f"Inline nodes for a {len(paragraph)} character paragraph: {page_bytes / 1024:.1f} KiB")
+
+if __name__ == "__main__":
+    main()
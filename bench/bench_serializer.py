@@ -0,0 +1,72 @@
+import argparse
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from htmlnode import LeafNode, ParentNode, write_html
+
+def concatenating_to_html(node):
+    # The serializer ParentNode.to_html used before write_html existed, kept
+    # here as the baseline
+    if isinstance(node, LeafNode):
+        return node.to_html()
+
+    result = f"<{node.tag}{node.props_to_html()}>"
+    for child in node.children:
+        result += concatenating_to_html(child)
+    result += f"</{node.tag}>"
+    return result
+
+def wide_document(paragraphs):
+    children = []
+    for index in range(paragraphs):
+        children.append(ParentNode("p", [
+            LeafNode(f"Paragraph {index} with "),
+            LeafNode("bold", "b"),
+            LeafNode(" and a "),
+            LeafNode("link", "a", {"href": f"/page/{index}"}),
+        ]))
+    return ParentNode("div", children)
+
+def deep_document(depth):
+    node = LeafNode("leaf")
+    for _ in range(depth):
+        node = ParentNode("div", [LeafNode("text " * 50, "p"), node, LeafNode("text " * 50, "p")])
+    return node
+
+def measure(label, function, repeat):
+    seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+    print(f"{label:<40} {seconds * 1000:10.2f} ms")
+    return seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML serializers on large documents")
+    parser.add_argument("--paragraphs", type=int, default=50000)
+    parser.add_argument("--depth", type=int, default=800)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    wide = wide_document(args.paragraphs)
+    deep = deep_document(args.depth)
+    if concatenating_to_html(wide) != wide.to_html():
+        raise Exception("Serializers disagree")
+
+    print(f"Wide document: {args.paragraphs} paragraphs")
+    measure("concatenating to_html", lambda: concatenating_to_html(wide), args.repeat)
+    measure("to_html", lambda: wide.to_html(), args.repeat)
+    measure("write_html to StringIO", lambda: write_html(wide, io.StringIO()), args.repeat)
+    measure("write_html to BytesIO (utf-8)", lambda: write_html(wide, io.BytesIO(), "utf-8"), args.repeat)
+
+    print(f"Deep document: {args.depth} levels")
+    try:
+        measure("concatenating to_html", lambda: concatenating_to_html(deep), args.repeat)
+    except RecursionError:
+        print(f"{'concatenating to_html':<40} RecursionError")
+    measure("to_html", lambda: deep.to_html(), args.repeat)
+    measure("write_html to StringIO", lambda: write_html(deep, io.StringIO()), args.repeat)
+
+if __name__ == "__main__":
+    main()
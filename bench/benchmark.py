@@ -0,0 +1,159 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import generate_corpus, parse_mix, default_mix
+from markdown_parser import (
+    scan_blocks,
+    block_to_block_type,
+    markdown_to_html_node,
+    block_type_header,
+    block_type_unordered_list,
+    block_type_ordered_list,
+    block_type_code,
+)
+from textnode import text_to_textnodes
+from template import Template
+from main import generate_pages
+
+template_source = "<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def read_all(paths):
+    documents = []
+    for path in paths:
+        with open(path) as file:
+            documents.append(file.read())
+    return documents
+
+def write_all(directory, outputs):
+    for index, output in enumerate(outputs):
+        with open(os.path.join(directory, f"{index}.html"), "w") as file:
+            file.write(output)
+
+def inline_texts(documents):
+    texts = []
+    for document in documents:
+        for block_type, content, _, _ in scan_blocks(document.split("\n")):
+            if block_type == block_type_code:
+                continue
+            if block_type == block_type_header:
+                texts.append(content[1])
+            elif block_type == block_type_unordered_list or block_type == block_type_ordered_list:
+                texts.extend(content)
+            else:
+                texts.append(content)
+    return texts
+
+def run_stages(paths, directory, repeat):
+    documents = read_all(paths)
+    raw_blocks = [block[3] for document in documents for block in scan_blocks(document.split("\n"))]
+    texts = inline_texts(documents)
+    nodes = [markdown_to_html_node(document) for document in documents]
+    bodies = [node.to_html() for node in nodes]
+    template = Template(template_source)
+    pages = [template.render({"title": "Title", "content": body}) for body in bodies]
+
+    output_directory = os.path.join(directory, "output")
+    os.mkdir(output_directory)
+    template_path = os.path.join(directory, "template.html")
+    with open(template_path, "w") as file:
+        file.write(template_source)
+
+    def build():
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(os.path.join(directory, "content"), template_path, os.path.join(directory, "public"))
+
+    return {
+        "read": best_time(lambda: read_all(paths), repeat),
+        "scan_blocks": best_time(lambda: [list(scan_blocks(document.split("\n"))) for document in documents], repeat),
+        "block_to_block_type": best_time(lambda: [block_to_block_type(block) for block in raw_blocks], repeat),
+        "text_to_textnodes": best_time(lambda: [text_to_textnodes(text) for text in texts], repeat),
+        "parse_markdown": best_time(lambda: [markdown_to_html_node(document) for document in documents], repeat),
+        "to_html": best_time(lambda: [node.to_html() for node in nodes], repeat),
+        "template": best_time(lambda: [template.render({"title": "Title", "content": body}) for body in bodies], repeat),
+        "write": best_time(lambda: write_all(output_directory, pages), repeat),
+        "generate_pages": best_time(build, repeat),
+    }
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'stage':<24} {'baseline':>12} {'current':>12} {'change':>9}")
+    for stage, seconds in results["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous is None or previous == 0:
+            print(f"{stage:<24} {'-':>12} {seconds * 1000:>10.2f}ms")
+            continue
+        change = seconds / previous - 1
+        print(f"{stage:<24} {previous * 1000:>10.2f}ms {seconds * 1000:>10.2f}ms {change * 100:>+8.1f}%")
+        if change > threshold:
+            regressions.append(stage)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every stage of the generator on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200, help="number of pages in the corpus")
+    parser.add_argument("--blocks", type=int, default=40, help="number of blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=default_mix, help="block type weights, e.g. paragraph=6,code=1")
+    parser.add_argument("--depth", type=int, default=2, help="maximum directory nesting of the content tree")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the corpus generator")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage; the fastest is reported")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="fail when a stage is this much slower than the baseline (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(os.path.join(directory, "content"), args.pages, args.blocks, args.mix, args.depth, args.seed)
+        stages = run_stages(paths, directory, args.repeat)
+
+    results = {
+        "corpus": {
+            "pages": args.pages,
+            "blocks": args.blocks,
+            "mix": args.mix,
+            "depth": args.depth,
+            "seed": args.seed,
+        },
+        "python": platform.python_version(),
+        "stages": stages,
+    }
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline is None:
+        for stage, seconds in stages.items():
+            print(f"{stage:<24} {seconds * 1000:>10.2f}ms")
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("corpus") != results["corpus"]:
+        print("Warning: the baseline was measured on a different corpus")
+
+    regressions = compare(results, baseline, args.threshold)
+    if len(regressions) > 0:
+        print(f"Regression over {args.threshold * 100:.0f}% in: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
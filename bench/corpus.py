@@ -0,0 +1,84 @@
+import os
+import random
+
+words = [
+    "ring", "shire", "hobbit", "wizard", "elf", "dwarf", "mountain", "river",
+    "forest", "tower", "sword", "journey", "fellowship", "shadow", "light",
+    "king", "road", "council", "map", "lore",
+]
+
+default_mix = {
+    "paragraph": 6,
+    "header": 2,
+    "code": 1,
+    "unordered_list": 1,
+    "ordered_list": 1,
+    "quote": 1,
+}
+
+def parse_mix(text):
+    # "paragraph=6,code=1" -> {"paragraph": 6, "code": 1}
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in default_mix:
+            raise ValueError(f"Invalid block type in mix: {name}")
+        mix[name.strip()] = int(weight)
+    return mix
+
+def inline_text(generator, word_count):
+    parts = []
+    for index in range(word_count):
+        word = generator.choice(words)
+        kind = generator.randrange(20)
+        if kind == 0:
+            parts.append(f"**{word}**")
+        elif kind == 1:
+            parts.append(f"*{word}*")
+        elif kind == 2:
+            parts.append(f"`{word}`")
+        elif kind == 3:
+            parts.append(f"[{word}](/{word}/{index})")
+        elif kind == 4:
+            parts.append(f"![{word}](/images/{word}.png)")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+def generate_block(generator, block_type):
+    if block_type == "header":
+        return "#" * generator.randint(2, 6) + " " + inline_text(generator, generator.randint(2, 8))
+    if block_type == "code":
+        lines = [f"let {generator.choice(words)} = {index};" for index in range(generator.randint(2, 12))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if block_type == "unordered_list":
+        return "\n".join([f"* {inline_text(generator, generator.randint(3, 12))}" for _ in range(generator.randint(2, 8))])
+    if block_type == "ordered_list":
+        return "\n".join([f"{index + 1}. {inline_text(generator, generator.randint(3, 12))}" for index in range(generator.randint(2, 8))])
+    if block_type == "quote":
+        return "\n".join([f"> {inline_text(generator, generator.randint(5, 15))}" for _ in range(generator.randint(1, 4))])
+    return inline_text(generator, generator.randint(20, 120))
+
+def generate_markdown(generator, blocks, mix):
+    names = list(mix.keys())
+    weights = [mix[name] for name in names]
+    parts = [f"# {inline_text(generator, 4)}"]
+    for block_type in generator.choices(names, weights, k=blocks):
+        parts.append(generate_block(generator, block_type))
+    return "\n\n".join(parts)
+
+def generate_corpus(directory, pages, blocks, mix=None, depth=2, seed=0):
+    # Writes the same tree for the same arguments: pages are spread over
+    # directories nested up to depth levels, with an index page in each
+    generator = random.Random(seed)
+    mix = mix if mix is not None else default_mix
+    paths = []
+    for index in range(pages):
+        parts = [f"section{generator.randrange(4)}" for _ in range(generator.randint(0, depth))]
+        name = "index.md" if index == 0 else f"page{index}.md"
+        path = os.path.join(directory, *parts, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(generate_markdown(generator, blocks, mix))
+        paths.append(path)
+    return paths
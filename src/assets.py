@@ -0,0 +1,121 @@
+import json
+import os
+import re
+from urllib.parse import urlsplit
+from manifest import hash_bytes, hash_file
+from sync import copy_file, replace_if_changed, remove_empty_directories
+from compress import remove_compressed
+
+fingerprint_length = 8
+asset_manifest_name = "asset-manifest.json"
+url_attribute_pattern = re.compile(r"""(\b(?:src|href)=)(["'])([^"']*)\2""")
+
+# Site-absolute URL of each fingerprinted static file mapped to its
+# fingerprinted URL and source file. Set with set_asset_urls(); the version
+# changes whenever the mapping does and is part of every cache key for HTML
+# that went through it
+asset_urls = {}
+asset_version = ""
+
+def set_asset_urls(urls):
+    global asset_urls, asset_version
+    asset_urls = urls
+    asset_version = hash_bytes(json.dumps(urls, sort_keys=True).encode()) if len(urls) > 0 else ""
+
+def fingerprinted_name(name, digest):
+    root, extension = os.path.splitext(name)
+    return f"{root}.{digest[:fingerprint_length]}{extension}"
+
+def asset_url(path, root):
+    return "/" + os.path.relpath(path, root).replace(os.sep, "/")
+
+def rewrite_url(url):
+    # Returns the fingerprinted URL and the asset's source file, or the URL
+    # unchanged and None. Query strings and fragments are kept
+    if len(asset_urls) == 0 or not url.startswith("/"):
+        return url, None
+    parts = urlsplit(url)
+    if parts.netloc != "":
+        return url, None
+    asset = asset_urls.get(parts.path)
+    if asset is None:
+        return url, None
+    return asset[0] + url[len(parts.path):], asset[1]
+
+def rewrite_html_urls(html):
+    # Rewrites src and href attributes in HTML text, returning the new text
+    # and the source files of the assets it points at
+    if len(asset_urls) == 0:
+        return html, []
+
+    sources = []
+    def replace(match):
+        url, source = rewrite_url(match.group(3))
+        if source is None:
+            return match.group(0)
+        sources.append(source)
+        return f"{match.group(1)}{match.group(2)}{url}{match.group(2)}"
+
+    html = url_attribute_pattern.sub(replace, html)
+    return html, list(dict.fromkeys(sources))
+
+def is_fingerprinted(path):
+    return not path.endswith(".html") and not path.endswith(".gz")
+
+def fingerprint_assets(source_path, destination_path, manifest, enabled=True):
+    # Writes a copy of every file synced from source_path under a name that
+    # includes a hash of its content, next to the plain copy, and returns the
+    # URL mapping. Hashes are kept in the build manifest by mtime and size so
+    # unchanged files aren't read again. Copies whose content changed or
+    # whose source is gone are removed, as is everything when disabled
+    source_prefix = os.path.join(source_path, "")
+    fingerprints = {}
+    urls = {}
+    if enabled:
+        for destination_file_path, source_file_path in sorted(manifest.assets.items()):
+            if not source_file_path.startswith(source_prefix) or not is_fingerprinted(destination_file_path):
+                continue
+            if not os.path.isfile(source_file_path):
+                continue
+
+            stat = os.stat(source_file_path)
+            previous = manifest.fingerprints.get(source_file_path)
+            if previous is not None and previous[0] == stat.st_mtime_ns and previous[1] == stat.st_size:
+                digest = previous[2]
+            else:
+                digest = hash_file(source_file_path)
+
+            directory, name = os.path.split(destination_file_path)
+            fingerprinted_path = os.path.join(directory, fingerprinted_name(name, digest))
+            if not os.path.exists(fingerprinted_path):
+                print(f"Copying file: {fingerprinted_path}")
+                copy_file(source_file_path, fingerprinted_path)
+
+            fingerprints[source_file_path] = [stat.st_mtime_ns, stat.st_size, digest, fingerprinted_path]
+            urls[asset_url(destination_file_path, destination_path)] = (asset_url(fingerprinted_path, destination_path), source_file_path)
+
+    for source_file_path, previous in manifest.fingerprints.items():
+        current = fingerprints.get(source_file_path)
+        if current is not None and current[3] == previous[3]:
+            continue
+        if os.path.exists(previous[3]):
+            print(f"Removing file: {previous[3]}")
+            os.remove(previous[3])
+        remove_compressed(previous[3])
+        remove_empty_directories(os.path.dirname(previous[3]), destination_path)
+    manifest.fingerprints = fingerprints
+
+    write_asset_manifest(destination_path, urls)
+    return urls
+
+def write_asset_manifest(destination_path, urls):
+    path = os.path.join(destination_path, asset_manifest_name)
+    if len(urls) == 0:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as manifest_file:
+        json.dump(dict([(url, asset[0]) for url, asset in urls.items()]), manifest_file, indent=1, sort_keys=True)
+    replace_if_changed(temporary_path, path)
@@ -0,0 +1,32 @@
+import os
+import sys
+import daemon
+
+# Usage: client.py [flags of main.py] [-- changed paths]
+#
+# Sends the build to the daemon started with `main.py --daemon` when one is
+# listening, which keeps its caches warm between builds, and otherwise runs
+# it in this process. Only imports what talking to the daemon needs, so a
+# warm build doesn't pay for loading the generator
+
+def split_arguments(arguments):
+    if "--" not in arguments:
+        return arguments, []
+    index = arguments.index("--")
+    return arguments[:index], [os.path.abspath(path) for path in arguments[index + 1:]]
+
+def main():
+    argv, paths = split_arguments(sys.argv[1:])
+    if not any([argument.split("=")[0] in daemon.local_flags for argument in argv]):
+        status = daemon.request(daemon.socket_path, argv, paths, sys.stdout)
+        if status is not None:
+            return status
+
+    # Without a daemon the changed paths don't matter: an incremental build
+    # finds them through the build manifest
+    import main as generator
+    generator.main(argv)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
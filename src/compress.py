@@ -0,0 +1,78 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+compressible_extensions = {
+    ".html", ".htm", ".css", ".js", ".mjs", ".json", ".map", ".xml", ".svg",
+    ".txt", ".md", ".csv", ".ico", ".wasm", ".ttf", ".otf",
+}
+# Files smaller than this, or that don't shrink below this ratio, are served
+# uncompressed
+min_size = 256
+max_ratio = 0.9
+
+# Set with set_precompress(); when off, stale .gz siblings are removed
+precompress = False
+
+compressed_written = "written"
+compressed_current = "current"
+compressed_skipped = "skipped"
+compressed_not_worth = "not worth it"
+
+def set_precompress(value):
+    global precompress
+    precompress = value
+
+def compressed_path(path):
+    return f"{path}.gz"
+
+def is_compressible(path):
+    return os.path.splitext(path)[1].lower() in compressible_extensions
+
+def remove_compressed(path):
+    try:
+        os.remove(compressed_path(path))
+    except FileNotFoundError:
+        pass
+
+def update_compressed(path):
+    # Writes path.gz next to path. The .gz gets the mtime of the file it was
+    # made from, so it is only made again once the file has been rewritten
+    if not precompress or not is_compressible(path):
+        remove_compressed(path)
+        return compressed_skipped
+
+    stat = os.stat(path)
+    if stat.st_size < min_size:
+        remove_compressed(path)
+        return compressed_not_worth
+
+    gzip_path = compressed_path(path)
+    try:
+        if os.stat(gzip_path).st_mtime_ns == stat.st_mtime_ns:
+            return compressed_current
+    except FileNotFoundError:
+        pass
+
+    with open(path, "rb") as file:
+        data = file.read()
+    # mtime=0 keeps the output the same for the same input
+    compressed = gzip.compress(data, 9, mtime=0)
+    if len(compressed) > len(data) * max_ratio:
+        remove_compressed(path)
+        return compressed_not_worth
+
+    temporary_path = f"{gzip_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as gzip_file:
+        gzip_file.write(compressed)
+    os.utime(temporary_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temporary_path, gzip_path)
+    return compressed_written
+
+def update_compressed_files(paths, jobs):
+    # zlib releases the GIL, so threads compress in parallel
+    paths = list(paths)
+    if jobs <= 1 or len(paths) <= 1:
+        return [update_compressed(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(update_compressed, paths))
@@ -0,0 +1,31 @@
+import os
+
+entry_type_page = "page"
+entry_type_asset = "asset"
+
+def page_route(relative_path):
+    # "index.md" -> "", "blog/index.md" -> "blog", "blog/post.md" -> "blog/post"
+    directory, file = os.path.split(relative_path)
+    if file == "index.md":
+        return directory
+    return os.path.join(directory, file[:-len(".md")])
+
+def walk_content(source_path, relative_path=""):
+    # Lazily yields (entry_type, source file path, route) for every page and
+    # asset under source_path, one directory listing at a time. Pages are
+    # routed to directories; assets keep their path relative to the root
+    directory = os.path.join(source_path, relative_path) if relative_path != "" else source_path
+    with os.scandir(directory) as scanned:
+        entries = sorted(scanned, key=lambda entry: entry.name)
+
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+
+        entry_relative_path = os.path.join(relative_path, entry.name)
+        if entry.is_dir():
+            yield from walk_content(source_path, entry_relative_path)
+        elif entry.name.endswith(".md"):
+            yield entry_type_page, entry.path, page_route(entry_relative_path)
+        else:
+            yield entry_type_asset, entry.path, entry_relative_path
@@ -0,0 +1,118 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import traceback
+
+socket_path = "./.cache/daemon.sock"
+
+# Flags that need a terminal or directories of their own, so the client runs
+# them in a process of their own instead of sending them to the daemon
+local_flags = ["--daemon", "--watch", "--shard", "--merge"]
+
+def send(connection, message):
+    connection.sendall((json.dumps(message) + "\n").encode())
+
+def read_messages(connection):
+    buffer = b""
+    while True:
+        chunk = connection.recv(1 << 16)
+        if chunk == b"":
+            return
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            yield json.loads(line)
+
+class ConnectionWriter(io.TextIOBase):
+    # Sends everything printed during a build to the client as it happens.
+    # A client that went away doesn't stop the build
+    def __init__(self, connection):
+        self.connection = connection
+        self.connected = True
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self.connected and text != "":
+            try:
+                send(self.connection, {"output": text})
+            except OSError:
+                self.connected = False
+        return len(text)
+
+def is_listening(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+        return True
+    except OSError:
+        return False
+
+def answer(connection, handle):
+    request = next(read_messages(connection), None)
+    if request is None:
+        return
+    writer = ConnectionWriter(connection)
+    status = 0
+    with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+        try:
+            handle(request["argv"], request["paths"])
+        except SystemExit as error:
+            # argparse exits on --help and on bad arguments
+            status = error.code if isinstance(error.code, int) else 0 if error.code is None else 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    if writer.connected:
+        try:
+            send(connection, {"status": status})
+        except OSError:
+            pass
+
+def serve(path, handle):
+    # Calls handle(argv, paths) for every request, one at a time so builds
+    # never overlap, until interrupted
+    if os.path.exists(path):
+        if is_listening(path):
+            raise Exception(f"A daemon is already listening on {path}")
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(path)
+        server.listen()
+        print(f"Listening on {path}")
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                answer(connection, handle)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.remove(path)
+
+def request(path, argv, paths, stream):
+    # Sends a build request and copies its output to stream. Returns the
+    # build's exit status, or None when no daemon is listening
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        connection.close()
+        return None
+
+    with connection:
+        send(connection, {"argv": argv, "paths": paths})
+        for message in read_messages(connection):
+            if "output" in message:
+                stream.write(message["output"])
+                stream.flush()
+            elif "status" in message:
+                return message["status"]
+    return 1
@@ -0,0 +1,88 @@
+import os
+import threading
+from functools import partial
+from urllib.parse import urlsplit
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+reload_path = "/__livereload"
+reload_script = (
+    f"<script>new EventSource(\"{reload_path}\").onmessage = function () {{ location.reload(); }};</script>"
+)
+
+class LiveReload:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+def inject_reload_script(html):
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + reload_script.encode()
+    return html[:index] + reload_script.encode() + html[index:]
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, live_reload=None, **kwargs):
+        self.live_reload = live_reload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        request_path = urlsplit(self.path).path
+        if request_path == reload_path:
+            self.send_events()
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and request_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+
+        # Pages are served with the reload script added on the fly so the
+        # files in the output directory stay exactly as they are deployed
+        with open(path, "rb") as html_file:
+            body = inject_reload_script(html_file.read())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        generation = self.live_reload.generation
+        try:
+            while True:
+                current = self.live_reload.wait(generation, 15)
+                if current == generation:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    self.wfile.write(b"data: reload\n\n")
+                    generation = current
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+def start_server(directory, port, live_reload):
+    handler = partial(LiveReloadHandler, directory=directory, live_reload=live_reload)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {directory} at http://localhost:{port}")
+    return server
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+class FragmentMemo:
+    # Rendered blocks recently seen, keyed by (block type, block text, ...)
+    # and bounded by the total length of block texts and HTML. A fragment is
+    # a tuple whose first item is the HTML. Blocks shorter than min_length are
+    # cheaper to parse again than to look up
+    def __init__(self, max_size, min_length=64):
+        self.max_size = max_size
+        self.min_length = min_length
+        self.fragments = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.fragments.move_to_end(key)
+        self.hits += 1
+        return fragment
+
+    def put(self, key, fragment):
+        size = len(key[1]) + len(fragment[0])
+        if size > self.max_size or key in self.fragments:
+            return
+
+        self.fragments[key] = fragment
+        self.size += size
+        while self.size > self.max_size:
+            evicted_key, evicted_fragment = self.fragments.popitem(last=False)
+            self.size -= len(evicted_key[1]) + len(evicted_fragment[0])
+            self.evictions += 1
+
+    def take_stats(self):
+        # Hands the counters over, e.g. from a worker back to the parent
+        stats = (self.hits, self.misses, self.evictions)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return stats
+
+    def add_stats(self, stats):
+        self.hits += stats[0]
+        self.misses += stats[1]
+        self.evictions += stats[2]
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups > 0 else 0
+        return f"Block memo: {self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate), {self.evictions} evictions"
@@ -0,0 +1,63 @@
+import itertools
+
+front_matter_delimiter = "---"
+
+def read_front_matter(lines):
+    # Reads the front matter from an iterator of lines, such as an open file,
+    # and returns it with an iterator over the rest of the lines and the
+    # line number the rest starts at
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return {}, iter(()), 1
+    if first_line.strip() != front_matter_delimiter:
+        return {}, itertools.chain([first_line], lines), 1
+
+    # A YAML subset: "key: value" pairs, values optionally quoted, lists
+    # written inline as [a, b] or as "- item" lines under an empty key, and
+    # # comments
+    metadata = {}
+    list_key = None
+    for line_number, line in enumerate(lines, 2):
+        line = line.strip()
+        if line == front_matter_delimiter:
+            return metadata, lines, line_number + 1
+        if line == "" or line.startswith("#"):
+            continue
+
+        if line.startswith("- ") or line == "-":
+            if list_key is None:
+                raise Exception(f"Invalid front matter line: {line}")
+            if metadata[list_key] == "":
+                metadata[list_key] = []
+            metadata[list_key].append(unquote(line[1:].strip()))
+            continue
+
+        key, separator, value = line.partition(":")
+        if separator == "":
+            raise Exception(f"Invalid front matter line: {line}")
+        key = key.strip().lower()
+        metadata[key] = parse_value(value.strip())
+        list_key = key if metadata[key] == "" else None
+
+    raise Exception("Invalid front matter: missing closing ---")
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+def parse_value(value):
+    if value.startswith("[") and value.endswith("]"):
+        return [unquote(item.strip()) for item in value[1:-1].split(",") if item.strip() != ""]
+    return unquote(value)
+
+def template_value(value):
+    # Lists are written into templates comma separated
+    if isinstance(value, list):
+        return ", ".join(value)
+    return value
+
+def split_front_matter(markdown):
+    metadata, lines, _ = read_front_matter(markdown.split("\n"))
+    return metadata, "\n".join(lines)
@@ -1,4 +1,10 @@
+import profiler
+
 class HTMLNode:
+    # Pages produce a very large number of nodes, so they carry no __dict__;
+    # props is None rather than an empty dict when a node has no attributes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -24,14 +30,16 @@ class HTMLNode:
         if self.props is None:
             return ""
 
-        result = ""
-        for prop, value in self.props.items():
-            result += f" {prop}=\"{value}\""
-        return result
+        return "".join([f" {prop}=\"{value}\"" for prop, value in self.props.items()])
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, value, tag=None, props=None):
-        super().__init__(tag, value, None, props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
     def to_html(self):
         if self.value is None:
@@ -41,17 +49,61 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
-    def to_html(self):
+    def validate(self):
         if self.tag is None:
             raise ValueError("Invalid parent node tag")
         if self.children is None or len(self.children) == 0:
             raise ValueError("Parent node has no children")
-        
-        result = f"<{self.tag}{self.props_to_html()}>"
-        for child in self.children:
-            result += child.to_html()
-        result += f"</{self.tag}>"
-        return result
\ No newline at end of file
+
+    def to_html(self):
+        with profiler.span("to_html"):
+            return "".join(html_chunks(self))
+
+def html_chunks(node, chunk_pieces=4096):
+    # Walks the tree with an explicit stack of child iterators so deeply nested
+    # documents can't hit the recursion limit, and joins the output into
+    # chunks so nothing is copied more than twice however large it gets
+    if not isinstance(node, ParentNode):
+        yield node.to_html()
+        return
+
+    node.validate()
+    pieces = [f"<{node.tag}{node.props_to_html()}>"]
+    stack = [(iter(node.children), f"</{node.tag}>")]
+    while len(stack) > 0:
+        children, closing_tag = stack[-1]
+        for child in children:
+            if type(child) is LeafNode:
+                pieces.append(child.to_html())
+            elif isinstance(child, ParentNode):
+                child.validate()
+                pieces.append(f"<{child.tag}{child.props_to_html()}>")
+                stack.append((iter(child.children), f"</{child.tag}>"))
+                break
+            else:
+                pieces.append(child.to_html())
+        else:
+            pieces.append(closing_tag)
+            stack.pop()
+
+        if len(pieces) >= chunk_pieces:
+            yield "".join(pieces)
+            pieces = []
+
+    yield "".join(pieces)
+
+def write_html(node, stream, encoding=None):
+    with profiler.span("to_html"):
+        for chunk in html_chunks(node):
+            if encoding is None:
+                stream.write(chunk)
+            else:
+                stream.write(chunk.encode(encoding))
@@ -0,0 +1,97 @@
+import os
+import struct
+
+png_signature = b"\x89PNG\r\n\x1a\n"
+# JPEG start of frame markers, the segments that hold the image size
+jpeg_frame_markers = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# JPEG markers that stand alone, without a length
+jpeg_standalone_markers = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+def png_size(header):
+    if len(header) < 24 or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+def gif_size(header):
+    if len(header) < 10:
+        return None
+    return struct.unpack("<HH", header[6:10])
+
+def webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and len(header) >= 30:
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(header) >= 25:
+        bits = struct.unpack("<I", header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(header) >= 30:
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+def jpeg_size(image_file):
+    # Walks the segments from the start of the file, seeking over their
+    # contents, until the frame header
+    image_file.seek(2)
+    while True:
+        byte = image_file.read(1)
+        if byte == b"":
+            return None
+        if byte != b"\xff":
+            continue
+        marker = image_file.read(1)
+        while marker == b"\xff":
+            marker = image_file.read(1)
+        if marker == b"" or marker[0] == 0xD9:
+            return None
+        if marker[0] in jpeg_standalone_markers:
+            continue
+
+        length_bytes = image_file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker[0] in jpeg_frame_markers:
+            frame = image_file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        image_file.seek(length - 2, os.SEEK_CUR)
+
+def read_image_size(path):
+    # Returns (width, height) from the file's header, without decoding any
+    # pixels, or None for other formats and damaged files
+    try:
+        with open(path, "rb") as image_file:
+            header = image_file.read(32)
+            if header.startswith(png_signature):
+                return png_size(header)
+            if header[:6] in (b"GIF87a", b"GIF89a"):
+                return gif_size(header)
+            if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+                return webp_size(header)
+            if header[:2] == b"\xff\xd8":
+                return jpeg_size(image_file)
+    except (OSError, struct.error):
+        return None
+    return None
+
+image_sizes = {}
+
+def image_size(path):
+    # Sizes are kept per process for as long as the file is unchanged
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = image_sizes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    size = read_image_size(path)
+    image_sizes[path] = (signature, size)
+    return size
@@ -0,0 +1,56 @@
+from urllib.parse import urlsplit, urljoin, unquote
+from assets import asset_url
+
+def link_path(url, page_url):
+    # The site path an internal link points at, resolved against the page's
+    # URL, or None for links to other sites and to the page itself
+    parts = urlsplit(url)
+    if parts.scheme != "" or parts.netloc != "" or parts.path == "":
+        return None
+    return unquote(urljoin(page_url, parts.path))
+
+def page_url(output_path, destination_path):
+    url = asset_url(output_path, destination_path)
+    return url[:-len("index.html")] if url.endswith("/index.html") else url
+
+class LinkIndex:
+    # The site path of every generated page and copied file, so each link
+    # is checked with a set lookup
+    def __init__(self):
+        self.paths = set()
+
+    def add_page(self, url):
+        self.paths.add(url)
+        self.paths.add(url + "index.html")
+
+    def add_file(self, url):
+        self.paths.add(url)
+
+    def exists(self, path):
+        # Pages can be linked with or without their trailing slash
+        return path in self.paths or path + "/" in self.paths
+
+def build_index(manifest, destination_path):
+    index = LinkIndex()
+    for entry in manifest.pages.values():
+        for output_path in [entry["output"]] + entry.get("listing", []):
+            index.add_page(page_url(output_path, destination_path))
+    for output_path in manifest.assets:
+        index.add_file(asset_url(output_path, destination_path))
+    for fingerprint in manifest.fingerprints.values():
+        index.add_file(asset_url(fingerprint[3], destination_path))
+    return index
+
+def broken_links(manifest, destination_path):
+    # Returns (file, line, url) for every link of every page, changed or
+    # not, that points at a page or file the build didn't produce. Links
+    # from a partial are reported once in the partial, at its own line
+    index = build_index(manifest, destination_path)
+    broken = set()
+    for source_path, entry in manifest.pages.items():
+        url = page_url(entry["output"], destination_path)
+        for link in entry.get("links", []):
+            path = link_path(link[0], url)
+            if path is not None and not index.exists(path):
+                broken.add((link[2] if len(link) > 2 else source_path, link[1], link[0]))
+    return sorted(broken)
@@ -0,0 +1,183 @@
+import os
+import re
+from front_matter import read_front_matter
+from markdown_parser import first_title
+from content import walk_content, page_route, entry_type_page
+from htmlnode import LeafNode, ParentNode
+from page_index import PageIndex
+
+listing_page_size = 10
+slug_pattern = re.compile(r"[^\w]+")
+
+def read_header(path):
+    # The front matter and title of a page, reading no further than the
+    # closing --- or, when the front matter has no title, the first h1.
+    # A page whose front matter can't be read gets none; its own build
+    # reports the error
+    with open(path) as markdown_file:
+        try:
+            metadata, lines, _ = read_front_matter(markdown_file)
+        except Exception:
+            return {}, None
+        title = metadata.get("title")
+        if title is None:
+            title = first_title(line.rstrip("\n") for line in lines)
+    return metadata, title
+
+def route_url(route):
+    if route == "":
+        return "/"
+    return "/" + route.replace(os.sep, "/") + "/"
+
+def slug(text):
+    # Groups named only with punctuation still get a directory of their own
+    return slug_pattern.sub("-", text.lower()).strip("-") or "-"
+
+class MetadataIndex(PageIndex):
+    # The front matter and title of every page by source file, kept in the
+    # build cache with the mtime and size they were read at, so listings are
+    # built without parsing page bodies and unchanged pages aren't read again
+    description = "metadata index"
+
+    def read(self, source_file_path, route):
+        stat = os.stat(source_file_path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        entry = self.pages.get(source_file_path)
+        if entry is not None and entry["signature"] == signature and entry["route"] == route:
+            return
+        metadata, title = read_header(source_file_path)
+        self.pages[source_file_path] = {"signature": signature, "route": route, "metadata": metadata, "title": title}
+
+    def update(self, source_path):
+        # Brings every page under source_path up to date
+        seen = set()
+        for entry_type, source_file_path, route in walk_content(source_path):
+            if entry_type == entry_type_page:
+                seen.add(source_file_path)
+                self.read(source_file_path, route)
+        for stale_source in [source for source in self.pages if source not in seen]:
+            del self.pages[stale_source]
+
+    def refresh(self, source_file_path, source_path):
+        # Brings one page up to date, such as one the watcher reported
+        if not os.path.exists(source_file_path):
+            self.pages.pop(source_file_path, None)
+            return
+        self.read(source_file_path, page_route(os.path.relpath(source_file_path, source_path)))
+
+    def listing_sources(self):
+        return sorted([source for source, entry in self.pages.items() if "collection" in entry["metadata"]])
+
+    def listing(self, source_file_path, source_path):
+        # The listing of a page whose front matter names a collection, or
+        # None for other pages
+        entry = self.pages.get(source_file_path)
+        if entry is None or "collection" not in entry["metadata"]:
+            return None
+        return build_listing(self.collection(entry["metadata"]["collection"], source_path), entry["metadata"], entry["route"])
+
+    def collection(self, name, source_path):
+        # The pages under the content directory name, newest first and then
+        # by title. Listing pages and pages without a title are left out
+        directory = os.path.normpath(os.path.join(source_path, str(name).strip("/")))
+        prefix = os.path.join(directory, "") if directory != os.path.normpath(source_path) else ""
+        entries = []
+        for source, entry in self.pages.items():
+            if prefix != "" and not os.path.normpath(source).startswith(prefix):
+                continue
+            if "collection" in entry["metadata"] or entry["title"] is None:
+                continue
+            entries.append(entry)
+        entries.sort(key=lambda entry: entry["title"])
+        entries.sort(key=lambda entry: str(entry["metadata"].get("date", "")), reverse=True)
+        return entries
+
+def group_values(entry, key):
+    # The groups a page belongs to: the values of the front matter key, or
+    # for "year" the year of its date
+    metadata = entry["metadata"]
+    if key == "year":
+        year = str(metadata.get("date", ""))[:4]
+        return [year] if year.isdigit() else []
+    value = metadata.get(key, [])
+    if not isinstance(value, list):
+        value = [value] if value != "" else []
+    return value
+
+def entry_item(entry):
+    return [route_url(entry["route"]), entry["title"], str(entry["metadata"].get("date", ""))]
+
+def page_size(metadata):
+    size = str(metadata.get("per_page", listing_page_size))
+    if not size.isdigit() or int(size) == 0:
+        raise Exception(f"Invalid per_page {size}: expected a positive number")
+    return int(size)
+
+def build_listing(entries, metadata, route):
+    # Every page of the listing as [path relative to the page, group, page
+    # number, items, previous URL, next URL], where items are [url, title,
+    # detail]. Without a group key the entries are listed at the page and
+    # paginated under page/N. With one, the page lists the groups, and each
+    # group lists its entries under its slug
+    size = page_size(metadata)
+    if "group" not in metadata:
+        items = [entry_item(entry) for entry in entries]
+        return paginate(route, "", None, items, size)
+
+    key = metadata["group"]
+    groups = {}
+    for entry in entries:
+        for group in group_values(entry, key):
+            groups.setdefault(group, []).append(entry)
+
+    names = sorted(groups, reverse=key == "year")
+    group_items = [[route_url(os.path.join(route, slug(name))), name, f"{len(groups[name])} page(s)"] for name in names]
+    listing = paginate(route, "", None, group_items, size)
+    for name in names:
+        items = [entry_item(entry) for entry in groups[name]]
+        listing.extend(paginate(route, slug(name), name, items, size))
+    return listing
+
+def paginate(route, path, group, items, size):
+    count = max(1, (len(items) + size - 1) // size)
+    paths = [path] + [os.path.join(path, "page", str(number)) for number in range(2, count + 1)]
+    urls = [route_url(os.path.join(route, page_path) if page_path != "" else route) for page_path in paths]
+    pages = []
+    for number in range(1, count + 1):
+        previous_url = urls[number - 2] if number > 1 else None
+        next_url = urls[number] if number < count else None
+        pages.append([paths[number - 1], group, number, items[(number - 1) * size:number * size], previous_url, next_url])
+    return pages
+
+def listing_title(title, group, number):
+    if group is not None:
+        title = f"{title}: {group}"
+    if number > 1:
+        title = f"{title} (page {number})"
+    return title
+
+def listing_node(items, previous_url, next_url):
+    children = []
+    if len(items) > 0:
+        list_items = []
+        for url, title, detail in items:
+            item = [LeafNode(title, "a", {"href": url})]
+            if detail != "":
+                item.extend([LeafNode(" "), LeafNode(detail, "span")])
+            list_items.append(ParentNode("li", item))
+        children.append(ParentNode("ul", list_items, {"class": "listing"}))
+    links = []
+    if previous_url is not None:
+        links.append(LeafNode("Previous", "a", {"href": previous_url, "rel": "prev"}))
+    if next_url is not None:
+        links.append(LeafNode("Next", "a", {"href": next_url, "rel": "next"}))
+    if len(links) > 0:
+        children.append(ParentNode("nav", links, {"class": "pagination"}))
+    if len(children) == 0:
+        return LeafNode("")
+    return ParentNode("div", children)
+
+def listing_outputs(listing, output_path):
+    # The output files of a listing's pages besides the page itself
+    directory = os.path.dirname(output_path)
+    return [os.path.normpath(os.path.join(directory, page[0], "index.html")) for page in listing if page[0] != ""]
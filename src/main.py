@@ -1,83 +1,879 @@
+import argparse
+import json
 import os
 import shutil
-from markdown_parser import markdown_to_html_node, extract_title
+import itertools
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import markdown_parser
+from markdown_parser import markdown_to_document, stream_document, first_title, set_fragment_memo, PageReferences
 from htmlnode import HTMLNode
+import textnode
+import profiler
+import compress
+import assets
+import search
+import links
+from textnode import set_inline_parser, inline_parsers, inline_parser_scanner
+from manifest import BuildManifest, hash_file, hash_bytes
+from parse_cache import ParseCache
+from search import SearchIndex
+from listings import MetadataIndex, listing_outputs, listing_node, listing_title
+from shards import parse_shard, shard_pages, shard_path, merge_manifest, merge_outputs
+from front_matter import read_front_matter, template_value
+from template import load_template, layout_path, partials_path_for, expand_includes, expand_line_includes, line_origin
+from sync import sync_directory, sync_file, remove_orphans, remove_empty_directories, replace_if_changed, link_modes, link_mode_copy
+from content import walk_content, page_route, entry_type_asset
+from watcher import watch
+import daemon
+from devserver import LiveReload, start_server
 
-def main():
-    copy_directory("./static", "./public")
-    generate_pages("./content", "./template.html", "./public")
+content_path = "./content"
+static_path = "./static"
+template_path = "./template.html"
+layouts_path = "./layouts"
+partials_path = partials_path_for(template_path)
+public_path = "./public"
+manifest_path = "./.cache/manifest.json"
+trace_path = "./.cache/trace.json"
+parse_cache_path = "./.cache/parse"
+search_index_path = "./.cache/search.json"
+metadata_index_path = "./.cache/metadata.json"
+search_output_path = os.path.join(public_path, "search")
+shards_path = "./.shards"
 
-def copy_directory(source_path, destination_path):
+# Pages of this many bytes or more are streamed, 0 never streams. Set from
+# --stream-size
+stream_size = 32 * 1024 * 1024
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate a static site from markdown content")
+    parser.add_argument("--force", action="store_true", help="regenerate every page, ignoring the build manifest")
+    parser.add_argument("--clean", action="store_true", help="delete the output directory and copy every static file again")
+    parser.add_argument("--checksum", action="store_true", help="compare static files by content hash instead of size and modification time")
+    parser.add_argument("--link-mode", choices=link_modes, default=link_mode_copy, help="how static files are placed in the output directory")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="number of worker processes used to generate pages (default: CPU count)")
+    parser.add_argument("--inline-parser", choices=inline_parsers, default=inline_parser_scanner, help="inline markdown parser: single-pass scanner or the original splitting pipeline")
+    parser.add_argument("--watch", action="store_true", help="serve the site, rebuild changed files and reload open browsers")
+    parser.add_argument("--port", type=int, default=8888, help="port used by --watch to serve the site")
+    parser.add_argument("--daemon", action="store_true", help=f"stay running with caches warm and build whenever src/client.py asks, listening on {daemon.socket_path}")
+    parser.add_argument("--parse-cache-size", type=int, default=256, help="size limit in MB of the cache of rendered page bodies, 0 to disable it (default: 256)")
+    parser.add_argument("--block-memo-size", type=int, default=32, help="size limit in MB of the per-process memo of rendered blocks repeated across pages, 0 to disable it (default: 32)")
+    parser.add_argument("--stream-size", type=int, default=32, help="size in MB from which pages are converted and written a block at a time instead of read whole, 0 to never stream (default: 32)")
+    parser.add_argument("--fingerprint", action="store_true", help="also copy static files under names with a hash of their content and point pages at those copies")
+    parser.add_argument("--search", action="store_true", help="write a sharded search index of every page's text to the search directory of the output")
+    parser.add_argument("--check-links", action="store_true", help="report links and images pointing at pages or files the site doesn't have, and fail the build if there are any")
+    parser.add_argument("--precompress", action="store_true", help="write a gzip compressed .gz copy next to every compressible output file")
+    parser.add_argument("--shard", metavar="I/N", help="only generate shard I of N of the pages, balanced by size, into .shards/I for a later --merge")
+    parser.add_argument("--merge", type=int, metavar="N", help="combine the output, manifests and search indexes of shards 1 to N into the output directory, then exit")
+    parser.add_argument("--depends-on", metavar="PATH", help="list the pages built from PATH (a template, layout or partial) as of the last build, then exit")
+    parser.add_argument("--profile", action="store_true", help="time each build stage and page, print a report and write a trace file")
+    parser.add_argument("--profile-output", default=trace_path, help="where --profile writes its Chrome trace event file")
+    parser.add_argument("--profile-top", type=int, default=10, help="number of slowest pages listed by --profile")
+    return parser
+
+def apply_settings(args):
+    global stream_size
+    stream_size = args.stream_size * 1024 * 1024
+    set_inline_parser(args.inline_parser)
+    profiler.set_enabled(args.profile)
+    # Replacing the block memo empties it, so a daemon keeps it while its
+    # size stays the same
+    memo = markdown_parser.fragment_memo
+    if (memo.max_size if memo is not None else 0) != args.block_memo_size * 1024 * 1024:
+        set_fragment_memo(args.block_memo_size * 1024 * 1024)
+    compress.set_precompress(args.precompress)
+    search.set_indexing(args.search)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    apply_settings(args)
+    if args.merge is not None:
+        merge_shards(args.merge, args.check_links)
+        return
+    shard = None
+    if args.shard is not None:
+        shard = parse_shard(args.shard)
+        if args.watch or args.daemon:
+            raise Exception("--watch and --daemon can't be used with --shard")
+        use_shard_paths(shard[0])
+    if args.daemon:
+        if args.watch:
+            raise Exception("--watch can't be used with --daemon")
+        serve_builds()
+        return
+    manifest = BuildManifest(manifest_path)
+    manifest.load()
+    if args.depends_on is not None:
+        for source in manifest.dependents(args.depends_on):
+            print(source)
+        return
+
+    parse_cache = open_parse_cache(args, manifest)
+    search_index = SearchIndex(search_index_path)
+    search_index.load()
+    metadata_index = MetadataIndex(metadata_index_path)
+    metadata_index.load()
+    build(args, manifest, parse_cache, search_index, metadata_index, shard)
+
+    if args.watch:
+        watch_site(manifest, parse_cache, search_index, metadata_index, args)
+
+def open_parse_cache(args, manifest):
+    if args.parse_cache_size == 0:
+        return None
+    return ParseCache(parse_cache_path, args.parse_cache_size * 1024 * 1024, f"{manifest.generator}:{args.inline_parser}")
+
+def build(args, manifest, parse_cache, search_index, metadata_index, shard=None, changes=None):
+    # A full incremental build, or with changes, a rebuild of what depends
+    # on those paths only
+    try:
+        with profiler.span("build"):
+            if changes is None:
+                copy_directory(static_path, public_path, manifest, args.clean, args.checksum, args.link_mode)
+                update_fingerprints(manifest, args.fingerprint)
+                generate_pages(content_path, template_path, public_path, manifest, args.force, args.jobs, parse_cache, static_path, search_index, shard, metadata_index, args.checksum, args.link_mode)
+            else:
+                rebuild_changes(changes, manifest, parse_cache, search_index, metadata_index, args)
+            update_search_index(search_index, args.search)
+            precompress_assets(manifest, args.jobs)
+            # A shard's pages link to the other shards' pages, so shards
+            # only record their links and --merge checks them
+            if args.check_links and shard is None:
+                broken = report_broken_links(manifest)
+                if broken > 0:
+                    raise Exception(f"Found {broken} broken link(s)")
+    finally:
+        manifest.save()
+        metadata_index.save()
+        if parse_cache is not None:
+            parse_cache.trim()
+        if args.profile:
+            report_profile(args.profile_output, args.profile_top)
+
+def file_mtime(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+def serve_builds():
+    # Answers build requests from src/client.py. Between builds the manifest,
+    # search and metadata indexes, block memo, loaded templates, image sizes
+    # and worker processes stay in memory; the manifest and indexes are only
+    # read again when another process wrote them
+    manifest = None
+    search_index = None
+    metadata_index = None
+    loaded = {}
+    fingerprinting = False
+    indexing = False
+
+    def handle(argv, paths):
+        nonlocal manifest, search_index, metadata_index, fingerprinting, indexing
+        args = build_parser().parse_args(argv)
+        for flag in daemon.local_flags:
+            if getattr(args, flag[2:]) not in (None, False):
+                raise Exception(f"{flag} can't be sent to the daemon")
+        apply_settings(args)
+
+        if manifest is None or loaded.get(manifest_path) != file_mtime(manifest_path):
+            manifest = BuildManifest(manifest_path)
+            manifest.load()
+            loaded[manifest_path] = file_mtime(manifest_path)
+        if search_index is None or loaded.get(search_index_path) != file_mtime(search_index_path):
+            search_index = SearchIndex(search_index_path)
+            search_index.load()
+            loaded[search_index_path] = file_mtime(search_index_path)
+        if metadata_index is None or loaded.get(metadata_index_path) != file_mtime(metadata_index_path):
+            metadata_index = MetadataIndex(metadata_index_path)
+            metadata_index.load()
+            loaded[metadata_index_path] = file_mtime(metadata_index_path)
+        if args.depends_on is not None:
+            for source in manifest.dependents(args.depends_on):
+                print(source)
+            return
+
+        changes = None
+        if len(paths) > 0:
+            if args.force or args.clean:
+                raise Exception("--force and --clean rebuild everything, so they can't be used with changed paths")
+            # The watcher reports paths the way the roots are written
+            changes = set([os.path.join(".", os.path.relpath(path)) for path in paths])
+            # Fingerprints from an earlier request stay in memory, and turning
+            # them on or off changes every page, so that takes a full build
+            if fingerprinting != args.fingerprint:
+                print("--fingerprint changed since the last build, rebuilding everything")
+                changes = None
+            # Unchanged pages only get or lose their .gz in a full build
+            elif manifest.precompressed != args.precompress:
+                print("--precompress changed since the last build, rebuilding everything")
+                changes = None
+            # Turning the index on needs the terms of every page
+            elif indexing != args.search:
+                print("--search changed since the last build, rebuilding everything")
+                changes = None
+        try:
+            build(args, manifest, open_parse_cache(args, manifest), search_index, metadata_index, None, changes)
+        finally:
+            # Only a full build sets the fingerprints in memory and indexes
+            # every page
+            if changes is None:
+                fingerprinting = args.fingerprint
+                indexing = args.search
+            loaded[manifest_path] = file_mtime(manifest_path)
+            loaded[search_index_path] = file_mtime(search_index_path)
+            loaded[metadata_index_path] = file_mtime(metadata_index_path)
+
+    daemon.serve(daemon.socket_path, handle)
+
+def use_shard_paths(index):
+    # Each shard builds into a directory of its own, with its own manifest
+    # and indexes, so shards can also run side by side on one machine. The
+    # parse cache is safe to share
+    global public_path, manifest_path, search_index_path, metadata_index_path, search_output_path
+    directory = shard_path(shards_path, index)
+    public_path = os.path.join(directory, "public")
+    manifest_path = os.path.join(directory, "manifest.json")
+    search_index_path = os.path.join(directory, "search.json")
+    metadata_index_path = os.path.join(directory, "metadata.json")
+    search_output_path = os.path.join(public_path, "search")
+
+def merge_shards(count, check_links):
+    # Shards only ever hold their own pages, so the merged manifest is
+    # rebuilt from theirs; the search index keeps its page ids
+    manifest = BuildManifest(manifest_path)
+    search_index = SearchIndex(search_index_path)
+    search_index.load()
+    shard_public_paths = []
+    search_pages = {}
+    indexed = False
+    routes = {}
+    for index in range(1, count + 1):
+        directory = shard_path(shards_path, index)
+        if not os.path.isdir(directory):
+            raise Exception(f"Shard {index} of {count} is missing: {directory} does not exist")
+        shard_manifest = BuildManifest(os.path.join(directory, "manifest.json"))
+        shard_manifest.load()
+        merge_manifest(manifest, shard_manifest, os.path.join(directory, "public"), public_path, routes)
+        shard_public_paths.append(os.path.join(directory, "public"))
+
+        shard_search_index = SearchIndex(os.path.join(directory, "search.json"))
+        if os.path.exists(shard_search_index.path):
+            indexed = True
+            shard_search_index.load()
+            search_pages.update(shard_search_index.pages)
+
+    # Every shard's search index numbers its pages from 0, so the merged one
+    # is written from the combined terms instead of copied
+    skip = [os.path.relpath(search_output_path, public_path)] if indexed else []
+    merge_outputs(shard_public_paths, public_path, skip)
+    for source_path in list(search_index.pages):
+        if source_path not in search_pages:
+            search_index.remove(source_path)
+    for source_path, entry in sorted(search_pages.items()):
+        search_index.update(source_path, entry["url"], entry["title"], entry["terms"])
+    update_search_index(search_index, indexed)
+    manifest.save()
+    print(f"Merged {count} shard(s) into {public_path}")
+
+    if check_links:
+        broken = report_broken_links(manifest)
+        if broken > 0:
+            raise Exception(f"Found {broken} broken link(s)")
+
+def report_profile(output_path, top):
+    recorded = profiler.take_events()
+    profiler.print_report(recorded, top)
+    profiler.write_trace(output_path, recorded)
+    print(f"Wrote trace to {output_path}")
+
+def watch_site(manifest, parse_cache, search_index, metadata_index, args):
+    live_reload = LiveReload()
+    start_server(public_path, args.port, live_reload)
+
+    for changes in watch([content_path, static_path, template_path, layouts_path, partials_path]):
+        try:
+            rebuild_changes(changes, manifest, parse_cache, search_index, metadata_index, args)
+            update_search_index(search_index, args.search)
+            precompress_assets(manifest, args.jobs)
+            if args.check_links:
+                report_broken_links(manifest)
+        except Exception:
+            traceback.print_exc()
+            continue
+        finally:
+            manifest.save()
+            metadata_index.save()
+            if parse_cache is not None:
+                parse_cache.trim()
+            if args.profile:
+                report_profile(args.profile_output, args.profile_top)
+        live_reload.notify()
+
+def rebuild_changes(changes, manifest, parse_cache, search_index, metadata_index, args):
+    # The watched roots themselves are reported when the watcher lost track
+    # of individual events, so those trigger a full pass over that root
+    static_changes = [path for path in sorted(changes) if path.startswith(static_path + os.sep)]
+    if static_path in changes:
+        copy_directory(static_path, public_path, manifest, False, args.checksum, args.link_mode)
+    else:
+        for path in static_changes:
+            sync_file(path, static_path, public_path, manifest, args.checksum, args.link_mode)
+    if len(static_changes) > 0 or static_path in changes:
+        update_fingerprints(manifest, args.fingerprint)
+
+    # Pages are only regenerated when a file they were built from changed, so
+    # a full pass over the content only touches the pages that depend on a
+    # changed template, layout, partial or image
+    shared_changed = any([path in (layouts_path, partials_path) or path.startswith(layouts_path + os.sep) or path.startswith(partials_path + os.sep) for path in changes])
+    images_changed = static_path in changes or any([len(manifest.dependents(path)) > 0 for path in static_changes])
+    if template_path in changes or content_path in changes or shared_changed or images_changed:
+        generate_pages(content_path, template_path, public_path, manifest, False, args.jobs, parse_cache, static_path, search_index, None, metadata_index, args.checksum, args.link_mode)
+        return
+
+    sources = []
+    for path in sorted(changes):
+        if not path.startswith(content_path + os.sep) or os.path.basename(path).startswith("."):
+            continue
+        if path.endswith(".md"):
+            sources.append(path)
+        else:
+            sync_file(path, content_path, public_path, manifest, args.checksum, args.link_mode)
+    rebuild_pages(sources, content_path, template_path, public_path, manifest, parse_cache, static_path, search_index, metadata_index)
+
+def copy_directory(source_path, destination_path, manifest=None, clean=False, checksum=False, link_mode=link_mode_copy):
     if not os.path.exists(source_path):
         raise Exception("Source path does not exist")
 
-    if os.path.exists(destination_path):
+    if clean and os.path.exists(destination_path):
         print(f"Removing {destination_path}")
         shutil.rmtree(destination_path)
-    
-    print(f"Creating directory: {destination_path}")
-    os.mkdir(destination_path)
 
-    files = os.listdir(source_path)
-    for file in files:
-        source_file_path = f"{source_path}/{file}"
-        destination_file_path = os.path.join(destination_path, file)
+    with profiler.span("copy_directory"):
+        return sync_directory(source_path, destination_path, manifest, checksum, link_mode)
+
+def update_fingerprints(manifest, enabled):
+    with profiler.span("fingerprint_assets"):
+        assets.set_asset_urls(assets.fingerprint_assets(static_path, public_path, manifest, enabled))
+
+def update_search_index(search_index, enabled):
+    # The index of the pages generated so far is written as a whole; shards
+    # whose content didn't change keep their files. Turning --search off
+    # removes the published index but keeps the terms in the cache, since
+    # pages indexed before aren't rendered again when it is turned back on
+    with profiler.span("search_index"):
+        if enabled:
+            search_index.write(search_output_path)
+            search_index.save()
+        elif os.path.exists(search_index.path):
+            if os.path.exists(search_output_path):
+                print(f"Removing {search_output_path}")
+                shutil.rmtree(search_output_path)
+            search_index.save()
+
+def report_broken_links(manifest):
+    # Every page's links were recorded while it was parsed, so this only
+    # looks them up in the site's pages and files
+    with profiler.span("check_links"):
+        broken = links.broken_links(manifest, public_path)
+    for source_path, line, url in broken:
+        print(f"{source_path}:{line}: broken link to {url}")
+    return len(broken)
+
+def precompress_assets(manifest, jobs):
+    # Pages are compressed by the worker that writes them; copied assets are
+    # compressed here, except those already found not to be worth it at
+    # their current mtime. With --precompress off this only runs once, to
+    # remove the .gz copies of a build that had it on
+    if not compress.precompress and not manifest.precompressed:
+        return
+    paths = []
+    fingerprinted_paths = [fingerprint[3] for fingerprint in manifest.fingerprints.values()]
+    for path in list(manifest.assets) + fingerprinted_paths:
+        if not os.path.exists(path):
+            continue
+        if manifest.incompressible.get(path) == os.stat(path).st_mtime_ns:
+            continue
+        paths.append(path)
 
-        if os.path.isdir(source_file_path):
-            copy_directory(source_file_path, destination_file_path)
+    with profiler.span("precompress_assets"):
+        results = compress.update_compressed_files(paths, jobs)
+    for path, result in zip(paths, results):
+        if result == compress.compressed_not_worth:
+            manifest.incompressible[path] = os.stat(path).st_mtime_ns
         else:
-            print(f"Creating file: {destination_file_path}")
-            shutil.copy(source_file_path, destination_file_path)
+            manifest.incompressible.pop(path, None)
+    for path in list(manifest.incompressible):
+        if path not in manifest.assets and path not in fingerprinted_paths:
+            del manifest.incompressible[path]
+    manifest.precompressed = compress.precompress
 
-def generate_page(source_path, template_path, destination_path):
+def generate_page(source_path, template_path, destination_path, quiet=False, parse_cache=None, static_path=None, listing=None):
+    # Returns the template used, the partials, images and fingerprinted
+    # assets the page was built from, its title and its search terms (None
+    # unless indexing). Images are only looked up in static_path when it is
+    # given. A listing page also writes the listing's other pages below its
+    # own
+    with profiler.span("generate_page", page=source_path) as page_span:
+        rendered = render_page(source_path, template_path, destination_path, quiet, parse_cache, static_path, listing)
+        with profiler.span("compress"):
+            compress.update_compressed(os.path.join(destination_path, "index.html"))
+        if profiler.enabled:
+            page_span.set(bytes_in=os.path.getsize(source_path), bytes_out=os.path.getsize(os.path.join(destination_path, "index.html")))
+    return rendered
+
+def render_page(source_path, template_path, destination_path, quiet, parse_cache, static_path, listing=None):
     if not os.path.exists(source_path):
         raise Exception(f"Markdown file {source_path} does not exist")
+    if stream_size > 0 and os.path.getsize(source_path) >= stream_size:
+        return render_streamed_page(source_path, template_path, destination_path, quiet, static_path, listing)
 
-    if not os.path.exists(template_path):
-        raise Exception(f"Template file {template_path} does not exist")
+    with open(source_path) as markdown_file:
+        metadata, lines, first_line = read_front_matter(markdown_file.read().split("\n"))
+    markdown = "\n".join(lines)
+
+    partials = partials_path_for(template_path)
+    line_map = []
+    markdown, includes = expand_includes(markdown, partials, ".md", (source_path,), line_map)
+    page_template_path, template = page_template(template_path, metadata, partials, source_path, destination_path, quiet)
+
+    values = template_values(metadata)
+    values["content"], title, image_files, terms, page_links = render_body(markdown, parse_cache, static_path)
+    if "title" not in values:
+        if title is None:
+            raise Exception("No title found in markdown")
+        values["title"] = title
+
+    write_listing_page(template, values, destination_path, listing)
+    dependencies = list(dict.fromkeys(template.dependencies + includes + image_files))
+    return page_template_path, dependencies, values["title"], terms, source_links(page_links, first_line, line_map)
+
+def source_links(page_links, first_line, line_map):
+    # Link lines are counted in the markdown after the front matter, with
+    # partials included. Links are recorded as [url, line] in the page, or
+    # [url, line, partial] when a partial was their source
+    source_path = line_map[0][1]
+    recorded = []
+    for url, line in page_links:
+        path, line = line_origin(line_map, line)
+        if path == source_path:
+            recorded.append([url, line + first_line - 1])
+        else:
+            recorded.append([url, line, path])
+    return recorded
+
+def render_streamed_page(source_path, template_path, destination_path, quiet, static_path, listing=None):
+    # Reads, converts and writes the page a block at a time, so memory stays
+    # proportional to its largest block rather than its size. The title comes
+    # first in most templates, so unless the front matter sets it, a first
+    # pass reads up to the first h1. Whole bodies are never held, so the
+    # parse cache isn't used
+    partials = partials_path_for(template_path)
+    includes = []
+    line_map = []
+    references = PageReferences(static_path) if static_path is not None else None
+    terms = set() if search.indexing else None
+    with open(source_path) as markdown_file:
+        metadata, lines, first_line = read_front_matter(markdown_file)
+        page_template_path, template = page_template(template_path, metadata, partials, source_path, destination_path, quiet)
+
+        values = template_values(metadata)
+        if "title" not in values:
+            values["title"] = first_title(expand_line_includes(lines, partials, ".md", (source_path,), []))
+            if values["title"] is None:
+                raise Exception("No title found in markdown")
+            markdown_file.seek(0)
+            metadata, lines, first_line = read_front_matter(markdown_file)
 
-    print(f"Generating page from {source_path} to {destination_path} using {template_path}")
+        lines = expand_line_includes(lines, partials, ".md", (source_path,), includes, line_map)
+        values["content"] = stream_document(lines, references, terms)
+        write_listing_page(template, values, destination_path, listing)
 
+    image_files = references.files if references is not None else []
+    page_links = source_links(references.links, first_line, line_map) if references is not None else []
+    return page_template_path, list(dict.fromkeys(template.dependencies + includes + image_files)), values["title"], terms, page_links
+
+def page_template(template_path, metadata, partials, source_path, destination_path, quiet):
+    page_template_path = template_path
+    if "layout" in metadata:
+        page_template_path = layout_path(template_path, metadata["layout"])
+    template = load_template(page_template_path, partials)
+
+    if not quiet:
+        print(f"Generating page from {source_path} to {destination_path} using {page_template_path}")
+    return page_template_path, template
+
+def template_values(metadata):
+    return dict([(key, template_value(value)) for key, value in metadata.items()])
+
+def write_listing_page(template, values, destination_path, listing):
+    # The first page of a listing has the page's own content followed by the
+    # list; the others only have their list and the page's front matter
+    if listing is None:
+        write_page(template, values, destination_path)
+        return
+
+    first, rest = listing[0], listing[1:]
+    write_page(template, dict(values, content=[values["content"], listing_node(*first[3:])]), destination_path)
+    for path, group, number, items, previous_url, next_url in rest:
+        page_values = dict(values, title=listing_title(values["title"], group, number), content=listing_node(items, previous_url, next_url))
+        write_page(template, page_values, os.path.join(destination_path, path))
+        compress.update_compressed(os.path.join(destination_path, path, "index.html"))
+
+def write_page(template, values, destination_path):
     if not os.path.exists(destination_path):
         os.makedirs(destination_path)
 
-    markdown_file = open(source_path)
-    html_file = open(os.path.join(destination_path, "index.html"), "w")
-    template_file = open(template_path)
+    # Pages are written to a temporary file and renamed into place, so the
+    # dev server never serves a half-written page
+    output_path = os.path.join(destination_path, "index.html")
+    temporary_path = f"{output_path}.tmp"
+    try:
+        with open(temporary_path, "w") as html_file:
+            template.write(html_file, values)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    replace_if_changed(temporary_path, output_path)
+
+def render_body(markdown, parse_cache, static_path):
+    # Returns the page body as an HTMLNode, or as HTML text when it comes
+    # through the parse cache, along with the page's title, the image files
+    # whose sizes it uses, its search terms when indexing and its links
+    references = PageReferences(static_path) if static_path is not None else None
+    terms = set() if search.indexing else None
+    if parse_cache is None:
+        body, title = markdown_to_document(markdown, references, terms)
+        if references is None:
+            return body, title, [], terms, []
+        return body, title, references.files, terms, references.links
+
+    with profiler.span("parse_cache"):
+        cached = parse_cache.get(markdown, assets.asset_version)
+    # An entry written while not indexing has no terms
+    if cached is not None and (terms is None or cached[3] is not None):
+        return cached
+
+    body, title = markdown_to_document(markdown, references, terms)
+    html = body.to_html()
+    files = references.files if references is not None else []
+    page_links = references.links if references is not None else []
+    parse_cache.put(markdown, html, title, files, assets.asset_version, terms, page_links)
+    return html, title, files, terms, page_links
+
+def remove_page(output_path, destination_root):
+    if os.path.exists(output_path):
+        print(f"Removing page: {output_path}")
+        os.remove(output_path)
+    compress.remove_compressed(output_path)
+
+    remove_empty_directories(os.path.dirname(output_path), destination_root)
+
+def remove_source_page(manifest, source_file_path, destination_path):
+    for output_path in manifest.listing_outputs(source_file_path):
+        remove_page(output_path, destination_path)
+    remove_page(manifest.remove(source_file_path), destination_path)
+
+def init_worker(inline_parser, profiling, memo_size, precompress, asset_urls, indexing, page_stream_size):
+    global stream_size
+    stream_size = page_stream_size
+    set_inline_parser(inline_parser)
+    profiler.set_enabled(profiling)
+    # A forked worker starts with a copy of the parent's recorded events
+    profiler.take_events()
+    set_fragment_memo(memo_size)
+    compress.set_precompress(precompress)
+    assets.set_asset_urls(asset_urls)
+    search.set_indexing(indexing)
+
+def take_memo_stats():
+    if markdown_parser.fragment_memo is None:
+        return None
+    return markdown_parser.fragment_memo.take_stats()
+
+def generate_page_job(source_path, template_path, destination_path, parse_cache, static_path, listing):
+    # Runs in a worker process: report failures as text so one bad page is
+    # reported with its source path instead of tearing down the pool. Timings
+    # recorded while profiling and block memo counters travel back with the
+    # result
+    try:
+        result = generate_page(source_path, template_path, destination_path, True, parse_cache, static_path, listing), None
+    except Exception:
+        result = None, traceback.format_exc()
+    return result + (profiler.take_events(), take_memo_stats())
+
+# The worker processes of the last build and the settings they started with
+page_pool = None
+page_pool_key = None
+
+def worker_pool(jobs, initargs):
+    # Workers are kept for the next build while the settings stay the same,
+    # so a daemon's workers keep their block memo and loaded templates
+    global page_pool, page_pool_key
+    if page_pool is not None and page_pool_key == (jobs, initargs):
+        return page_pool
+    if page_pool is not None:
+        page_pool.shutdown()
+    page_pool = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=initargs)
+    page_pool_key = (jobs, initargs)
+    return page_pool
+
+def discard_worker_pool():
+    global page_pool, page_pool_key
+    if page_pool is not None:
+        page_pool.shutdown(wait=False)
+    page_pool = None
+    page_pool_key = None
+
+def run_page_jobs(pages, template_path, jobs, parse_cache=None, static_path=None, window_per_job=16):
+    pages = iter(pages)
+    window = max(jobs, 1) * window_per_job
+    queued = deque(itertools.islice(pages, window))
+
+    if jobs <= 1 or len(queued) <= 1:
+        for page in itertools.chain(queued, pages):
+            yield page, generate_page_job(page[0], template_path, page[1], parse_cache, static_path, page[4])
+        return
 
-    markdown = markdown_file.read()
-    template = template_file.read()
+    # Pages are pulled from the content walk a window at a time, so the full
+    # list is never built. Each window is scheduled largest page first so a
+    # big file doesn't start last and hold up the build, and results are
+    # yielded in scheduling order to keep the log deterministic
+    queued = deque(sorted(queued, key=lambda page: os.path.getsize(page[0]), reverse=True))
+    in_flight = deque()
+    # Workers may be spawned rather than forked, so settings made in main()
+    # are passed on explicitly
+    memo = markdown_parser.fragment_memo
+    initargs = (textnode.inline_parser, profiler.enabled, memo.max_size if memo is not None else 0, compress.precompress, assets.asset_urls, search.indexing, stream_size)
+    executor = worker_pool(jobs, initargs)
+    while True:
+        if len(queued) == 0:
+            chunk = list(itertools.islice(pages, window))
+            queued.extend(sorted(chunk, key=lambda page: os.path.getsize(page[0]), reverse=True))
+        while len(queued) > 0 and len(in_flight) < window:
+            page = queued.popleft()
+            try:
+                future = executor.submit(generate_page_job, page[0], template_path, page[1], parse_cache, static_path, page[4])
+            except BrokenProcessPool:
+                # The pool broke before its failure was seen below
+                discard_worker_pool()
+                executor = worker_pool(jobs, initargs)
+                future = executor.submit(generate_page_job, page[0], template_path, page[1], parse_cache, static_path, page[4])
+            in_flight.append((page, executor, future))
+        if len(in_flight) == 0:
+            return
 
-    html_node = markdown_to_html_node(markdown)
+        page, page_executor, future = in_flight.popleft()
+        try:
+            yield page, future.result()
+        except BrokenProcessPool:
+            # A worker died, failing every page still running in its pool. We
+            # can't tell which page killed it, so they are all reported, and
+            # the pages left are sent to new workers
+            if page_executor is executor:
+                discard_worker_pool()
+                executor = worker_pool(jobs, initargs)
+            yield page, (None, traceback.format_exc(), [], None)
+        except Exception:
+            yield page, (None, traceback.format_exc(), [], None)
 
-    html = html_node.to_html()
-    title = extract_title(markdown)
+def page_destination(route, destination_path):
+    if route == "":
+        return destination_path
+    return os.path.join(destination_path, route)
 
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
+def cached_hash(path, hashes, manifest):
+    # Looked up once per build, and read only when the file changed since
+    # the manifest last hashed it
+    if path not in hashes:
+        hashes[path] = manifest.file_hash(path)
+    return hashes[path]
 
-    html_file.write(template)
+def page_settings(listing=None, indexing=None):
+    # Turning fingerprinting on or off changes every page that links to a
+    # static file; changes to the files themselves are tracked as
+    # dependencies. Turning the search index on needs the terms of every
+    # page. Links are recorded on every build, so the link checker is not a
+    # setting. A listing page changes with what it lists
+    settings = []
+    if len(assets.asset_urls) > 0:
+        settings.append("fingerprint")
+    if search.indexing if indexing is None else indexing:
+        settings.append("search")
+    if listing is not None:
+        settings.append("listing:" + hash_bytes(json.dumps(listing).encode()))
+    return ",".join(settings)
 
-    markdown_file.close()
-    html_file.close()
+def is_page_up_to_date(manifest, source_file_path, source_hash, template_path, output_path, file_hashes, listing=None):
+    # A page is checked against the layout and partials it was last rendered
+    # with; if its source is unchanged, so is its choice of layout, and the
+    # partials can only change through a change to one of them
+    page_template_path = manifest.template_for(source_file_path) or template_path
+    template_hash = cached_hash(page_template_path, file_hashes, manifest)
+    # A page indexed for search is just as current once --search is off
+    settings = [page_settings(listing)]
+    if not search.indexing:
+        settings.append(page_settings(listing, True))
+    if not any([manifest.is_up_to_date(source_file_path, source_hash, template_hash, output_path, page_setting) for page_setting in settings]):
+        return False
+    for path, dependency_hash in manifest.dependencies_of(source_file_path).items():
+        if cached_hash(path, file_hashes, manifest) != dependency_hash:
+            return False
+    return True
 
-def generate_pages(source_path, template_path, destination_path):
+def record_page(manifest, source_file_path, source_hash, rendered, output_path, file_hashes, destination_path, listing=None):
+    page_template_path, dependencies = rendered[0], rendered[1]
+    template_hash = cached_hash(page_template_path, file_hashes, manifest)
+    dependency_hashes = dict([(path, cached_hash(path, file_hashes, manifest)) for path in dependencies])
+    # Pages a listing no longer has, such as its last page after a post was
+    # removed, are removed with their directories
+    outputs = listing_outputs(listing, output_path) if listing is not None else None
+    for stale_output in manifest.listing_outputs(source_file_path):
+        if outputs is None or stale_output not in outputs:
+            remove_page(stale_output, destination_path)
+    manifest.record(source_file_path, source_hash, page_template_path, template_hash, output_path, dependency_hashes, page_settings(listing), rendered[4], outputs)
+
+def update_search_entry(search_index, source_file_path, output_path, destination_path, rendered):
+    if search_index is not None and rendered[3] is not None:
+        search_index.update(source_file_path, links.page_url(output_path, destination_path), rendered[2], rendered[3])
+
+def rebuild_pages(source_files, source_path, template_path, destination_path, manifest, parse_cache=None, static_path=None, search_index=None, metadata_index=None):
+    # Listing pages are checked along with the changed pages, as those may
+    # be what they list
+    listing = None
+    if metadata_index is not None:
+        for source_file_path in source_files:
+            metadata_index.refresh(source_file_path, source_path)
+        source_files = set(source_files) | set(metadata_index.listing_sources())
+
+    file_hashes = {}
+    for source_file_path in sorted(source_files):
+        if not os.path.exists(source_file_path):
+            if source_file_path in manifest.pages:
+                remove_source_page(manifest, source_file_path, destination_path)
+            if search_index is not None:
+                search_index.remove(source_file_path)
+            continue
+
+        route = page_route(os.path.relpath(source_file_path, source_path))
+        destination_file_path = page_destination(route, destination_path)
+        output_path = os.path.normpath(os.path.join(destination_file_path, "index.html"))
+        source_hash = hash_file(source_file_path)
+        if metadata_index is not None:
+            listing = metadata_index.listing(source_file_path, source_path)
+        if is_page_up_to_date(manifest, source_file_path, source_hash, template_path, output_path, file_hashes, listing):
+            continue
+
+        rendered = generate_page(source_file_path, template_path, destination_file_path, False, parse_cache, static_path, listing)
+        record_page(manifest, source_file_path, source_hash, rendered, output_path, file_hashes, destination_path, listing)
+        update_search_entry(search_index, source_file_path, output_path, destination_path, rendered)
+
+def pending_pages(source_path, template_path, destination_path, manifest, force, seen_sources, file_hashes, failures, compressed_outputs, shard=None, metadata_index=None, checksum=False, link_mode=link_mode_copy):
+    # Walks the content tree, copying assets as they are found and yielding
+    # (source, destination, source hash, output path, listing) for every page
+    # that needs to be generated. A shard (index, count) only generates its
+    # share of the pages, and only the first shard copies the assets.
+    # Unchanged pages whose .gz may need updating go to compressed_outputs
+    selected = shard_pages(source_path, *shard) if shard is not None else None
+    routes = {}
+    for entry_type, source_file_path, route in walk_content(source_path):
+        if entry_type == entry_type_asset:
+            if shard is not None and shard[0] != 1:
+                continue
+            seen_sources.add(source_file_path)
+            sync_file(source_file_path, source_path, destination_path, manifest, checksum, link_mode)
+            continue
+
+        # Routes of other shards' pages are checked when shards are merged
+        if selected is not None and source_file_path not in selected:
+            continue
+        if route in routes:
+            print(f"Failed to generate page from {source_file_path}: route /{route} is already generated from {routes[route]}")
+            failures.append(source_file_path)
+            continue
+        routes[route] = source_file_path
+        seen_sources.add(source_file_path)
+
+        destination_file_path = page_destination(route, destination_path)
+        output_path = os.path.normpath(os.path.join(destination_file_path, "index.html"))
+        # Bad listing settings, such as per_page: 0, fail only their page
+        try:
+            listing = metadata_index.listing(source_file_path, source_path) if metadata_index is not None else None
+        except Exception as error:
+            print(f"Failed to generate page from {source_file_path}: {error}")
+            failures.append(source_file_path)
+            continue
+        source_hash = None
+        if manifest is not None:
+            source_hash = hash_file(source_file_path)
+            if not force and is_page_up_to_date(manifest, source_file_path, source_hash, template_path, output_path, file_hashes, listing):
+                print(f"Skipping unchanged page {source_file_path}")
+                # A missing .gz is written while --precompress is on, and a
+                # stale one removed in the first build after it was turned off
+                if compress.precompress or manifest.precompressed:
+                    compressed_outputs.append(output_path)
+                continue
+
+        yield source_file_path, destination_file_path, source_hash, output_path, listing
+
+def generate_pages(source_path, template_path, destination_path, manifest=None, force=False, jobs=1, parse_cache=None, static_path=None, search_index=None, shard=None, metadata_index=None, checksum=False, link_mode=link_mode_copy):
     if not os.path.exists(source_path):
         raise Exception(f"Directory {source_path} does not exist")
-    
-    files = os.listdir(source_path)
-    for file in files:
-        if not file.endswith(".md"):
-            raise Exception(f"Malformed file in content directory: {file}")
 
-        route_name = file.replace(".md", "")
+    if not os.path.exists(template_path):
+        raise Exception(f"Template file {template_path} does not exist")
 
-        source_file_path = os.path.join(source_path, file)
-        if source_file_path.find("index.md") != -1:
-            destination_file_path = destination_path
-        else:
-            destination_file_path = os.path.join(destination_path, route_name)
+    # Listing pages are built from the front matter of every page, so the
+    # index is brought up to date before any of them is generated
+    if metadata_index is not None:
+        with profiler.span("metadata_index"):
+            metadata_index.update(source_path)
+
+    file_hashes = {}
+    seen_sources = set()
+    failures = []
+    compressed_outputs = []
+
+    pages = pending_pages(source_path, template_path, destination_path, manifest, force, seen_sources, file_hashes, failures, compressed_outputs, shard, metadata_index, checksum, link_mode)
+    for page, result in run_page_jobs(pages, template_path, jobs, parse_cache, static_path):
+        source_file_path, destination_file_path, source_hash, output_path, listing = page
+        rendered, error, events, memo_stats = result
+        profiler.add_events(events)
+        if memo_stats is not None:
+            markdown_parser.fragment_memo.add_stats(memo_stats)
+        if error is not None:
+            print(f"Failed to generate page from {source_file_path}:\n{error}")
+            failures.append(source_file_path)
+            continue
+
+        print(f"Generated page from {source_file_path} to {destination_file_path} using {rendered[0]}")
+        if manifest is not None:
+            record_page(manifest, source_file_path, source_hash, rendered, output_path, file_hashes, destination_path, listing)
+        update_search_entry(search_index, source_file_path, output_path, destination_path, rendered)
+
+    # Pages the workers wrote are compressed by them; unchanged ones are
+    # compressed here, in parallel, once the workers are done
+    if len(compressed_outputs) > 0:
+        with profiler.span("precompress_pages"):
+            compress.update_compressed_files(compressed_outputs, jobs)
+
+    if search_index is not None:
+        for stale_source in [source for source in search_index.pages if source not in seen_sources]:
+            search_index.remove(stale_source)
+    if manifest is not None:
+        for stale_source in manifest.stale_pages(seen_sources):
+            remove_source_page(manifest, stale_source, destination_path)
+        remove_orphans(manifest, source_path, destination_path, seen_sources)
+        manifest.prune_file_hashes()
+
+    memo = markdown_parser.fragment_memo
+    if memo is not None and memo.hits + memo.misses > 0:
+        print(memo.summary())
+        memo.take_stats()
 
-        generate_page(source_file_path, template_path, destination_file_path)
+    if len(failures) > 0:
+        raise Exception(f"Failed to generate {len(failures)} page(s): {', '.join(failures)}")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
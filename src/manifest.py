@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+
+manifest_version = 2
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_signature(path):
+    # Identifies a version of a file without reading it, or None when it
+    # doesn't exist
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def generator_version():
+    # Any change to the generator's own source can change its output, so the
+    # version is the hash of every non-test module next to this one
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for file in sorted(os.listdir(source_dir)):
+        if not file.endswith(".py") or file.startswith("test_"):
+            continue
+        digest.update(file.encode())
+        with open(os.path.join(source_dir, file), "rb") as module_file:
+            digest.update(module_file.read())
+    return digest.hexdigest()
+
+class BuildManifest:
+    def __init__(self, path, generator=None):
+        self.path = path
+        self.generator = generator if generator is not None else generator_version()
+        self.pages = {}
+        self.assets = {}
+        # Assets found not to be worth precompressing, with the mtime they
+        # had when checked
+        self.incompressible = {}
+        # Whether the last build wrote .gz copies, so that builds with
+        # --precompress off only look for stale ones after it was on
+        self.precompressed = False
+        # Static files copied under fingerprinted names, by source, as
+        # [mtime, size, hash, fingerprinted path]
+        self.fingerprints = {}
+        # Hashes of the templates, partials and images pages depend on, as
+        # [mtime, size, hash], so a file is only read again once it changed
+        self.file_hashes = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            print(f"Ignoring unreadable build manifest {self.path}")
+            return
+
+        if data.get("version") != manifest_version:
+            print("Build manifest format changed, regenerating all pages")
+            return
+
+        # Copied assets don't depend on the generator, so they survive a
+        # generator change and can still be cleaned up as orphans
+        self.assets = data.get("assets", {})
+        self.incompressible = data.get("incompressible", {})
+        self.precompressed = data.get("precompressed", False)
+        self.fingerprints = data.get("fingerprints", {})
+        self.file_hashes = data.get("file_hashes", {})
+
+        if data.get("generator") != self.generator:
+            print("Generator changed since the last build, regenerating all pages")
+            return
+
+        self.pages = data.get("pages", {})
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        data = {
+            "version": manifest_version,
+            "generator": self.generator,
+            "pages": self.pages,
+            "assets": self.assets,
+            "incompressible": self.incompressible,
+            "precompressed": self.precompressed,
+            "fingerprints": self.fingerprints,
+            "file_hashes": self.file_hashes,
+        }
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as manifest_file:
+            json.dump(data, manifest_file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def is_up_to_date(self, source_path, source_hash, template_hash, output_path, settings=""):
+        # settings describes build options that change the output of every
+        # page, as opposed to files a page depends on
+        entry = self.pages.get(source_path)
+        return (
+            entry is not None and
+            entry["source_hash"] == source_hash and
+            entry["template_hash"] == template_hash and
+            entry.get("settings", "") == settings and
+            entry["output"] == output_path and
+            os.path.exists(output_path)
+        )
+
+    def file_hash(self, path):
+        # The hash of path, or None when it doesn't exist
+        signature = file_signature(path)
+        if signature is None:
+            self.file_hashes.pop(path, None)
+            return None
+        entry = self.file_hashes.get(path)
+        if entry is not None and tuple(entry[:2]) == signature:
+            return entry[2]
+        digest = hash_file(path)
+        self.file_hashes[path] = [signature[0], signature[1], digest]
+        return digest
+
+    def prune_file_hashes(self):
+        # Forgets the hashes of files no page depends on any more
+        used = set()
+        for entry in self.pages.values():
+            used.add(entry["template"])
+            used.update(entry["dependencies"])
+        for path in [path for path in self.file_hashes if path not in used]:
+            del self.file_hashes[path]
+
+    def template_for(self, source_path):
+        entry = self.pages.get(source_path)
+        if entry is None:
+            return None
+        return entry["template"]
+
+    def dependencies_of(self, source_path):
+        entry = self.pages.get(source_path)
+        if entry is None:
+            return {}
+        return entry["dependencies"]
+
+    def dependents(self, path):
+        # Pages built from the given file, either as their template or through
+        # an include. Recorded dependencies are already transitive, so this
+        # covers partials included by other partials
+        path = os.path.normpath(path)
+        pages = []
+        for source, entry in self.pages.items():
+            files = [entry["template"]] + list(entry["dependencies"])
+            if path in [os.path.normpath(file) for file in files]:
+                pages.append(source)
+        return sorted(pages)
+
+    def links_of(self, source_path):
+        entry = self.pages.get(source_path)
+        if entry is None:
+            return []
+        return entry.get("links", [])
+
+    def listing_outputs(self, source_path):
+        entry = self.pages.get(source_path)
+        if entry is None:
+            return []
+        return entry.get("listing", [])
+
+    def record(self, source_path, source_hash, template_path, template_hash, output_path, dependencies=None, settings="", links=None, listing_outputs=None):
+        # listing_outputs, the pages a listing page writes besides its own,
+        # are only kept for listing pages
+        self.pages[source_path] = {
+            "source_hash": source_hash,
+            "template": template_path,
+            "template_hash": template_hash,
+            "output": output_path,
+            "dependencies": dependencies if dependencies is not None else {},
+            "settings": settings,
+        }
+        if links is not None:
+            self.pages[source_path]["links"] = links
+        if listing_outputs is not None:
+            self.pages[source_path]["listing"] = listing_outputs
+
+    def stale_pages(self, seen_sources):
+        return [source for source in self.pages if source not in seen_sources]
+
+    def remove(self, source_path):
+        return self.pages.pop(source_path)["output"]
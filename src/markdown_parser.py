@@ -1,6 +1,13 @@
+import os
 import re
+from urllib.parse import urlsplit, unquote
+import profiler
+import assets
 from htmlnode import HTMLNode, ParentNode, LeafNode
 from textnode import text_to_textnodes, TextNode
+from fragment_memo import FragmentMemo
+from image_size import image_size
+from search import node_terms
 
 block_type_paragraph = "paragraph"
 block_type_header = "header"
@@ -9,86 +16,317 @@ block_type_quote = "quote"
 block_type_unordered_list = "unordered_list"
 block_type_ordered_list = "ordered_list"
 
-def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    return list(map(lambda x: x.strip(), blocks))
+header_pattern = re.compile(r"(#{1,6}) (.*)")
+ordered_item_pattern = re.compile(r"\d+\. ")
+code_fence = "```"
 
-def block_to_block_type(block):
-    if re.match(r"^#{1,6} ", block):
-        return block_type_header
-    if re.match(r"^```(?:.|\n)*?```$", block):
-        return block_type_code
-    if re.match(r"^> .*?", block, re.MULTILINE):
+# Set with set_fragment_memo(); None renders every block from scratch
+fragment_memo = None
+
+def set_fragment_memo(max_size):
+    global fragment_memo
+    fragment_memo = FragmentMemo(max_size) if max_size > 0 else None
+
+def strip_marker(block_type, line):
+    if block_type == block_type_quote or block_type == block_type_unordered_list:
+        marker = "> " if block_type == block_type_quote else "* "
+        if line.startswith(marker):
+            return line[2:]
+        return None
+
+    match = ordered_item_pattern.match(line)
+    if match is None:
+        return None
+    return line[match.end():]
+
+def line_block_type(line):
+    if line.startswith("> "):
         return block_type_quote
-    if re.match(r"^\* .*?", block, re.MULTILINE):
+    if line.startswith("* "):
         return block_type_unordered_list
-    if re.match(r"^\d+\. .*?", block):
+    if ordered_item_pattern.match(line):
         return block_type_ordered_list
     return block_type_paragraph
 
+def finish_block(block_type, lines, items, line_number):
+    text = "\n".join(lines).strip()
+    if block_type == block_type_paragraph:
+        return block_type, text, line_number, text
+    if block_type == block_type_quote:
+        return block_type, "\n".join(items), line_number, text
+    return block_type, items, line_number, text
+
+def scan_blocks(lines, first_line_number=1, literal_fence_line=None):
+    # Yields (block_type, content, line_number, text) for every block in one
+    # pass over the lines. Blocks are separated by blank or whitespace-only
+    # lines, except inside a fenced code block. The content is the header
+    # (level, text) pair, the code, the quote without its markers, the list
+    # items without their markers, or the paragraph text. The type of a block
+    # is decided by its first line; a quote or list with a line missing its
+    # marker falls back to a paragraph
+    block_type = None
+    block_lines = []
+    items = []
+    start = first_line_number
+    line_number = first_line_number - 1
+
+    for line in lines:
+        line_number += 1
+        line = line.rstrip()
+
+        if block_type == block_type_code:
+            block_lines.append(line)
+            if line.endswith(code_fence):
+                text = "\n".join(block_lines).strip()
+                yield block_type_code, text[3:-3], start, text
+                block_type = None
+            continue
+
+        if line == "":
+            if block_type is not None:
+                yield finish_block(block_type, block_lines, items, start)
+                block_type = None
+            continue
+
+        if block_type is not None:
+            block_lines.append(line)
+            if block_type != block_type_paragraph:
+                item = strip_marker(block_type, line)
+                if item is None:
+                    block_type = block_type_paragraph
+                else:
+                    items.append(item)
+            continue
+
+        start = line_number
+        first_line = line.lstrip()
+        header = header_pattern.match(first_line)
+        if header is not None:
+            yield block_type_header, (len(header.group(1)), header.group(2)), line_number, first_line
+            continue
+
+        block_lines = [line]
+        if first_line.startswith(code_fence) and line_number != literal_fence_line:
+            if len(first_line) > len(code_fence) and first_line.endswith(code_fence):
+                yield block_type_code, first_line[3:-3], line_number, first_line
+                continue
+            block_type = block_type_code
+            continue
+
+        block_type = line_block_type(first_line)
+        items = []
+        if block_type != block_type_paragraph:
+            items.append(strip_marker(block_type, first_line))
+
+    if block_type == block_type_code:
+        # The fence was never closed, so its lines are ordinary blocks after all
+        yield from scan_blocks(block_lines, start, start)
+    elif block_type is not None:
+        yield finish_block(block_type, block_lines, items, start)
+
+def markdown_to_blocks(markdown):
+    return [block[3] for block in scan_blocks(markdown.split("\n"))]
+
+def block_to_block_type(block):
+    for block_type, _, _, _ in scan_blocks(block.split("\n")):
+        return block_type
+    return block_type_paragraph
+
 def text_to_children(text):
     text_nodes = text_to_textnodes(text)
     html_nodes_map = map(lambda x: x.to_html_node(), text_nodes)
     return list(html_nodes_map)
 
-def create_paragraph_node(block):
-    nodes = text_to_children(block)
+def create_paragraph_node(text):
+    nodes = text_to_children(text)
     return ParentNode("p", nodes)
 
-def create_header_node(block):
-    text = re.findall(r"^(#{1,6}) (.*)", block)[0]
-    children = text_to_children(text[1])
-    return ParentNode(f"h{len(text[0])}", children)
-
-def create_code_node(block):
-    text = re.findall(r"^```(.*)```$", block, re.DOTALL)[0]
+def create_header_node(header):
+    level, text = header
     children = text_to_children(text)
-    return ParentNode("code", children)
+    return ParentNode(f"h{level}", children)
+
+def create_code_node(code):
+    return ParentNode("code", [LeafNode(code)])
 
-def create_quote_node(block):
-    split_block = block.split("\n")
-    removed_start = list(map(lambda x: re.findall(r"^> (.*)", x, re.DOTALL)[0], split_block))
-    text = "\n".join(removed_start)
+def create_quote_node(text):
     children = text_to_children(text)
     return ParentNode("blockquote", children)
 
-def create_unordered_list_node(block):
-    split_block = block.split("\n")
-    removed_start = list(map(lambda x: re.findall(r"^\* (.*)", x, re.DOTALL)[0], split_block))
-    children = list(map(lambda x: ParentNode("li", text_to_children(x)), removed_start))
+def create_unordered_list_node(items):
+    children = list(map(lambda x: ParentNode("li", text_to_children(x)), items))
     return ParentNode("ul", children)
 
-def create_ordered_list_node(block):
-    split_block = block.split("\n")
-    removed_start = list(map(lambda x: re.findall(r"^(?:\d+\.) (.*)", x, re.DOTALL)[0], split_block))
-    children = list(map(lambda x: ParentNode("li", text_to_children(x)), removed_start))
+def create_ordered_list_node(items):
+    children = list(map(lambda x: ParentNode("li", text_to_children(x)), items))
     return ParentNode("ol", children)
 
-def markdown_to_html_node(markdown):
+block_node_creators = {
+    block_type_paragraph: create_paragraph_node,
+    block_type_header: create_header_node,
+    block_type_code: create_code_node,
+    block_type_quote: create_quote_node,
+    block_type_unordered_list: create_unordered_list_node,
+    block_type_ordered_list: create_ordered_list_node,
+}
+
+def block_to_html_node(block_type, content):
+    return block_node_creators[block_type](content)
+
+class PageReferences:
+    # Post-processes the images and links of one page, in document order.
+    # Images get sizes and loading hints: the first one loads as usual, later
+    # ones lazily. Sizes are read for site-absolute URLs that point into the
+    # static directory. URLs of fingerprinted assets are rewritten. The files
+    # the page's HTML depends on this way are kept in files, and every URL as
+    # written in the markdown with its line in links, for the link checker
+    def __init__(self, static_path):
+        self.static_path = static_path
+        self.count = 0
+        self.files = []
+        self.links = []
+
+    def local_path(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != "" or parts.netloc != "" or not parts.path.startswith("/"):
+            return None
+        root = os.path.normpath(self.static_path)
+        path = os.path.normpath(os.path.join(root, unquote(parts.path).lstrip("/")))
+        if not path.startswith(root + os.sep):
+            return None
+        return path
+
+    def add_file(self, path):
+        if path not in self.files:
+            self.files.append(path)
+
+    def rewrite(self, node, attribute):
+        url, source = assets.rewrite_url(node.props[attribute])
+        if source is not None:
+            node.props[attribute] = url
+            self.add_file(source)
+
+    def add_image_attributes(self, node):
+        path = self.local_path(node.props["src"])
+        if path is not None:
+            size = image_size(path)
+            if size is not None:
+                node.props["width"] = str(size[0])
+                node.props["height"] = str(size[1])
+            self.add_file(path)
+        self.rewrite(node, "src")
+        if self.count > 0:
+            node.props["loading"] = "lazy"
+            node.props["decoding"] = "async"
+        self.count += 1
+
+    def add_link(self, url, text, line, position):
+        # A link's line is the block's first line plus the lines before its
+        # URL in the block's markdown. Links come in document order, so each
+        # is looked for after the previous one; returns where that ended
+        found = text.find(f"]({url}", position)
+        if found < 0:
+            self.links.append([url, line])
+            return position
+        self.links.append([url, line + text.count("\n", 0, found)])
+        return found + 2 + len(url)
+
+    def add_to_tree(self, node, text="", line=0):
+        # text and line are the markdown of the block and its first line
+        stack = [node]
+        position = 0
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.tag == "img" and node.props is not None and "src" in node.props:
+                position = self.add_link(node.props["src"], text, line, position)
+                self.add_image_attributes(node)
+                continue
+            if node.tag == "a" and node.props is not None and "href" in node.props:
+                position = self.add_link(node.props["href"], text, line, position)
+                self.rewrite(node, "href")
+            if node.children is not None:
+                stack.extend(reversed(node.children))
+
+def memoized_block_node(block_type, content, text, references=None, terms=None, line=1):
+    # Blocks repeated across pages, such as disclaimers or shared samples, are
+    # rendered once per process and reused as raw HTML. Blocks with images
+    # aren't, since their attributes depend on where they are on the page.
+    # When terms is a set, the block's search terms are added to it
+    has_links = references is not None and "](" in text
+    if fragment_memo is None or len(text) < fragment_memo.min_length or (references is not None and "![" in text):
+        node = block_to_html_node(block_type, content)
+        if terms is not None:
+            terms.update(node_terms(node))
+        if has_links:
+            references.add_to_tree(node, text, line)
+        return node
+
+    # Rewritten links depend on the asset URLs, so those are part of the key,
+    # and the asset files a memoized block links to, its links with their
+    # line within the block and its search terms are kept with it
+    key = (block_type, text, assets.asset_version if has_links else "", terms is not None)
+    fragment = fragment_memo.get(key)
+    if fragment is None:
+        node = block_to_html_node(block_type, content)
+        block_terms = node_terms(node) if terms is not None else None
+        files = []
+        links = []
+        if has_links:
+            block_references = PageReferences(references.static_path)
+            block_references.add_to_tree(node, text)
+            files = block_references.files
+            links = block_references.links
+        fragment = (node.to_html(), files, block_terms, links)
+        fragment_memo.put(key, fragment)
+    if has_links:
+        for file in fragment[1]:
+            references.add_file(file)
+        for url, offset in fragment[3]:
+            references.links.append([url, line + offset])
+    if terms is not None:
+        terms.update(fragment[2])
+    return LeafNode(fragment[0])
+
+def markdown_to_document(markdown, references=None, terms=None):
+    # Builds the page body and finds the title (the first h1) in the same pass.
+    # A PageReferences post-processes the page's images and links, and the
+    # search terms of the page's text are added to terms when it is a set
     children_nodes = []
-    blocks = markdown_to_blocks(markdown)
-
-    for block in blocks:
-        block_type = block_to_block_type(block)
-
-        if block_type == block_type_paragraph:
-            children_nodes.append(create_paragraph_node(block))
-        elif block_type == block_type_header:
-            children_nodes.append(create_header_node(block))
-        elif block_type == block_type_code:
-            children_nodes.append(create_code_node(block))
-        elif block_type == block_type_quote:
-            children_nodes.append(create_quote_node(block))
-        elif block_type == block_type_unordered_list:
-            children_nodes.append(create_unordered_list_node(block))
-        elif block_type == block_type_ordered_list:
-            children_nodes.append(create_ordered_list_node(block))
-
-    return ParentNode("div", children_nodes)
+    title = None
+
+    with profiler.span("parse_markdown"):
+        for block_type, content, line, text in scan_blocks(markdown.split("\n")):
+            if title is None and block_type == block_type_header and content[0] == 1:
+                title = content[1]
+            children_nodes.append(memoized_block_node(block_type, content, text, references, terms, line))
+
+    return ParentNode("div", children_nodes), title
+
+def stream_document(lines, references=None, terms=None):
+    # markdown_to_document() for pages too large to hold as one tree: yields
+    # the body's opening tag, the node of each block as it is read from
+    # lines, then the closing tag, so only one block is in memory at a time
+    yield "<div>"
+    empty = True
+    for block_type, content, line, text in scan_blocks(lines):
+        empty = False
+        yield memoized_block_node(block_type, content, text, references, terms, line)
+    if empty:
+        raise ValueError("Parent node has no children")
+    yield "</div>"
+
+def markdown_to_html_node(markdown):
+    return markdown_to_document(markdown)[0]
+
+def first_title(lines):
+    # Stops reading lines at the first h1
+    for block_type, content, _, _ in scan_blocks(lines):
+        if block_type == block_type_header and content[0] == 1:
+            return content[1]
+    return None
 
 def extract_title(markdown):
-    title = re.findall("# (.*)", markdown)
-    if len(title) == 0:
+    title = first_title(markdown.split("\n"))
+    if title is None:
         raise Exception("No title found in markdown")
-    
-    return title[0]
\ No newline at end of file
+    return title
@@ -0,0 +1,30 @@
+import json
+import os
+
+class PageIndex:
+    # Entries by source file, kept as JSON in the build cache. An unreadable
+    # file is ignored, and the index is rebuilt by the next build
+    description = "page index"
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as index_file:
+                self.pages = json.load(index_file)["pages"]
+        except (OSError, ValueError, KeyError):
+            print(f"Ignoring unreadable {self.description} {self.path}")
+            self.pages = {}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as index_file:
+            json.dump({"pages": self.pages}, index_file, sort_keys=True)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,98 @@
+import json
+import os
+import textnode
+from manifest import hash_bytes, generator_version, file_signature
+
+class ParseCache:
+    # Rendered page bodies stored one file per markdown hash, so a page whose
+    # markdown is unchanged skips parsing even when it has to be written
+    # again. Entries are shared by worker processes through the file system;
+    # a hit refreshes the file's mtime, which trim() uses as the LRU order
+    def __init__(self, directory, max_bytes, version=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if version is None:
+            # Both inline parsers should agree, but a cached page must never
+            # depend on which one happened to render it
+            version = f"{generator_version()}:{textnode.inline_parser}"
+        self.version = version
+
+    def entry_path(self, markdown, context=""):
+        # context holds anything else the body depends on
+        key = hash_bytes(f"{self.version}\n{context}\n{markdown}".encode())
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, markdown, context=""):
+        path = self.entry_path(markdown, context)
+        try:
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+            html, title, files, terms = entry["html"], entry["title"], entry["files"], entry.get("terms")
+            links = entry.get("links", [])
+            # The body also depends on the files it read, such as image sizes
+            # and their signatures come back from JSON as lists
+            changed = any([file_signature(file) != (tuple(signature) if signature is not None else None) for file, signature in files])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            # A damaged entry is a miss; it is rewritten by the next put()
+            self.discard(path)
+            return None
+
+        if entry.get("version") != self.version or not isinstance(html, str):
+            self.discard(path)
+            return None
+        if changed:
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return html, title, [file for file, _ in files], terms, links
+
+    def put(self, markdown, html, title, files=(), context="", terms=None, links=()):
+        # terms are the page's search terms, or None when it wasn't indexed,
+        # and links the [url, line] of every link and image
+        path = self.entry_path(markdown, context)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as entry_file:
+            signatures = [(file, file_signature(file)) for file in files]
+            if terms is not None:
+                terms = sorted(terms)
+            json.dump({"version": self.version, "html": html, "title": title, "files": signatures, "terms": terms, "links": list(links)}, entry_file)
+        os.replace(temporary_path, path)
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def trim(self):
+        # Removes the least recently used entries until the cache fits in
+        # max_bytes
+        if not os.path.exists(self.directory):
+            return 0
+
+        entries = []
+        total = 0
+        for directory, _, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(directory, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
+            removed += 1
+        return removed
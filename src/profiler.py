@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+
+# Instrumented code calls span() unconditionally; while profiling is off it
+# returns a shared no-op object, so the cost is one call and a flag check
+enabled = False
+events = []
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def set(self, **args):
+        pass
+
+null_span = NullSpan()
+
+class Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exception):
+        end = time.perf_counter_ns()
+        events.append((self.name, self.start, end - self.start, os.getpid(), threading.get_ident(), self.args))
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+def span(name, **args):
+    if not enabled:
+        return null_span
+    return Span(name, args)
+
+def set_enabled(value):
+    global enabled
+    enabled = value
+
+def take_events():
+    # Hands the recorded events over, e.g. from a worker back to the parent
+    taken = events[:]
+    events.clear()
+    return taken
+
+def add_events(new_events):
+    events.extend(new_events)
+
+def self_times(recorded):
+    # Time spent in each event minus the time spent in events nested inside
+    # it on the same thread
+    ordered = sorted(recorded, key=lambda event: (event[3], event[4], event[1], -event[2]))
+    child_time = [0] * len(ordered)
+    stack = []
+    for index, event in enumerate(ordered):
+        while len(stack) > 0:
+            parent = ordered[stack[-1]]
+            if parent[3:5] == event[3:5] and event[1] + event[2] <= parent[1] + parent[2]:
+                break
+            stack.pop()
+        if len(stack) > 0:
+            child_time[stack[-1]] += event[2]
+        stack.append(index)
+    return [(event, event[2] - child) for event, child in zip(ordered, child_time)]
+
+def stage_totals(recorded):
+    totals = {}
+    for event, self_time in self_times(recorded):
+        count, total, exclusive = totals.get(event[0], (0, 0, 0))
+        totals[event[0]] = (count + 1, total + event[2], exclusive + self_time)
+    return totals
+
+def print_report(recorded, top=10):
+    print("Stage totals (total includes nested stages, self does not):")
+    print(f"  {'stage':<24} {'calls':>8} {'total ms':>12} {'self ms':>12}")
+    totals = stage_totals(recorded)
+    for name, (count, total, exclusive) in sorted(totals.items(), key=lambda item: item[1][2], reverse=True):
+        print(f"  {name:<24} {count:>8} {total / 1e6:>12.2f} {exclusive / 1e6:>12.2f}")
+
+    pages = [event for event in recorded if event[0] == "generate_page"]
+    bytes_in = sum([event[5].get("bytes_in", 0) for event in pages])
+    bytes_out = sum([event[5].get("bytes_out", 0) for event in pages])
+    print(f"Pages: {len(pages)}, {bytes_in} bytes in, {bytes_out} bytes out")
+
+    print(f"Slowest {min(top, len(pages))} pages:")
+    for event in sorted(pages, key=lambda event: event[2], reverse=True)[:top]:
+        args = event[5]
+        print(f"  {event[2] / 1e6:>10.2f} ms  {args.get('bytes_in', 0):>10} B in  {args.get('bytes_out', 0):>10} B out  {args.get('page')}")
+
+def write_trace(path, recorded):
+    # Chrome trace event format, viewable in chrome://tracing or Perfetto
+    origin = min([event[1] for event in recorded], default=0)
+    trace_events = []
+    for name, start, duration, pid, tid, args in recorded:
+        trace_events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - origin) / 1000,
+            "dur": duration / 1000,
+            "pid": pid,
+            "tid": tid,
+            "args": args,
+        })
+
+    directory = os.path.dirname(path)
+    if directory != "" and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, "w") as trace_file:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, trace_file)
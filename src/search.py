@@ -0,0 +1,113 @@
+import json
+import os
+import re
+from htmlnode import LeafNode
+from sync import replace_if_changed
+from compress import update_compressed, compressed_path
+from page_index import PageIndex
+
+term_pattern = re.compile(r"\w{2,}")
+stop_words = {
+    "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has",
+    "have", "he", "her", "his", "if", "in", "into", "is", "it", "its", "of",
+    "on", "or", "she", "so", "than", "that", "the", "their", "them", "then",
+    "there", "these", "they", "this", "to", "was", "we", "were", "which",
+    "will", "with", "you",
+}
+shard_prefix_length = 2
+pages_name = "pages.json"
+
+# Set with set_indexing(); when off no terms are collected
+indexing = False
+
+def set_indexing(value):
+    global indexing
+    indexing = value
+
+def text_terms(text):
+    terms = set()
+    for match in term_pattern.finditer(text.lower()):
+        if match.group(0) not in stop_words:
+            terms.add(match.group(0))
+    return terms
+
+def node_terms(node):
+    # Terms of the text nodes in a block's HTML tree. Leaf values are text
+    # and attributes such as URLs are left out
+    terms = set()
+    stack = [node]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, LeafNode):
+            terms.update(text_terms(node.value))
+            if node.tag == "img" and node.props is not None and "alt" in node.props:
+                terms.update(text_terms(node.props["alt"]))
+        elif node.children is not None:
+            stack.extend(node.children)
+    return terms
+
+def shard_name(term):
+    return term[:shard_prefix_length]
+
+class SearchIndex(PageIndex):
+    # The terms of every page by source file, kept in the build cache so a
+    # build only has to parse the pages that changed. Every page keeps its id
+    # until it is removed, so changing a few pages only rewrites the shards
+    # holding their terms
+    description = "search index"
+
+    def update(self, source_path, url, title, terms):
+        entry = self.pages.get(source_path)
+        page_id = entry["id"] if entry is not None else self.free_id()
+        self.pages[source_path] = {"id": page_id, "url": url, "title": title, "terms": sorted(terms)}
+
+    def remove(self, source_path):
+        self.pages.pop(source_path, None)
+
+    def free_id(self):
+        used = set([entry["id"] for entry in self.pages.values()])
+        page_id = 0
+        while page_id in used:
+            page_id += 1
+        return page_id
+
+    def shards(self):
+        shards = {}
+        for entry in self.pages.values():
+            for term in entry["terms"]:
+                shard = shards.setdefault(shard_name(term), {})
+                shard.setdefault(term, []).append(entry["id"])
+        for shard in shards.values():
+            for ids in shard.values():
+                ids.sort()
+        return shards
+
+    def write(self, directory):
+        # Writes pages.json, listing [url, title] by page id and the shard
+        # names, and one <prefix>.json per shard mapping terms to page ids.
+        # Files whose content didn't change are left alone
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        shards = self.shards()
+        pages = [None] * (max([entry["id"] for entry in self.pages.values()], default=-1) + 1)
+        for entry in self.pages.values():
+            pages[entry["id"]] = [entry["url"], entry["title"]]
+
+        files = {pages_name: {"pages": pages, "shards": sorted(shards)}}
+        for name, shard in shards.items():
+            files[f"{name}.json"] = shard
+        for name, data in files.items():
+            write_json(os.path.join(directory, name), data)
+
+        kept = set(files) | set([compressed_path(name) for name in files])
+        for name in os.listdir(directory):
+            if name not in kept:
+                os.remove(os.path.join(directory, name))
+
+def write_json(path, data):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as json_file:
+        json.dump(data, json_file, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    replace_if_changed(temporary_path, path)
+    update_compressed(path)
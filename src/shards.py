@@ -0,0 +1,98 @@
+import os
+from content import walk_content, entry_type_page
+from sync import copy_file, files_equal, remove_empty_directories
+
+def parse_shard(text):
+    # "i/N" for shard i of N, counting from 1
+    index, separator, count = text.partition("/")
+    if separator == "" or not index.isdigit() or not count.isdigit():
+        raise Exception(f"Invalid shard {text}: expected i/N, like 1/4")
+    index, count = int(index), int(count)
+    if count < 1 or index < 1 or index > count:
+        raise Exception(f"Invalid shard {text}: i must be between 1 and N")
+    return index, count
+
+def assign_shards(sizes, count):
+    # Spreads pages over count shards so each gets about the same number of
+    # bytes: largest first, each to the shard with the fewest bytes so far.
+    # Ties are broken by path and shard number, so every machine computes
+    # the same assignment from the same content
+    loads = [0] * count
+    shards = {}
+    for path, size in sorted(sizes.items(), key=lambda item: (-item[1], item[0])):
+        shard = min(range(count), key=lambda index: (loads[index], index))
+        shards[path] = shard + 1
+        loads[shard] += size
+    return shards
+
+def shard_pages(source_path, index, count):
+    # The pages of source_path that shard index of count generates
+    sizes = {}
+    for entry_type, source_file_path, _ in walk_content(source_path):
+        if entry_type == entry_type_page:
+            sizes[source_file_path] = os.path.getsize(source_file_path)
+    return set([path for path, shard in assign_shards(sizes, count).items() if shard == index])
+
+def shard_path(shards_path, index):
+    return os.path.join(shards_path, str(index))
+
+def rebase(path, root, new_root):
+    return os.path.normpath(os.path.join(new_root, os.path.relpath(path, root)))
+
+def merge_manifest(manifest, shard_manifest, shard_public_path, destination_path, routes):
+    # Adds a shard's pages and files to manifest with their paths moved from
+    # the shard's output to destination_path. routes maps every output page
+    # merged so far to its source, to catch two shards generating one route
+    for source_path, entry in shard_manifest.pages.items():
+        output_path = rebase(entry["output"], shard_public_path, destination_path)
+        if output_path in routes and routes[output_path] != source_path:
+            raise Exception(f"Route collision: {output_path} is generated from both {routes[output_path]} and {source_path}")
+        routes[output_path] = source_path
+        manifest.pages[source_path] = dict(entry, output=output_path)
+        if "listing" in entry:
+            manifest.pages[source_path]["listing"] = [rebase(path, shard_public_path, destination_path) for path in entry["listing"]]
+    for output_path, source_path in shard_manifest.assets.items():
+        manifest.assets[rebase(output_path, shard_public_path, destination_path)] = source_path
+    for source_path, fingerprint in shard_manifest.fingerprints.items():
+        manifest.fingerprints[source_path] = fingerprint[:3] + [rebase(fingerprint[3], shard_public_path, destination_path)]
+    for output_path, mtime in shard_manifest.incompressible.items():
+        manifest.incompressible[rebase(output_path, shard_public_path, destination_path)] = mtime
+
+def merge_outputs(shard_public_paths, destination_path, skip=()):
+    # Copies every shard's output into destination_path. Files more than one
+    # shard wrote, such as static files, must be identical. Unchanged files
+    # are left alone, and files no shard wrote are removed, except under the
+    # relative directories in skip
+    merged = {}
+    for shard_public_path in shard_public_paths:
+        for directory, _, files in os.walk(shard_public_path):
+            for file in files:
+                path = os.path.join(directory, file)
+                relative_path = os.path.relpath(path, shard_public_path)
+                if any([relative_path.startswith(os.path.join(prefix, "")) for prefix in skip]):
+                    continue
+                if relative_path in merged:
+                    if not files_equal(merged[relative_path], path):
+                        raise Exception(f"Shards disagree on {relative_path}: {merged[relative_path]} and {path} differ")
+                    continue
+                merged[relative_path] = path
+
+    for relative_path, path in sorted(merged.items()):
+        destination_file_path = os.path.join(destination_path, relative_path)
+        if os.path.isfile(destination_file_path) and files_equal(path, destination_file_path):
+            continue
+        os.makedirs(os.path.dirname(destination_file_path), exist_ok=True)
+        print(f"Copying file: {destination_file_path}")
+        copy_file(path, destination_file_path)
+
+    if not os.path.exists(destination_path):
+        return
+    for directory, _, files in os.walk(destination_path, topdown=False):
+        for file in files:
+            path = os.path.join(directory, file)
+            relative_path = os.path.relpath(path, destination_path)
+            if relative_path in merged or any([relative_path.startswith(os.path.join(prefix, "")) for prefix in skip]):
+                continue
+            print(f"Removing file: {path}")
+            os.remove(path)
+        remove_empty_directories(directory, destination_path)
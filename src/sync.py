@@ -0,0 +1,173 @@
+import fcntl
+import os
+import shutil
+from manifest import hash_file
+from compress import remove_compressed
+
+link_mode_copy = "copy"
+link_mode_hardlink = "hardlink"
+link_mode_reflink = "reflink"
+link_modes = [link_mode_copy, link_mode_hardlink, link_mode_reflink]
+
+# ioctl request number for FICLONE from linux/fs.h
+ficlone = 0x40049409
+
+def files_match(source_path, destination_path, checksum=False):
+    if not os.path.exists(destination_path):
+        return False
+
+    source_stat = os.stat(source_path)
+    destination_stat = os.stat(destination_path)
+    if source_stat.st_ino == destination_stat.st_ino and source_stat.st_dev == destination_stat.st_dev:
+        return True
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(source_path) == hash_file(destination_path)
+    return source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+
+def copy_file_contents(source_file, destination_file, link_mode):
+    if link_mode == link_mode_reflink:
+        try:
+            fcntl.ioctl(destination_file.fileno(), ficlone, source_file.fileno())
+            return
+        except OSError:
+            pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while os.copy_file_range(source_file.fileno(), destination_file.fileno(), 1 << 30) > 0:
+                pass
+            return
+        except OSError:
+            destination_file.seek(0)
+            destination_file.truncate()
+            source_file.seek(0)
+
+    shutil.copyfileobj(source_file, destination_file)
+
+def copy_file(source_path, destination_path, link_mode=link_mode_copy):
+    temporary_path = f"{destination_path}.tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    if link_mode == link_mode_hardlink:
+        try:
+            os.link(source_path, temporary_path)
+            os.replace(temporary_path, destination_path)
+            return
+        except OSError:
+            # Different filesystem or links not supported: fall back to copying
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    with open(source_path, "rb") as source_file, open(temporary_path, "wb") as destination_file:
+        copy_file_contents(source_file, destination_file, link_mode)
+    shutil.copystat(source_path, temporary_path)
+    os.replace(temporary_path, destination_path)
+
+def files_equal(first_path, second_path):
+    if os.path.getsize(first_path) != os.path.getsize(second_path):
+        return False
+    with open(first_path, "rb") as first_file, open(second_path, "rb") as second_file:
+        while True:
+            first_chunk = first_file.read(1 << 16)
+            if first_chunk != second_file.read(1 << 16):
+                return False
+            if first_chunk == b"":
+                return True
+
+def replace_if_changed(temporary_path, destination_path):
+    # Moves a freshly written file into place, unless it is identical to the
+    # file already there: that one is kept along with its mtime, so unchanged
+    # output isn't picked up again by rsync or uploads
+    if os.path.isfile(destination_path) and files_equal(temporary_path, destination_path):
+        os.remove(temporary_path)
+        return False
+    os.replace(temporary_path, destination_path)
+    return True
+
+def remove_empty_directories(directory, root):
+    root = os.path.normpath(root)
+    directory = os.path.normpath(directory)
+    while directory != root and os.path.isdir(directory) and len(os.listdir(directory)) == 0:
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+def sync_tree(source_path, destination_path, checksum, link_mode, synced):
+    if not os.path.exists(destination_path):
+        print(f"Creating directory: {destination_path}")
+        os.makedirs(destination_path)
+
+    with os.scandir(source_path) as entries:
+        for entry in entries:
+            destination_file_path = os.path.join(destination_path, entry.name)
+            if entry.is_dir():
+                sync_tree(entry.path, destination_file_path, checksum, link_mode, synced)
+                continue
+
+            synced[os.path.normpath(destination_file_path)] = entry.path
+            if files_match(entry.path, destination_file_path, checksum):
+                continue
+
+            print(f"Copying file: {destination_file_path}")
+            copy_file(entry.path, destination_file_path, link_mode)
+
+def sync_file(source_file_path, source_path, destination_path, manifest=None, checksum=False, link_mode=link_mode_copy):
+    relative_path = os.path.relpath(source_file_path, source_path)
+    destination_file_path = os.path.normpath(os.path.join(destination_path, relative_path))
+
+    if not os.path.isfile(source_file_path):
+        if manifest is not None and destination_file_path not in manifest.assets:
+            return
+        if os.path.exists(destination_file_path):
+            print(f"Removing file: {destination_file_path}")
+            os.remove(destination_file_path)
+        remove_compressed(destination_file_path)
+        remove_empty_directories(os.path.dirname(destination_file_path), destination_path)
+        if manifest is not None:
+            del manifest.assets[destination_file_path]
+        return
+
+    directory = os.path.dirname(destination_file_path)
+    if not os.path.exists(directory):
+        print(f"Creating directory: {directory}")
+        os.makedirs(directory)
+
+    if manifest is not None:
+        manifest.assets[destination_file_path] = source_file_path
+    if files_match(source_file_path, destination_file_path, checksum):
+        return
+
+    print(f"Copying file: {destination_file_path}")
+    copy_file(source_file_path, destination_file_path, link_mode)
+
+def sync_directory(source_path, destination_path, manifest=None, checksum=False, link_mode=link_mode_copy):
+    if not os.path.exists(source_path):
+        raise Exception("Source path does not exist")
+    if link_mode not in link_modes:
+        raise ValueError(f"Invalid link mode: {link_mode}")
+
+    synced = {}
+    sync_tree(source_path, destination_path, checksum, link_mode, synced)
+
+    if manifest is None:
+        return synced
+
+    manifest.assets.update(synced)
+    remove_orphans(manifest, source_path, destination_path, set(synced.values()))
+    return synced
+
+def remove_orphans(manifest, source_path, destination_path, seen_sources):
+    # Only files previously copied from source_path are orphans; generated
+    # pages and files copied from other sources are left alone
+    source_prefix = os.path.join(source_path, "")
+    for orphan, source_file_path in list(manifest.assets.items()):
+        if not source_file_path.startswith(source_prefix) or source_file_path in seen_sources:
+            continue
+        if os.path.exists(orphan):
+            print(f"Removing file: {orphan}")
+            os.remove(orphan)
+        remove_compressed(orphan)
+        remove_empty_directories(os.path.dirname(orphan), destination_path)
+        del manifest.assets[orphan]
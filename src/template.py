@@ -0,0 +1,174 @@
+import bisect
+import io
+import os
+import re
+from htmlnode import HTMLNode, write_html
+from manifest import file_signature
+import assets
+
+slot_pattern = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+include_pattern = re.compile(r"\{\{>\s*([\w./-]+)\s*\}\}")
+
+class Template:
+    def __init__(self, source, path=None, dependencies=()):
+        self.path = path
+        # Every partial included into the source, directly or not
+        self.dependencies = list(dependencies)
+        # Static text and slot names alternate: segments[i] is followed by
+        # slots[i], and the last segment closes the template
+        self.segments = []
+        self.slots = []
+
+        position = 0
+        for match in slot_pattern.finditer(source):
+            self.segments.append(source[position:match.start()])
+            self.slots.append(match.group(1).lower())
+            position = match.end()
+        self.segments.append(source[position:])
+
+    def pieces(self, values):
+        for segment, slot in zip(self.segments, self.slots):
+            yield segment
+            yield values.get(slot, "")
+        yield self.segments[-1]
+
+    def render(self, values):
+        stream = io.StringIO()
+        self.write(stream, values)
+        return stream.getvalue()
+
+    def write(self, stream, values):
+        # A value is text, an HTMLNode, or an iterable of either that is
+        # written as it is produced
+        for piece in self.pieces(values):
+            write_piece(piece, stream)
+
+def write_piece(piece, stream):
+    if isinstance(piece, str):
+        stream.write(piece)
+    elif isinstance(piece, HTMLNode):
+        write_html(piece, stream)
+    else:
+        for part in piece:
+            write_piece(part, stream)
+
+def partial_path(partials_path, name, extension):
+    if os.path.splitext(name)[1] == "":
+        name += extension
+    return os.path.join(partials_path, name)
+
+def read_partial(path, partials_path, extension, including, line_map=None):
+    if path in including:
+        raise Exception(f"Include cycle: {' -> '.join(including + (path,))}")
+    if not os.path.exists(path):
+        raise Exception(f"Partial file {path} included from {including[-1]} does not exist")
+
+    with open(path) as partial_file:
+        return expand_includes(partial_file.read(), partials_path, extension, including + (path,), line_map)
+
+def expand_includes(source, partials_path, extension, including=("<source>",), line_map=None):
+    # Replaces every {{> name }} with the partial of that name, expanding
+    # includes inside partials too. Returns the text and the paths of every
+    # partial it was built from; including is the chain of files being
+    # expanded, used to report cycles. When line_map is a list, segments
+    # [first line, file, line in file] are added to it: the lines of the text
+    # from first line on come from file, counting from line in file, up to
+    # the next segment
+    pieces = []
+    dependencies = []
+    position = 0
+    line = source_line = 1
+    if line_map is not None:
+        line_map.append([1, including[-1], 1])
+    for match in include_pattern.finditer(source):
+        path = partial_path(partials_path, match.group(1), extension)
+        nested_map = [] if line_map is not None else None
+        text, nested = read_partial(path, partials_path, extension, including, nested_map)
+        if line_map is not None:
+            # A partial starts on the line of its include
+            skipped = source.count("\n", position, match.start())
+            line += skipped
+            source_line += skipped
+            line_map.extend([[start + line - 1, file, file_line] for start, file, file_line in nested_map])
+            # The text after the include shares the partial's last line, which
+            # is counted as the partial's unless the partial ends in a newline
+            line += text.count("\n")
+            if text == "" or text.endswith("\n"):
+                line_map.append([line, including[-1], source_line])
+            else:
+                line_map.append([line + 1, including[-1], source_line + 1])
+        pieces.append(source[position:match.start()])
+        pieces.append(text)
+        dependencies.append(path)
+        dependencies.extend(nested)
+        position = match.end()
+
+    if position == 0:
+        return source, []
+    pieces.append(source[position:])
+    return "".join(pieces), list(dict.fromkeys(dependencies))
+
+def expand_line_includes(lines, partials_path, extension, including, dependencies, line_map=None):
+    # expand_includes() a line at a time, for sources read as a stream of
+    # lines. The partials used are added to dependencies, and segments to
+    # line_map as expand_includes() adds them
+    line = 0
+    if line_map is not None:
+        line_map.append([1, including[-1], 1])
+    for source_line, text in enumerate(lines, 1):
+        text = text.rstrip("\n")
+        if "{{>" not in text:
+            line += 1
+            yield text
+            continue
+        nested_map = [] if line_map is not None else None
+        text, nested = expand_includes(text, partials_path, extension, including, nested_map)
+        dependencies.extend(nested)
+        expanded = text.split("\n")
+        if line_map is not None:
+            for start, file, file_line in nested_map:
+                if file == including[-1]:
+                    file_line += source_line - 1
+                line_map.append([start + line, file, file_line])
+            line_map.append([line + len(expanded) + 1, including[-1], source_line + 1])
+        line += len(expanded)
+        yield from expanded
+
+def line_origin(line_map, line):
+    # The file and line a line of expanded text was written on
+    starts = [segment[0] for segment in line_map]
+    start, file, file_line = line_map[bisect.bisect_right(starts, line) - 1]
+    return file, file_line + line - start
+
+template_cache = {}
+
+def load_template(path, partials_path=None):
+    if not os.path.exists(path):
+        raise Exception(f"Template file {path} does not exist")
+
+    # A cached template is reused only while neither it nor any partial it
+    # includes has changed, and while the asset URLs are the same
+    key = (path, partials_path, assets.asset_version)
+    cached = template_cache.get(key)
+    if cached is not None and all([file_signature(file) == signature for file, signature in cached[0]]):
+        return cached[1]
+
+    with open(path) as template_file:
+        source = template_file.read()
+    dependencies = []
+    if partials_path is not None:
+        source, dependencies = expand_includes(source, partials_path, ".html", (path,))
+    source, asset_sources = assets.rewrite_html_urls(source)
+    template = Template(source, path, dependencies + asset_sources)
+    signatures = [(file, file_signature(file)) for file in [path] + dependencies]
+    template_cache[key] = (signatures, template)
+    return template
+
+def layout_path(template_path, layout):
+    # Named layouts live in a layouts directory next to the default template
+    return os.path.join(os.path.dirname(template_path), "layouts", f"{layout}.html")
+
+def partials_path_for(template_path):
+    # Partials shared by templates, layouts and pages live in a partials
+    # directory next to the default template
+    return os.path.join(os.path.dirname(template_path), "partials")
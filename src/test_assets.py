@@ -0,0 +1,99 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import assets
+from assets import fingerprint_assets, rewrite_html_urls, rewrite_url, set_asset_urls
+from manifest import BuildManifest
+from sync import sync_directory
+
+class TestRewriteUrls(unittest.TestCase):
+    def setUp(self):
+        set_asset_urls({"/index.css": ("/index.0123abcd.css", "static/index.css")})
+
+    def tearDown(self):
+        set_asset_urls({})
+
+    def test_rewrite_url_keeps_query_and_fragment(self):
+        self.assertEqual(rewrite_url("/index.css?v=1#top"), ("/index.0123abcd.css?v=1#top", "static/index.css"))
+        self.assertEqual(rewrite_url("/other.css"), ("/other.css", None))
+        self.assertEqual(rewrite_url("index.css"), ("index.css", None))
+        self.assertEqual(rewrite_url("//cdn.example.com/index.css"), ("//cdn.example.com/index.css", None))
+
+    def test_rewrite_html_urls(self):
+        html = "<link href=\"/index.css\" rel=\"stylesheet\"><a href='/index.css'>css</a><img src=\"/photo.png\">"
+
+        self.assertEqual(rewrite_html_urls(html), (
+            "<link href=\"/index.0123abcd.css\" rel=\"stylesheet\"><a href='/index.0123abcd.css'>css</a><img src=\"/photo.png\">",
+            ["static/index.css"],
+        ))
+
+    def test_no_assets(self):
+        set_asset_urls({})
+
+        self.assertEqual(rewrite_html_urls("<link href=\"/index.css\">"), ("<link href=\"/index.css\">", []))
+        self.assertEqual(assets.asset_version, "")
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.directory.name, "static")
+        self.public = os.path.join(self.directory.name, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        self.write(os.path.join(self.static, "images", "photo.png"), "png")
+        self.write(os.path.join(self.static, "404.html"), "<p>missing</p>")
+        self.manifest = BuildManifest(os.path.join(self.directory.name, "manifest.json"), "test")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def fingerprint(self, enabled=True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_directory(self.static, self.public, self.manifest)
+            return fingerprint_assets(self.static, self.public, self.manifest, enabled)
+
+    def test_fingerprinted_copies_and_asset_manifest(self):
+        urls = self.fingerprint()
+        css_url = urls["/index.css"][0]
+
+        self.assertRegex(css_url, r"^/index\.[0-9a-f]{8}\.css$")
+        self.assertEqual(urls["/index.css"][1], os.path.join(self.static, "index.css"))
+        self.assertRegex(urls["/images/photo.png"][0], r"^/images/photo\.[0-9a-f]{8}\.png$")
+        self.assertNotIn("/404.html", urls)
+        with open(os.path.join(self.public, css_url.lstrip("/"))) as file:
+            self.assertEqual(file.read(), "body { color: red; }")
+        with open(os.path.join(self.public, "asset-manifest.json")) as file:
+            self.assertEqual(json.load(file)["/index.css"], css_url)
+
+    def test_unchanged_asset_keeps_its_name(self):
+        first = self.fingerprint()
+
+        self.assertEqual(self.fingerprint(), first)
+
+    def test_changed_asset_replaces_old_copy(self):
+        old_url = self.fingerprint()["/index.css"][0]
+        self.write(os.path.join(self.static, "index.css"), "body { color: blue; }")
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 10**9))
+        new_url = self.fingerprint()["/index.css"][0]
+
+        self.assertNotEqual(new_url, old_url)
+        self.assertFalse(os.path.exists(os.path.join(self.public, old_url.lstrip("/"))))
+        self.assertTrue(os.path.exists(os.path.join(self.public, new_url.lstrip("/"))))
+
+    def test_disabled_removes_copies(self):
+        url = self.fingerprint()["/index.css"][0]
+        self.assertEqual(self.fingerprint(False), {})
+
+        self.assertFalse(os.path.exists(os.path.join(self.public, url.lstrip("/"))))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "asset-manifest.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+if __name__ == "__main__":
+    unittest.main()
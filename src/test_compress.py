@@ -0,0 +1,69 @@
+import gzip
+import os
+import tempfile
+import unittest
+import compress
+from compress import update_compressed, compressed_path
+
+class TestUpdateCompressed(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        compress.set_precompress(True)
+
+    def tearDown(self):
+        compress.set_precompress(False)
+        self.directory.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_writes_deterministic_gzip(self):
+        path = self.write("index.html", b"<p>hello</p>" * 100)
+
+        self.assertEqual(update_compressed(path), compress.compressed_written)
+        with open(compressed_path(path), "rb") as file:
+            data = file.read()
+        self.assertEqual(gzip.decompress(data), b"<p>hello</p>" * 100)
+        self.assertEqual(data, gzip.compress(b"<p>hello</p>" * 100, 9, mtime=0))
+        self.assertEqual(os.stat(compressed_path(path)).st_mtime_ns, os.stat(path).st_mtime_ns)
+
+    def test_unchanged_file_is_not_compressed_again(self):
+        path = self.write("index.css", b"body { color: red; }\n" * 50)
+        update_compressed(path)
+
+        self.assertEqual(update_compressed(path), compress.compressed_current)
+
+        self.write("index.css", b"body { color: blue; }\n" * 50)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000000))
+        self.assertEqual(update_compressed(path), compress.compressed_written)
+        with open(compressed_path(path), "rb") as file:
+            self.assertEqual(gzip.decompress(file.read()), b"body { color: blue; }\n" * 50)
+
+    def test_skips_incompressible_types_and_small_files(self):
+        image = self.write("photo.png", b"\x89PNG" * 200)
+        small = self.write("small.html", b"<p>hi</p>")
+
+        self.assertEqual(update_compressed(image), compress.compressed_skipped)
+        self.assertEqual(update_compressed(small), compress.compressed_not_worth)
+        self.assertFalse(os.path.exists(compressed_path(image)))
+        self.assertFalse(os.path.exists(compressed_path(small)))
+
+    def test_random_data_is_not_worth_it(self):
+        path = self.write("data.json", os.urandom(4096))
+
+        self.assertEqual(update_compressed(path), compress.compressed_not_worth)
+        self.assertFalse(os.path.exists(compressed_path(path)))
+
+    def test_disabled_removes_stale_gzip(self):
+        path = self.write("index.html", b"<p>hello</p>" * 100)
+        update_compressed(path)
+        compress.set_precompress(False)
+
+        self.assertEqual(update_compressed(path), compress.compressed_skipped)
+        self.assertFalse(os.path.exists(compressed_path(path)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from content import walk_content, page_route, entry_type_page, entry_type_asset
+
+class TestPageRoute(unittest.TestCase):
+    def test_root_index(self):
+        self.assertEqual(page_route("index.md"), "")
+
+    def test_page(self):
+        self.assertEqual(page_route("majesty.md"), "majesty")
+
+    def test_nested_index(self):
+        self.assertEqual(page_route(os.path.join("blog", "index.md")), "blog")
+
+    def test_nested_page(self):
+        self.assertEqual(page_route(os.path.join("blog", "post.md")), os.path.join("blog", "post"))
+
+    def test_index_in_name(self):
+        self.assertEqual(page_route("reindex.md"), "reindex")
+
+class TestWalkContent(unittest.TestCase):
+    def test_walk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for path in ["index.md", "about.md", "blog/index.md", "blog/2024/post.md", "blog/diagram.png", ".hidden.md"]:
+                full_path = os.path.join(directory, path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "w") as file:
+                    file.write("# Title")
+
+            expected = [
+                (entry_type_page, os.path.join(directory, "about.md"), "about"),
+                (entry_type_page, os.path.join(directory, "blog", "2024", "post.md"), os.path.join("blog", "2024", "post")),
+                (entry_type_asset, os.path.join(directory, "blog", "diagram.png"), os.path.join("blog", "diagram.png")),
+                (entry_type_page, os.path.join(directory, "blog", "index.md"), "blog"),
+                (entry_type_page, os.path.join(directory, "index.md"), ""),
+            ]
+
+            self.assertListEqual(list(walk_content(directory)), expected)
+
+    def test_is_lazy(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "index.md"), "w") as file:
+                file.write("# Title")
+
+            walker = walk_content(directory)
+
+            self.assertEqual(next(walker)[2], "")
+            self.assertRaises(StopIteration, next, walker)
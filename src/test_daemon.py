@@ -0,0 +1,82 @@
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from daemon import send, read_messages, answer, serve, request, is_listening
+
+class TestMessages(unittest.TestCase):
+    def test_round_trip(self):
+        left, right = socket.socketpair()
+        with left, right:
+            send(left, {"argv": ["--force"], "paths": []})
+            send(left, {"status": 0})
+            left.shutdown(socket.SHUT_WR)
+            self.assertEqual(list(read_messages(right)), [{"argv": ["--force"], "paths": []}, {"status": 0}])
+
+    def exchange(self, handle):
+        left, right = socket.socketpair()
+        with left, right:
+            send(left, {"argv": ["--force"], "paths": ["/site/content/index.md"]})
+            answer(right, handle)
+            right.shutdown(socket.SHUT_WR)
+            return list(read_messages(left))
+
+    def test_answer_streams_output(self):
+        calls = []
+        def handle(argv, paths):
+            calls.append((argv, paths))
+            print("Generating page")
+        messages = self.exchange(handle)
+
+        self.assertEqual(calls, [(["--force"], ["/site/content/index.md"])])
+        self.assertEqual("".join([message.get("output", "") for message in messages]), "Generating page\n")
+        self.assertEqual(messages[-1], {"status": 0})
+
+    def test_answer_reports_failures(self):
+        def fail(argv, paths):
+            raise Exception("Broken template")
+        messages = self.exchange(fail)
+
+        self.assertIn("Broken template", "".join([message.get("output", "") for message in messages]))
+        self.assertEqual(messages[-1], {"status": 1})
+
+        def exit(argv, paths):
+            raise SystemExit(2)
+        self.assertEqual(self.exchange(exit)[-1], {"status": 2})
+
+class TestServe(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "daemon.sock")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_no_daemon(self):
+        self.assertIsNone(request(self.path, [], [], io.StringIO()))
+
+    def test_request(self):
+        builds = []
+        def handle(argv, paths):
+            builds.append(paths)
+            print(f"Build {len(builds)}")
+        # Keeps the daemon's "Listening on" message out of the test output
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread = threading.Thread(target=serve, args=(self.path, handle), daemon=True)
+            thread.start()
+            while not is_listening(self.path):
+                thread.join(0.01)
+
+            output = io.StringIO()
+            self.assertEqual(request(self.path, [], [], output), 0)
+            self.assertEqual(request(self.path, [], ["/site/content/a.md"], output), 0)
+
+        self.assertEqual(output.getvalue(), "Build 1\nBuild 2\n")
+        self.assertEqual(builds, [[], ["/site/content/a.md"]])
+        self.assertRaises(Exception, serve, self.path, handle)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from devserver import inject_reload_script, reload_script, LiveReload
+
+class TestInjectReloadScript(unittest.TestCase):
+    def test_before_closing_body(self):
+        html = b"<html><body><p>hi</p></body></html>"
+        expected = b"<html><body><p>hi</p>" + reload_script.encode() + b"</body></html>"
+
+        self.assertEqual(inject_reload_script(html), expected)
+
+    def test_without_body(self):
+        html = b"<p>hi</p>"
+        expected = b"<p>hi</p>" + reload_script.encode()
+
+        self.assertEqual(inject_reload_script(html), expected)
+
+class TestLiveReload(unittest.TestCase):
+    def test_wait_times_out_without_change(self):
+        live_reload = LiveReload()
+
+        self.assertEqual(live_reload.wait(0, 0.01), 0)
+
+    def test_notify_advances_generation(self):
+        live_reload = LiveReload()
+        live_reload.notify()
+
+        self.assertEqual(live_reload.wait(0, 0.01), 1)
+
+if __name__ == "__main__":
+    unittest.main()
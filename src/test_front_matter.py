@@ -0,0 +1,54 @@
+import unittest
+import io
+from front_matter import split_front_matter, read_front_matter, template_value
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        markdown = "# Title\n\nBody"
+
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_front_matter(self):
+        markdown = "---\nLayout: post\ntitle: My: Post\n---\n# Title"
+        expected = ({"layout": "post", "title": "My: Post"}, "# Title")
+
+        self.assertEqual(split_front_matter(markdown), expected)
+
+    def test_unclosed_front_matter(self):
+        self.assertRaises(Exception, split_front_matter, "---\nlayout: post\n# Title")
+
+    def test_invalid_line(self):
+        self.assertRaises(Exception, split_front_matter, "---\nlayout\n---\n# Title")
+
+class TestReadFrontMatter(unittest.TestCase):
+    def test_reads_from_file(self):
+        metadata, lines, first_line = read_front_matter(io.StringIO("---\nlayout: post\n---\n# Title\n\nBody\n"))
+
+        self.assertEqual(metadata, {"layout": "post"})
+        self.assertEqual(first_line, 4)
+        self.assertEqual(list(lines), ["# Title\n", "\n", "Body\n"])
+
+    def test_no_front_matter_keeps_first_line(self):
+        metadata, lines, first_line = read_front_matter(io.StringIO("# Title\nBody"))
+
+        self.assertEqual(metadata, {})
+        self.assertEqual(first_line, 1)
+        self.assertEqual(list(lines), ["# Title\n", "Body"])
+
+class TestYamlLite(unittest.TestCase):
+    def test_lists_and_quotes(self):
+        markdown = "---\ntitle: \"Post: One\"\n# a comment\ntags: [rust, 'web dev']\ncategories:\n  - notes\n  - misc\ndate: 2024-03-01\n---\n# Title"
+        metadata, _ = split_front_matter(markdown)
+
+        self.assertEqual(metadata, {"title": "Post: One", "tags": ["rust", "web dev"], "categories": ["notes", "misc"], "date": "2024-03-01"})
+
+    def test_empty_values(self):
+        self.assertEqual(split_front_matter("---\nsummary:\ntags: []\n---\n")[0], {"summary": "", "tags": []})
+
+    def test_item_without_key(self):
+        self.assertRaises(Exception, split_front_matter, "---\n- orphan\n---\n# Title")
+        self.assertRaises(Exception, split_front_matter, "---\ntitle: Post\n- orphan\n---\n# Title")
+
+    def test_template_value(self):
+        self.assertEqual(template_value(["rust", "web"]), "rust, web")
+        self.assertEqual(template_value("post"), "post")
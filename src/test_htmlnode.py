@@ -1,5 +1,7 @@
+import io
+import sys
 import unittest
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, html_chunks, write_html
 
 class TestHTMLNode(unittest.TestCase):
     def test_eq_true(self):
@@ -44,6 +46,15 @@ class TestHTMLNode(unittest.TestCase):
 
         self.assertEqual(node.props_to_html(), expected)
 
+    def test_no_instance_dict(self):
+        for node in [HTMLNode("p"), LeafNode("text"), ParentNode("div", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_repr(self):
+        node = LeafNode("text", "a", {"href": "/"})
+
+        self.assertEqual(repr(node), "HTMLNode(a, text, None, {'href': '/'})")
+
 class TestLeafNode(unittest.TestCase):
     def test_to_html_no_tag(self):
         node = LeafNode("Some test text")
@@ -120,4 +131,55 @@ class TestParentNode(unittest.TestCase):
         children = []
         node = ParentNode("div", children)
 
-        self.assertRaises(ValueError, node.to_html)
\ No newline at end of file
+        self.assertRaises(ValueError, node.to_html)
+class TestWriteHTML(unittest.TestCase):
+    def setUp(self):
+        props = {"href": "https://example.com"}
+        self.node = ParentNode("div", [
+            ParentNode("p", [LeafNode("Hello "), LeafNode("world", "a", props)]),
+            LeafNode("ünïcode", "p")
+        ])
+
+    def test_chunks_match_to_html(self):
+        expected = "<div><p>Hello <a href=\"https://example.com\">world</a></p><p>ünïcode</p></div>"
+
+        self.assertEqual("".join(html_chunks(self.node)), expected)
+        self.assertEqual(self.node.to_html(), expected)
+
+    def test_small_chunks(self):
+        chunks = list(html_chunks(self.node, 1))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), self.node.to_html())
+
+    def test_write_text_stream(self):
+        stream = io.StringIO()
+        write_html(self.node, stream)
+
+        self.assertEqual(stream.getvalue(), self.node.to_html())
+
+    def test_write_bytes_stream(self):
+        stream = io.BytesIO()
+        write_html(self.node, stream, "utf-8")
+
+        self.assertEqual(stream.getvalue(), self.node.to_html().encode("utf-8"))
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode("deep")
+        for _ in range(depth):
+            node = ParentNode("span", [node])
+
+        expected = "<span>" * depth + "deep" + "</span>" * depth
+
+        self.assertEqual(node.to_html(), expected)
+
+    def test_invalid_nested_child(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+
+        self.assertRaises(ValueError, node.to_html)
+
+    def test_base_node_not_implemented(self):
+        node = ParentNode("div", [HTMLNode("p", "text")])
+
+        self.assertRaises(NotImplementedError, node.to_html)
@@ -0,0 +1,72 @@
+import os
+import struct
+import tempfile
+import unittest
+from image_size import read_image_size, image_size
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 10
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    frame = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + frame + b"\xff\xd9"
+
+def webp(chunk, body):
+    data = chunk + struct.pack("<I", len(body)) + body
+    return b"RIFF" + struct.pack("<I", len(data) + 4) + b"WEBP" + data
+
+class TestReadImageSize(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def size_of(self, data):
+        path = os.path.join(self.directory.name, "image")
+        with open(path, "wb") as file:
+            file.write(data)
+        return read_image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png(1344, 896)), (1344, 896))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of(gif(32, 16)), (32, 16))
+
+    def test_jpeg_after_other_segments(self):
+        self.assertEqual(self.size_of(jpeg(640, 480)), (640, 480))
+
+    def test_webp_lossy(self):
+        body = b"\x00" * 3 + b"\x9d\x01\x2a" + struct.pack("<HH", 300, 200)
+        self.assertEqual(self.size_of(webp(b"VP8 ", body)), (300, 200))
+
+    def test_webp_lossless(self):
+        bits = (300 - 1) | ((200 - 1) << 14)
+        self.assertEqual(self.size_of(webp(b"VP8L", b"\x2f" + struct.pack("<I", bits))), (300, 200))
+
+    def test_webp_extended(self):
+        body = b"\x00" * 4 + (300 - 1).to_bytes(3, "little") + (200 - 1).to_bytes(3, "little")
+        self.assertEqual(self.size_of(webp(b"VP8X", body)), (300, 200))
+
+    def test_unknown_and_truncated(self):
+        self.assertIsNone(self.size_of(b"<svg></svg>"))
+        self.assertIsNone(self.size_of(b"\xff\xd8\xff\xe0\x00"))
+        self.assertIsNone(read_image_size(os.path.join(self.directory.name, "missing.png")))
+
+    def test_cached_until_changed(self):
+        path = os.path.join(self.directory.name, "photo.png")
+        with open(path, "wb") as file:
+            file.write(png(10, 20))
+        self.assertEqual(image_size(path), (10, 20))
+
+        with open(path, "wb") as file:
+            file.write(png(30, 40) + b"\x00")
+        self.assertEqual(image_size(path), (30, 40))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import unittest
+from links import link_path, page_url, broken_links
+from manifest import BuildManifest
+
+class TestLinkPath(unittest.TestCase):
+    def test_internal_links(self):
+        self.assertEqual(link_path("/about/", "/blog/post/"), "/about/")
+        self.assertEqual(link_path("../other/#top", "/blog/post/"), "/blog/other/")
+        self.assertEqual(link_path("/images/a%20b.png?v=1", "/"), "/images/a b.png")
+
+    def test_external_links(self):
+        for url in ["https://example.com/", "//cdn.example.com/a.js", "mailto:bilbo@shire.me", "#section"]:
+            self.assertIsNone(link_path(url, "/"))
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join("public", "index.html"), "public"), "/")
+        self.assertEqual(page_url(os.path.join("public", "blog", "index.html"), "public"), "/blog/")
+
+class TestBrokenLinks(unittest.TestCase):
+    def test_reports_missing_pages_and_files(self):
+        manifest = BuildManifest("manifest.json", "test")
+        links = [["/about", 3], ["/about/", 4], ["/missing/", 5], ["/index.css", 6], ["/images/gone.png", 7], ["../", 8]]
+        manifest.record("content/index.md", "a", "template.html", "b", os.path.join("public", "index.html"), links=links)
+        manifest.record("content/about.md", "a", "template.html", "b", os.path.join("public", "about", "index.html"), links=[["other/", 2]])
+        manifest.assets[os.path.join("public", "index.css")] = os.path.join("static", "index.css")
+
+        self.assertEqual(broken_links(manifest, "public"), [
+            ("content/about.md", 2, "other/"),
+            ("content/index.md", 5, "/missing/"),
+            ("content/index.md", 7, "/images/gone.png"),
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from listings import MetadataIndex, read_header, build_listing, listing_node, listing_outputs, listing_title, slug
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.directory.name, "content")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.index = MetadataIndex(os.path.join(self.directory.name, "metadata.json"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.content, name), "w") as file:
+            file.write(text)
+
+    def test_read_header(self):
+        self.write("post.md", "---\ntitle: Post\ntags: [a]\n---\n# Heading")
+        self.write("plain.md", "Intro\n\n# Heading\n\nBody")
+        self.write("broken.md", "---\ntitle: Post\n")
+
+        self.assertEqual(read_header(os.path.join(self.content, "post.md")), ({"title": "Post", "tags": ["a"]}, "Post"))
+        self.assertEqual(read_header(os.path.join(self.content, "plain.md")), ({}, "Heading"))
+        self.assertEqual(read_header(os.path.join(self.content, "broken.md")), ({}, None))
+
+    def test_update_only_reads_changed_pages(self):
+        self.write("index.md", "# Home")
+        self.write(os.path.join("blog", "post.md"), "---\ndate: 2024-01-01\n---\n# Post")
+        self.index.update(self.content)
+        post = os.path.join(self.content, "blog", "post.md")
+        self.assertEqual(self.index.pages[post]["route"], os.path.join("blog", "post"))
+        self.assertEqual(self.index.pages[post]["title"], "Post")
+
+        # An unchanged signature is trusted without reading the file
+        self.index.pages[post]["title"] = "Cached"
+        self.index.update(self.content)
+        self.assertEqual(self.index.pages[post]["title"], "Cached")
+
+        self.write(os.path.join("blog", "post.md"), "---\ndate: 2024-01-01\n---\n# Renamed")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.index.update(self.content)
+        self.assertEqual(self.index.pages[post]["title"], "Renamed")
+        self.assertEqual(list(self.index.pages), [post])
+
+    def test_save_and_load(self):
+        self.write("index.md", "# Home")
+        self.index.update(self.content)
+        self.index.save()
+
+        loaded = MetadataIndex(self.index.path)
+        loaded.load()
+        self.assertEqual(loaded.pages, self.index.pages)
+
+    def test_collection(self):
+        self.write("about.md", "# About")
+        self.write(os.path.join("blog", "index.md"), "---\ncollection: blog\n---\n# Blog")
+        self.write(os.path.join("blog", "b.md"), "# B")
+        self.write(os.path.join("blog", "a.md"), "# A")
+        self.write(os.path.join("blog", "old.md"), "---\ndate: 2020-01-01\n---\n# Old")
+        self.write(os.path.join("blog", "new.md"), "---\ndate: 2024-01-01\n---\n# New")
+        self.index.update(self.content)
+
+        self.assertEqual([entry["title"] for entry in self.index.collection("blog", self.content)], ["New", "Old", "A", "B"])
+        self.assertEqual(len(self.index.collection("/", self.content)), 5)
+        self.assertEqual(self.index.listing_sources(), [os.path.join(self.content, "blog", "index.md")])
+        self.assertIsNone(self.index.listing(os.path.join(self.content, "about.md"), self.content))
+        self.assertEqual(self.index.listing(os.path.join(self.content, "blog", "index.md"), self.content)[0][3][0], ["/blog/new/", "New", "2024-01-01"])
+
+class TestBuildListing(unittest.TestCase):
+    def entry(self, route, title, **metadata):
+        return {"route": route, "title": title, "metadata": metadata}
+
+    def test_pagination(self):
+        entries = [self.entry(f"blog/{number}", f"Post {number}") for number in range(5)]
+        listing = build_listing(entries, {"per_page": "2"}, "blog")
+
+        self.assertEqual([page[0] for page in listing], ["", os.path.join("page", "2"), os.path.join("page", "3")])
+        self.assertEqual(listing[0][3], [["/blog/0/", "Post 0", ""], ["/blog/1/", "Post 1", ""]])
+        self.assertEqual(listing[0][4:], [None, "/blog/page/2/"])
+        self.assertEqual(listing[1][4:], ["/blog/", "/blog/page/3/"])
+        self.assertEqual(listing[2][4:], ["/blog/page/2/", None])
+        self.assertEqual(listing_outputs(listing, os.path.join("public", "blog", "index.html")), [os.path.join("public", "blog", "page", "2", "index.html"), os.path.join("public", "blog", "page", "3", "index.html")])
+
+    def test_empty_listing_has_one_page(self):
+        self.assertEqual(build_listing([], {}, ""), [["", None, 1, [], None, None]])
+
+    def test_invalid_page_size(self):
+        self.assertRaises(Exception, build_listing, [], {"per_page": "none"}, "")
+        self.assertRaises(Exception, build_listing, [], {"per_page": "0"}, "")
+
+    def test_groups(self):
+        entries = [
+            self.entry("a", "A", tags=["C++", "web"], date="2023-05-01"),
+            self.entry("b", "B", tags="web", date="2024-01-01"),
+            self.entry("c", "C"),
+        ]
+        by_tag = build_listing(entries, {"group": "tags"}, "tags")
+        self.assertEqual(by_tag[0][3], [["/tags/c/", "C++", "1 page(s)"], ["/tags/web/", "web", "2 page(s)"]])
+        self.assertEqual([page[:3] for page in by_tag[1:]], [["c", "C++", 1], ["web", "web", 1]])
+        self.assertEqual([item[1] for item in by_tag[2][3]], ["A", "B"])
+
+        by_year = build_listing(entries, {"group": "year"}, "")
+        self.assertEqual([item[:2] for item in by_year[0][3]], [["/2024/", "2024"], ["/2023/", "2023"]])
+
+    def test_titles_and_slugs(self):
+        self.assertEqual(listing_title("Blog", None, 1), "Blog")
+        self.assertEqual(listing_title("Tags", "web", 2), "Tags: web (page 2)")
+        self.assertEqual(slug("Web Dev!"), "web-dev")
+        self.assertEqual(slug("!!"), "-")
+
+    def test_listing_node(self):
+        node = listing_node([["/a/", "A", "2024-01-01"], ["/b/", "B", ""]], None, "/page/2/")
+
+        self.assertEqual(node.to_html(), '<div><ul class="listing"><li><a href="/a/">A</a> <span>2024-01-01</span></li><li><a href="/b/">B</a></li></ul><nav class="pagination"><a href="/page/2/" rel="next">Next</a></nav></div>')
+        self.assertEqual(listing_node([], None, None).to_html(), "")
+
+if __name__ == "__main__":
+    unittest.main()
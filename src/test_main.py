@@ -0,0 +1,837 @@
+import contextlib
+import io
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from main import generate_pages, precompress_assets
+import main
+from manifest import BuildManifest
+import manifest
+from parse_cache import ParseCache
+import profiler
+from markdown_parser import set_fragment_memo
+import compress
+from assets import fingerprint_assets, set_asset_urls
+from sync import sync_directory
+import search
+import links
+from search import SearchIndex
+from listings import MetadataIndex
+import daemon
+import client
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.directory.name, "content")
+        self.public = os.path.join(self.directory.name, "public")
+        self.template = os.path.join(self.directory.name, "template.html")
+        os.mkdir(self.content)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nSome **bold** text")
+        self.manifest = BuildManifest(os.path.join(self.directory.name, "manifest.json"), "test")
+        self.parse_cache = None
+        self.search_index = None
+        self.metadata_index = None
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.public, *parts)) as file:
+            return file.read()
+
+    def generate(self, jobs=1, force=False, static=None):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            generate_pages(self.content, self.template, self.public, self.manifest, force, jobs, self.parse_cache, static, self.search_index, None, self.metadata_index)
+        return output.getvalue()
+
+    def test_generates_pages(self):
+        self.generate()
+
+        self.assertEqual(self.read("index.html"), "<title>Home</title><div><h1>Home</h1><p>Welcome</p></div>")
+        self.assertEqual(self.read("about", "index.html"), "<title>About</title><div><h1>About</h1><p>Some <b>bold</b> text</p></div>")
+
+    def test_profile_collects_worker_timings(self):
+        profiler.set_enabled(True)
+        try:
+            self.generate(jobs=2)
+            events = profiler.take_events()
+        finally:
+            profiler.set_enabled(False)
+
+        pages = dict([(event[5]["page"], event[5]) for event in events if event[0] == "generate_page"])
+        self.assertEqual(sorted(pages), [os.path.join(self.content, "about.md"), os.path.join(self.content, "index.md")])
+        self.assertEqual(pages[os.path.join(self.content, "about.md")]["bytes_out"], len(self.read("about", "index.html")))
+        self.assertIn("text_to_textnodes", [event[0] for event in events])
+
+    def test_parallel_matches_serial(self):
+        self.generate(jobs=1)
+        serial = (self.read("index.html"), self.read("about", "index.html"))
+        self.generate(jobs=2, force=True)
+
+        self.assertEqual((self.read("index.html"), self.read("about", "index.html")), serial)
+
+    def test_worker_crash_is_reported(self):
+        for number in range(40):
+            self.write(os.path.join(self.content, f"page{number:02}.md"), f"# Page {number}")
+        # The largest page is sent first, so the pool breaks while pages
+        # are still waiting to be sent
+        self.write(os.path.join(self.content, "crash.md"), "# Crash\n\n" + "Text " * 100)
+        generate_page = main.generate_page
+        def crashing_generate_page(source_path, *args):
+            if source_path.endswith("crash.md"):
+                os._exit(1)
+            return generate_page(source_path, *args)
+
+        # Workers are forked with the patched function, so the pool must be
+        # new
+        main.discard_worker_pool()
+        main.generate_page = crashing_generate_page
+        try:
+            with self.assertRaises(Exception) as raised:
+                self.generate(jobs=2)
+        finally:
+            main.generate_page = generate_page
+            main.discard_worker_pool()
+
+        # Every page was either generated or reported, and the next build
+        # gets working workers
+        self.assertIn("crash.md", str(raised.exception))
+        for number in range(40):
+            source = os.path.join(self.content, f"page{number:02}.md")
+            self.assertTrue(source in self.manifest.pages or source in str(raised.exception))
+        os.remove(os.path.join(self.content, "crash.md"))
+        self.generate(jobs=2)
+        self.assertEqual(len(self.manifest.pages), 42)
+
+    def test_skips_unchanged_pages(self):
+        self.generate()
+        log = self.generate()
+
+        self.assertEqual(log.count("Skipping unchanged page"), 2)
+
+    def test_force_regenerates(self):
+        self.generate()
+        log = self.generate(force=True)
+
+        self.assertNotIn("Skipping unchanged page", log)
+
+    def test_force_keeps_unchanged_output_mtimes(self):
+        self.generate()
+        output = os.path.join(self.public, "index.html")
+        os.utime(output, ns=(1000000000, 1000000000))
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nChanged")
+        self.generate(force=True)
+
+        self.assertEqual(os.stat(output).st_mtime_ns, 1000000000)
+        self.assertEqual(self.read("about", "index.html"), "<title>About</title><div><h1>About</h1><p>Changed</p></div>")
+        self.assertEqual(sorted(os.listdir(os.path.join(self.public, "about"))), ["index.html"])
+
+    def test_template_change_regenerates(self):
+        self.generate()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        log = self.generate()
+
+        self.assertNotIn("Skipping unchanged page", log)
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_template_change_reuses_parsed_bodies(self):
+        self.parse_cache = ParseCache(os.path.join(self.directory.name, "parse"), 1 << 20, "test")
+        self.generate()
+        self.parse_cache.put("# Home\n\nWelcome", "<div>cached</div>", "Cached")
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.generate(jobs=2)
+
+        self.assertEqual(self.read("index.html"), "<h1>Cached</h1><div>cached</div>")
+        self.assertEqual(self.read("about", "index.html"), "<h1>About</h1><div><h1>About</h1><p>Some <b>bold</b> text</p></div>")
+
+    def test_block_memo_stats_include_workers(self):
+        disclaimer = "Everything on this page is provided as is, without warranty of any kind."
+        for index in range(10):
+            self.write(os.path.join(self.content, f"page{index}.md"), f"# Page {index}\n\n{disclaimer}")
+        set_fragment_memo(1 << 20)
+        try:
+            log = self.generate(jobs=2)
+        finally:
+            set_fragment_memo(0)
+
+        self.assertRegex(log, r"Block memo: \d+ hits, \d+ misses")
+        hits, misses = re.search(r"Block memo: (\d+) hits, (\d+) misses", log).groups()
+        self.assertEqual(int(hits) + int(misses), 10)
+        self.assertGreaterEqual(int(hits), 8)
+        self.assertTrue(self.read("page3", "index.html").endswith(f"<p>{disclaimer}</p></div>"))
+
+    def test_content_assets_use_link_mode(self):
+        notes = os.path.join(self.content, "notes.txt")
+        self.write(notes, "notes")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(self.content, self.template, self.public, self.manifest, link_mode="hardlink")
+
+        self.assertTrue(os.path.samefile(notes, os.path.join(self.public, "notes.txt")))
+
+    def test_precompress_pages(self):
+        self.write(os.path.join(self.content, "long.md"), "# Long\n\n" + "Lots of repeated text. " * 50)
+        self.write(os.path.join(self.content, "notes.txt"), "note " * 100)
+        compress.set_precompress(True)
+        try:
+            self.generate(jobs=2)
+            gzip_page = os.path.join(self.public, "long", "index.html.gz")
+            self.assertTrue(os.path.exists(gzip_page))
+            self.assertFalse(os.path.exists(os.path.join(self.public, "index.html.gz")))
+
+            os.remove(os.path.join(self.content, "long.md"))
+            self.generate()
+        finally:
+            compress.set_precompress(False)
+
+        self.assertFalse(os.path.exists(gzip_page))
+
+    def test_precompress_assets(self):
+        self.write(os.path.join(self.content, "notes.txt"), "note " * 100)
+        with open(os.path.join(self.content, "random.json"), "wb") as file:
+            file.write(os.urandom(2048))
+        self.generate()
+        compress.set_precompress(True)
+        try:
+            precompress_assets(self.manifest, 2)
+        finally:
+            compress.set_precompress(False)
+
+        self.assertTrue(os.path.exists(os.path.join(self.public, "notes.txt.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "random.json.gz")))
+        self.assertIn(os.path.join(self.public, "random.json"), self.manifest.incompressible)
+
+    def test_precompress_turned_on_for_unchanged_pages(self):
+        self.write(os.path.join(self.content, "long.md"), "# Long\n\n" + "Lots of repeated text. " * 50)
+        self.generate()
+        compress.set_precompress(True)
+        try:
+            log = self.generate(jobs=2)
+        finally:
+            compress.set_precompress(False)
+
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'long.md')}", log)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "long", "index.html.gz")))
+
+    def test_precompress_turned_off(self):
+        self.write(os.path.join(self.content, "long.md"), "# Long\n\n" + "Lots of repeated text. " * 50)
+        self.write(os.path.join(self.content, "notes.txt"), "note " * 100)
+        gzip_page = os.path.join(self.public, "long", "index.html.gz")
+        gzip_asset = os.path.join(self.public, "notes.txt.gz")
+        compress.set_precompress(True)
+        try:
+            self.generate()
+            precompress_assets(self.manifest, 1)
+        finally:
+            compress.set_precompress(False)
+        self.assertTrue(self.manifest.precompressed)
+
+        # The first build without --precompress removes the .gz copies of
+        # unchanged pages and assets
+        self.assertIn("Skipping unchanged page", self.generate())
+        precompress_assets(self.manifest, 1)
+        self.assertFalse(os.path.exists(gzip_page))
+        self.assertFalse(os.path.exists(gzip_asset))
+        self.assertFalse(self.manifest.precompressed)
+
+        # Later ones don't look at them at all
+        for path in [gzip_page, gzip_asset]:
+            self.write(path, "stray")
+        self.generate()
+        precompress_assets(self.manifest, 1)
+        self.assertTrue(os.path.exists(gzip_page))
+        self.assertTrue(os.path.exists(gzip_asset))
+
+    def test_image_change_regenerates_pages_using_it(self):
+        static = os.path.join(self.directory.name, "static")
+        os.mkdir(static)
+        image = os.path.join(static, "photo.gif")
+        self.write(image, "GIF89a\x20\x00\x10\x00")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\n![photo](/photo.gif)")
+        self.parse_cache = ParseCache(os.path.join(self.directory.name, "parse"), 1 << 20, "test")
+        self.generate(static=static)
+
+        self.assertIn("<img src=\"/photo.gif\" alt=\"photo\" width=\"32\" height=\"16\"></img>", self.read("about", "index.html"))
+        self.assertEqual(self.manifest.dependents(image), [os.path.join(self.content, "about.md")])
+
+        self.write(image, "GIF89a\x40\x00\x20\x00\x00")
+        log = self.generate(static=static)
+
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'index.md')}", log)
+        self.assertIn("width=\"64\" height=\"32\"", self.read("about", "index.html"))
+
+    def test_unchanged_dependencies_are_not_read(self):
+        static = os.path.join(self.directory.name, "static")
+        os.mkdir(static)
+        image = os.path.join(static, "photo.gif")
+        self.write(image, "GIF89a\x20\x00\x10\x00")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\n![photo](/photo.gif)")
+        self.generate(static=static)
+
+        hashed = []
+        hash_file = manifest.hash_file
+        manifest.hash_file = lambda path: hashed.append(path) or hash_file(path)
+        try:
+            self.generate(static=static)
+        finally:
+            manifest.hash_file = hash_file
+
+        self.assertEqual(hashed, [])
+        self.assertEqual(self.manifest.file_hashes[image][2], hash_file(image))
+
+    def test_fingerprinted_asset_urls(self):
+        static = os.path.join(self.directory.name, "static")
+        os.mkdir(static)
+        self.write(os.path.join(static, "index.css"), "body { color: red; }")
+        self.write(self.template, "<link href=\"/index.css\">{{ Content }}")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nSee [the styles](/index.css) and [home](/)")
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_directory(static, self.public, self.manifest)
+            urls = fingerprint_assets(static, self.public, self.manifest)
+        set_asset_urls(urls)
+        try:
+            self.generate(jobs=2, static=static)
+        finally:
+            set_asset_urls({})
+        css_url = urls["/index.css"][0]
+
+        self.assertEqual(self.read("about", "index.html"), f"<link href=\"{css_url}\"><div><h1>About</h1><p>See <a href=\"{css_url}\">the styles</a> and <a href=\"/\">home</a></p></div>")
+        self.assertEqual(len(self.manifest.dependents(os.path.join(static, "index.css"))), 2)
+
+        log = self.generate(static=static)
+
+        self.assertNotIn("Skipping unchanged page", log)
+        self.assertTrue(self.read("index.html").startswith("<link href=\"/index.css\">"))
+
+    def test_search_index_is_updated_incrementally(self):
+        self.search_index = SearchIndex(os.path.join(self.directory.name, "search.json"))
+        self.parse_cache = ParseCache(os.path.join(self.directory.name, "parse"), 1 << 20, "test")
+        search.set_indexing(True)
+        try:
+            self.generate(jobs=2)
+            about = os.path.join(self.content, "about.md")
+            home = os.path.join(self.content, "index.md")
+            self.assertEqual(self.search_index.pages[about]["url"], "/about/")
+            self.assertEqual(self.search_index.pages[about]["terms"], ["about", "bold", "some", "text"])
+            self.assertEqual(self.search_index.pages[home]["title"], "Home")
+            about_id = self.search_index.pages[about]["id"]
+
+            self.write(os.path.join(self.content, "about.md"), "# About\n\nOther words")
+            log = self.generate()
+            self.assertIn(f"Skipping unchanged page {home}", log)
+            self.assertEqual(self.search_index.pages[about]["terms"], ["about", "other", "words"])
+            self.assertEqual(self.search_index.pages[about]["id"], about_id)
+
+            os.remove(os.path.join(self.content, "about.md"))
+            self.generate()
+        finally:
+            search.set_indexing(False)
+
+        self.assertEqual(list(self.search_index.pages), [home])
+
+    def test_listing_pages(self):
+        self.metadata_index = MetadataIndex(os.path.join(self.directory.name, "metadata.json"))
+        os.mkdir(os.path.join(self.content, "blog"))
+        self.write(os.path.join(self.content, "blog", "index.md"), "---\ncollection: blog\nper_page: 1\n---\n# Blog")
+        self.write(os.path.join(self.content, "blog", "one.md"), "---\ndate: 2024-01-01\ntags: [rust]\n---\n# One")
+        self.write(os.path.join(self.content, "blog", "two.md"), "---\ndate: 2024-02-01\n---\n# Two")
+        self.generate(jobs=2)
+
+        self.assertEqual(self.read("blog", "index.html"), '<title>Blog</title><div><h1>Blog</h1></div><div><ul class="listing"><li><a href="/blog/two/">Two</a> <span>2024-02-01</span></li></ul><nav class="pagination"><a href="/blog/page/2/" rel="next">Next</a></nav></div>')
+        self.assertEqual(self.read("blog", "page", "2", "index.html"), '<title>Blog (page 2)</title><div><ul class="listing"><li><a href="/blog/one/">One</a> <span>2024-01-01</span></li></ul><nav class="pagination"><a href="/blog/" rel="prev">Previous</a></nav></div>')
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'blog', 'index.md')}", self.generate())
+
+        # A listed page changing regenerates the listing, and pages it no
+        # longer has are removed
+        os.remove(os.path.join(self.content, "blog", "one.md"))
+        self.write(os.path.join(self.content, "blog", "two.md"), "---\ndate: 2024-02-01\n---\n# Second")
+        self.generate()
+
+        self.assertIn('<a href="/blog/two/">Second</a>', self.read("blog", "index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "page")))
+
+    def test_invalid_listing_fails_only_its_page(self):
+        self.metadata_index = MetadataIndex(os.path.join(self.directory.name, "metadata.json"))
+        blog = os.path.join(self.content, "blog.md")
+        self.write(blog, "---\ncollection: /\nper_page: 0\n---\n# Blog")
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(Exception) as context:
+                generate_pages(self.content, self.template, self.public, self.manifest, False, 1, None, None, None, None, self.metadata_index)
+
+        self.assertIn(f"Failed to generate page from {blog}: Invalid per_page 0", output.getvalue())
+        self.assertIn("Failed to generate 1 page(s)", str(context.exception))
+        self.assertEqual(self.read("about", "index.html"), "<title>About</title><div><h1>About</h1><p>Some <b>bold</b> text</p></div>")
+
+    def test_listing_groups(self):
+        self.metadata_index = MetadataIndex(os.path.join(self.directory.name, "metadata.json"))
+        self.write(os.path.join(self.content, "tags.md"), "---\ntitle: Tags\ncollection: /\ngroup: tags\n---\nEvery tag.")
+        self.write(os.path.join(self.content, "about.md"), "---\ntags:\n  - web\n  - notes\n---\n# About")
+        self.generate()
+
+        self.assertIn('<a href="/tags/notes/">notes</a> <span>1 page(s)</span>', self.read("tags", "index.html"))
+        self.assertIn("<title>Tags: web</title>", self.read("tags", "web", "index.html"))
+        self.assertIn('<a href="/about/">About</a>', self.read("tags", "web", "index.html"))
+
+    def test_streamed_pages_match(self):
+        partials = os.path.join(self.directory.name, "partials")
+        os.mkdir(partials)
+        self.write(os.path.join(partials, "note.md"), "A *shared* note")
+        self.write(os.path.join(self.content, "about.md"), "---\nauthor: Frodo\n---\nIntro\n\n# About\n\n{{> note }}\n\n```\ncode\n\nblock\n```\n\n* one\n* two")
+        self.write(self.template, "<title>{{ Title }}</title><p>{{ Author }}</p>{{ Content }}")
+        self.generate()
+        expected = self.read("about", "index.html")
+
+        stream_size = main.stream_size
+        main.stream_size = 1
+        try:
+            self.generate(force=True)
+        finally:
+            main.stream_size = stream_size
+
+        self.assertEqual(self.read("about", "index.html"), expected)
+        self.assertEqual(self.read("index.html"), "<title>Home</title><p></p><div><h1>Home</h1><p>Welcome</p></div>")
+        self.assertEqual(list(self.manifest.dependencies_of(os.path.join(self.content, "about.md"))), [os.path.join(partials, "note.md")])
+
+    def test_broken_links(self):
+        static = os.path.join(self.directory.name, "static")
+        os.mkdir(static)
+        self.write(os.path.join(static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "---\nauthor: Sam\n---\n# Home\n\n[About](/about/) and [styles](/index.css)\n\n[Gone](/gone/)")
+        self.parse_cache = ParseCache(os.path.join(self.directory.name, "parse"), 1 << 20, "test")
+        home = os.path.join(self.content, "index.md")
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_directory(static, self.public, self.manifest)
+        self.generate(jobs=2, static=static)
+        self.assertEqual(links.broken_links(self.manifest, self.public), [(home, 8, "/gone/")])
+
+        os.remove(os.path.join(self.content, "about.md"))
+        log = self.generate(static=static)
+
+        self.assertIn(f"Skipping unchanged page {home}", log)
+        self.assertEqual(links.broken_links(self.manifest, self.public), [(home, 6, "/about/"), (home, 8, "/gone/")])
+
+    def test_broken_link_lines_with_partials(self):
+        partials = os.path.join(self.directory.name, "partials")
+        os.mkdir(partials)
+        note = os.path.join(partials, "note.md")
+        self.write(note, "A note\n\nover [lines](/missing/)\n")
+        self.write(os.path.join(self.content, "about.md"), "---\nauthor: Frodo\n---\n# About\n\n{{> note }}\n\n[Gone](/gone/)")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n{{> note }}")
+        about = os.path.join(self.content, "about.md")
+        expected = [(about, 8, "/gone/"), (note, 3, "/missing/")]
+        static = os.path.join(self.directory.name, "static")
+        os.mkdir(static)
+        self.generate(jobs=2, static=static)
+        self.assertEqual(links.broken_links(self.manifest, self.public), expected)
+
+        stream_size = main.stream_size
+        main.stream_size = 1
+        try:
+            self.generate(force=True, static=static)
+        finally:
+            main.stream_size = stream_size
+        self.assertEqual(links.broken_links(self.manifest, self.public), expected)
+
+    def test_turning_search_off_keeps_pages(self):
+        self.search_index = SearchIndex(os.path.join(self.directory.name, "search.json"))
+        search.set_indexing(True)
+        try:
+            self.generate()
+        finally:
+            search.set_indexing(False)
+        log = self.generate()
+
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'about.md')}", log)
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'index.md')}", log)
+
+    def test_deleted_source_removes_output(self):
+        self.generate()
+        os.remove(os.path.join(self.content, "about.md"))
+        self.generate()
+
+        self.assertFalse(os.path.exists(os.path.join(self.public, "about")))
+        self.assertNotIn(os.path.join(self.content, "about.md"), self.manifest.pages)
+
+    def test_layout_from_front_matter(self):
+        os.mkdir(os.path.join(self.directory.name, "layouts"))
+        self.write(os.path.join(self.directory.name, "layouts", "post.html"), "<article data-author=\"{{ Author }}\">{{ Content }}</article>")
+        self.write(os.path.join(self.content, "about.md"), "---\nlayout: post\nauthor: Frodo\n---\n# About")
+        self.generate()
+
+        self.assertEqual(self.read("about", "index.html"), "<article data-author=\"Frodo\"><div><h1>About</h1></div></article>")
+        self.assertTrue(self.read("index.html").startswith("<title>Home</title>"))
+
+    def test_layout_change_only_regenerates_its_pages(self):
+        os.mkdir(os.path.join(self.directory.name, "layouts"))
+        post_layout = os.path.join(self.directory.name, "layouts", "post.html")
+        self.write(post_layout, "{{ Content }}")
+        self.write(os.path.join(self.content, "about.md"), "---\nlayout: post\n---\n# About")
+        self.generate()
+        self.write(post_layout, "<main>{{ Content }}</main>")
+        log = self.generate()
+
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'index.md')}", log)
+        self.assertEqual(self.read("about", "index.html"), "<main><div><h1>About</h1></div></main>")
+
+    def test_partial_change_only_regenerates_dependent_pages(self):
+        partials = os.path.join(self.directory.name, "partials")
+        os.mkdir(partials)
+        self.write(self.template, "{{> nav }}{{ Content }}")
+        self.write(os.path.join(partials, "nav.html"), "<nav>{{ Title }}</nav>")
+        self.write(os.path.join(partials, "notice.md"), "Read the **notice**")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\n{{> notice }}")
+        self.generate()
+
+        self.assertEqual(self.read("about", "index.html"), "<nav>About</nav><div><h1>About</h1><p>Read the <b>notice</b></p></div>")
+        self.assertEqual(self.manifest.dependents(os.path.join(partials, "notice.md")), [os.path.join(self.content, "about.md")])
+        self.assertEqual(len(self.manifest.dependents(os.path.join(partials, "nav.html"))), 2)
+
+        self.write(os.path.join(partials, "notice.md"), "Changed notice")
+        log = self.generate()
+
+        self.assertIn(f"Skipping unchanged page {os.path.join(self.content, 'index.md')}", log)
+        self.assertEqual(self.read("about", "index.html"), "<nav>About</nav><div><h1>About</h1><p>Changed notice</p></div>")
+
+        self.write(os.path.join(partials, "nav.html"), "<header>{{ Title }}</header>")
+        log = self.generate()
+
+        self.assertNotIn("Skipping unchanged page", log)
+        self.assertEqual(self.read("index.html"), "<header>Home</header><div><h1>Home</h1><p>Welcome</p></div>")
+
+    def test_nested_pages_and_assets(self):
+        os.makedirs(os.path.join(self.content, "blog", "2024"))
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.content, "blog", "2024", "post.md"), "# Post")
+        self.write(os.path.join(self.content, "blog", "diagram.svg"), "<svg></svg>")
+        self.generate()
+
+        self.assertTrue(self.read("blog", "index.html").startswith("<title>Blog</title>"))
+        self.assertTrue(self.read("blog", "2024", "post", "index.html").startswith("<title>Post</title>"))
+        self.assertEqual(self.read("blog", "diagram.svg"), "<svg></svg>")
+
+    def test_deleted_asset_is_removed(self):
+        self.write(os.path.join(self.content, "photo.png"), "png")
+        self.generate()
+        os.remove(os.path.join(self.content, "photo.png"))
+        self.generate()
+
+        self.assertFalse(os.path.exists(os.path.join(self.public, "photo.png")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_route_collision(self):
+        os.mkdir(os.path.join(self.content, "about"))
+        self.write(os.path.join(self.content, "about", "index.md"), "# Other about")
+
+        with self.assertRaises(Exception) as context:
+            self.generate()
+
+        self.assertIn("about", str(context.exception))
+
+    def test_many_pages_in_parallel(self):
+        for index in range(40):
+            self.write(os.path.join(self.content, f"page{index}.md"), f"# Page {index}\n\n" + "text " * index)
+        log = self.generate(jobs=2)
+
+        self.assertEqual(log.count("Generated page"), 42)
+        self.assertTrue(self.read("page39", "index.html").startswith("<title>Page 39</title>"))
+
+    def test_failure_reports_source_path(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title **here")
+
+        with self.assertRaises(Exception) as context:
+            self.generate(jobs=2)
+
+        self.assertIn("broken.md", str(context.exception))
+        self.assertEqual(self.read("about", "index.html")[:20], "<title>About</title>")
+        self.assertNotIn(os.path.join(self.content, "broken.md"), self.manifest.pages)
+
+class TestRebuildChanges(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        site = self.directory.name
+        self.paths = dict([(name, getattr(main, name)) for name in ["content_path", "static_path", "template_path", "layouts_path", "partials_path", "public_path"]])
+        main.content_path = os.path.join(site, "content")
+        main.static_path = os.path.join(site, "static")
+        main.template_path = os.path.join(site, "template.html")
+        main.layouts_path = os.path.join(site, "layouts")
+        main.partials_path = os.path.join(site, "partials")
+        main.public_path = os.path.join(site, "public")
+        os.mkdir(main.content_path)
+        os.mkdir(main.static_path)
+        self.write(main.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(main.static_path, "index.css"), "body {}")
+        self.write(os.path.join(main.content_path, "index.md"), "# Home")
+        self.write(os.path.join(main.content_path, "about.md"), "# About")
+
+        self.manifest = BuildManifest(os.path.join(site, "manifest.json"), "test")
+        self.metadata_index = MetadataIndex(os.path.join(site, "metadata.json"))
+        self.args = main.build_parser().parse_args(["--jobs", "1"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.copy_directory(main.static_path, main.public_path, self.manifest)
+            generate_pages(main.content_path, main.template_path, main.public_path, self.manifest, metadata_index=self.metadata_index)
+
+    def tearDown(self):
+        for name, value in self.paths.items():
+            setattr(main, name, value)
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def output(self, *parts):
+        return os.path.join(main.public_path, *parts)
+
+    def read(self, *parts):
+        with open(self.output(*parts)) as file:
+            return file.read()
+
+    def rebuild(self, *paths):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.rebuild_changes(set(paths), self.manifest, None, None, self.metadata_index, self.args)
+        return output.getvalue()
+
+    def test_changed_page(self):
+        about = os.path.join(main.content_path, "about.md")
+        self.write(about, "# About us")
+        log = self.rebuild(about)
+
+        self.assertIn("<h1>About us</h1>", self.read("about", "index.html"))
+        self.assertNotIn("index.md", log)
+
+    def test_new_page(self):
+        post = os.path.join(main.content_path, "blog", "post.md")
+        self.write(post, "# Post")
+        self.rebuild(post)
+
+        self.assertIn("<h1>Post</h1>", self.read("blog", "post", "index.html"))
+        self.assertIn(post, self.manifest.pages)
+
+    def test_deleted_page(self):
+        about = os.path.join(main.content_path, "about.md")
+        os.remove(about)
+        self.rebuild(about)
+
+        self.assertFalse(os.path.exists(self.output("about")))
+        self.assertNotIn(about, self.manifest.pages)
+
+    def test_moved_directory(self):
+        # The watcher reports the content root when a directory moves
+        self.write(os.path.join(main.content_path, "blog", "post.md"), "# Post")
+        self.rebuild(os.path.join(main.content_path, "blog", "post.md"))
+        os.rename(os.path.join(main.content_path, "blog"), os.path.join(main.content_path, "news"))
+        self.rebuild(main.content_path)
+
+        self.assertFalse(os.path.exists(self.output("blog")))
+        self.assertIn("<h1>Post</h1>", self.read("news", "post", "index.html"))
+
+    def test_static_changes(self):
+        css = os.path.join(main.static_path, "index.css")
+        extra = os.path.join(main.static_path, "extra.css")
+        self.write(css, "body { color: red }")
+        self.write(extra, "p {}")
+        log = self.rebuild(css, extra)
+
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+        self.assertEqual(self.read("extra.css"), "p {}")
+        self.assertNotIn("Generat", log)
+
+        os.remove(extra)
+        self.rebuild(extra)
+        self.assertFalse(os.path.exists(self.output("extra.css")))
+
+    def test_template_change(self):
+        self.write(main.template_path, "<main>{{ Content }}</main>")
+        log = self.rebuild(main.template_path)
+
+        self.assertEqual(log.count("Generated page"), 2)
+        self.assertEqual(self.read("index.html"), "<main><div><h1>Home</h1></div></main>")
+
+    def test_partials_root_created(self):
+        # The watcher reports a root that didn't exist when it started
+        note = os.path.join(main.partials_path, "note.md")
+        about = os.path.join(main.content_path, "about.md")
+        self.write(note, "A note")
+        self.write(about, "# About\n\n{{> note }}")
+        self.rebuild(about)
+        self.write(note, "A new note")
+        log = self.rebuild(main.partials_path)
+
+        self.assertIn("<p>A new note</p>", self.read("about", "index.html"))
+        self.assertIn("Skipping unchanged page", log)
+
+class TestShardedBuild(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        site = self.directory.name
+        os.makedirs(os.path.join(site, "content", "blog"))
+        os.mkdir(os.path.join(site, "static"))
+        with open(os.path.join(site, "template.html"), "w") as file:
+            file.write("<title>{{ Title }}</title>{{ Content }}")
+        with open(os.path.join(site, "static", "index.css"), "w") as file:
+            file.write("body {}")
+        pages = {"index.md": "# Home\n\n[Blog](/blog/)", "about.md": "# About\n\n" + "Text " * 200, "blog/index.md": "# Blog\n\n[About](/about/)", "blog/post.md": "# Post"}
+        for name, text in pages.items():
+            with open(os.path.join(site, "content", name), "w") as file:
+                file.write(text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_main(self, *args):
+        main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        return subprocess.Popen([sys.executable, main_path, "--check-links", "--jobs", "1"] + list(args), cwd=self.directory.name, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+    def outputs(self):
+        public = os.path.join(self.directory.name, "public")
+        files = {}
+        for directory, _, names in os.walk(public):
+            for name in names:
+                with open(os.path.join(directory, name), "rb") as file:
+                    files[os.path.relpath(os.path.join(directory, name), public)] = file.read()
+        return files
+
+    def test_shards_merge_into_the_same_site(self):
+        build = self.run_main()
+        output = build.communicate()[0]
+        self.assertEqual(build.returncode, 0, output)
+        expected = self.outputs()
+
+        shards = [self.run_main("--shard", f"{index}/3") for index in [1, 2, 3]]
+        for shard in shards:
+            output = shard.communicate()[0]
+            self.assertEqual(shard.returncode, 0, output)
+        merge = self.run_main("--merge", "3")
+        output = merge.communicate()[0]
+
+        self.assertEqual(merge.returncode, 0, output)
+        self.assertEqual(self.outputs(), expected)
+        manifests = [BuildManifest(os.path.join(self.directory.name, ".shards", str(index), "manifest.json")) for index in [1, 2, 3]]
+        for manifest in manifests:
+            manifest.load()
+        self.assertEqual([sorted(manifest.pages) for manifest in manifests], [
+            ["./content/about.md"],
+            ["./content/blog/index.md"],
+            ["./content/blog/post.md", "./content/index.md"],
+        ])
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        site = self.directory.name
+        os.mkdir(os.path.join(site, "content"))
+        os.mkdir(os.path.join(site, "static"))
+        self.write("template.html", '<link href="/index.css">{{ Content }}')
+        self.write(os.path.join("static", "index.css"), "body {}")
+        self.write(os.path.join("content", "index.md"), "# Home")
+        self.write(os.path.join("content", "about.md"), "# About")
+
+        self.source = os.path.dirname(os.path.abspath(__file__))
+        self.daemon = subprocess.Popen([sys.executable, os.path.join(self.source, "main.py"), "--daemon"], cwd=site, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.socket = os.path.join(site, ".cache", "daemon.sock")
+        while not daemon.is_listening(self.socket):
+            self.assertIsNone(self.daemon.poll())
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.daemon.send_signal(signal.SIGINT)
+        self.daemon.wait()
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.directory.name, name), "w") as file:
+            file.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.directory.name, "public", *parts)) as file:
+            return file.read()
+
+    def run_client(self, *args):
+        client = subprocess.run([sys.executable, os.path.join(self.source, "client.py"), "--jobs", "1"] + list(args), cwd=self.directory.name, capture_output=True, text=True)
+        return client.returncode, client.stdout
+
+    def test_requests_with_different_flags(self):
+        status, output = self.run_client("--fingerprint")
+        self.assertEqual(status, 0, output)
+        self.assertRegex(self.read("index.html"), r'href="/index\.\w+\.css"')
+
+        # Dropping --fingerprint on a rebuild of one page can't leave the
+        # fingerprints of the last request in place
+        self.write(os.path.join("content", "index.md"), "# Home again")
+        status, output = self.run_client("--", "content/index.md")
+        self.assertEqual(status, 0, output)
+        self.assertIn("rebuilding everything", output)
+        self.assertIn('href="/index.css"', self.read("index.html"))
+        self.assertIn('href="/index.css"', self.read("about", "index.html"))
+
+        self.write(os.path.join("content", "about.md"), "# About us")
+        status, output = self.run_client("--", "content/about.md")
+        self.assertEqual(status, 0, output)
+        self.assertIn("Generating page from ./content/about.md", output)
+        self.assertNotIn("index.md", output)
+
+        # Nor can turning on --search index only the pages that changed
+        status, output = self.run_client("--search", "--", "content/index.md")
+        self.assertEqual(status, 0, output)
+        self.assertIn("rebuilding everything", output)
+        self.assertEqual(sorted([page[0] for page in json.loads(self.read("search", "pages.json"))["pages"]]), ["/", "/about/"])
+
+    def test_rejected_requests(self):
+        status, output = self.run_client("--force", "--", "content/index.md")
+        self.assertEqual(status, 1)
+        self.assertIn("can't be used with changed paths", output)
+
+        output = io.StringIO()
+        self.assertEqual(daemon.request(self.socket, ["--shard", "1/2"], [], output), 1)
+        self.assertIn("--shard can't be sent to the daemon", output.getvalue())
+
+    def test_reloads_files_written_by_other_builds(self):
+        self.assertEqual(self.run_client()[0], 0)
+        # A build outside the daemon records the links of every page
+        build = subprocess.run([sys.executable, os.path.join(self.source, "main.py"), "--jobs", "1", "--check-links"], cwd=self.directory.name, capture_output=True, text=True)
+        self.assertEqual(build.returncode, 0, build.stdout)
+
+        status, output = self.run_client("--check-links")
+        self.assertEqual(status, 0, output)
+        self.assertIn("Skipping unchanged page ./content/index.md", output)
+        self.assertNotIn("Generated page", output)
+
+class TestClient(unittest.TestCase):
+    def test_split_arguments(self):
+        self.assertEqual(client.split_arguments(["--force"]), (["--force"], []))
+        self.assertEqual(client.split_arguments(["--jobs", "2", "--", "content/a.md"]), (["--jobs", "2"], [os.path.abspath("content/a.md")]))
+
+    def test_builds_in_process_without_a_daemon(self):
+        with tempfile.TemporaryDirectory() as site:
+            os.mkdir(os.path.join(site, "content"))
+            os.mkdir(os.path.join(site, "static"))
+            with open(os.path.join(site, "template.html"), "w") as file:
+                file.write("{{ Content }}")
+            with open(os.path.join(site, "content", "index.md"), "w") as file:
+                file.write("# Home")
+            source = os.path.dirname(os.path.abspath(__file__))
+            build = subprocess.run([sys.executable, os.path.join(source, "client.py"), "--jobs", "1"], cwd=site, capture_output=True, text=True)
+
+            self.assertEqual(build.returncode, 0, build.stderr)
+            self.assertIn("Generated page from ./content/index.md", build.stdout)
+            self.assertTrue(os.path.exists(os.path.join(site, "public", "index.html")))
+
+if __name__ == "__main__":
+    unittest.main()
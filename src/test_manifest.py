@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from manifest import BuildManifest, hash_bytes, hash_file
+
+class TestHashing(unittest.TestCase):
+    def test_hash_file_matches_hash_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "page.md")
+            with open(path, "wb") as file:
+                file.write(b"# Title")
+
+            self.assertEqual(hash_file(path), hash_bytes(b"# Title"))
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "manifest.json")
+        self.output = os.path.join(self.directory.name, "index.html")
+        with open(self.output, "w") as file:
+            file.write("<p>page</p>")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_up_to_date_after_record(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+
+        self.assertTrue(manifest.is_up_to_date("content/index.md", "abc", "def", self.output))
+
+    def test_source_change_is_stale(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+
+        self.assertFalse(manifest.is_up_to_date("content/index.md", "changed", "def", self.output))
+
+    def test_template_change_is_stale(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+
+        self.assertFalse(manifest.is_up_to_date("content/index.md", "abc", "changed", self.output))
+
+    def test_missing_output_is_stale(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+        os.remove(self.output)
+
+        self.assertFalse(manifest.is_up_to_date("content/index.md", "abc", "def", self.output))
+
+    def test_save_and_load(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+        manifest.save()
+
+        loaded = BuildManifest(self.path, "v1")
+        loaded.load()
+
+        self.assertEqual(loaded.pages, manifest.pages)
+
+    def test_generator_change_discards_pages(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+        manifest.save()
+
+        loaded = BuildManifest(self.path, "v2")
+        loaded.load()
+
+        self.assertEqual(loaded.pages, {})
+
+    def test_dependents(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "./template.html", "def", self.output, {"./partials/nav.html": "1", "./partials/links.html": "2"})
+        manifest.record("content/post.md", "abc", "./layouts/post.html", "def", self.output, {"./partials/nav.html": "1"})
+        manifest.record("content/about.md", "abc", "./template.html", "def", self.output)
+
+        self.assertListEqual(manifest.dependents("partials/nav.html"), ["content/index.md", "content/post.md"])
+        self.assertListEqual(manifest.dependents("./partials/links.html"), ["content/index.md"])
+        self.assertListEqual(manifest.dependents("template.html"), ["content/about.md", "content/index.md"])
+        self.assertEqual(manifest.dependencies_of("content/post.md"), {"./partials/nav.html": "1"})
+
+    def test_corrupt_manifest_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as file:
+            file.write("{not json")
+
+        manifest = BuildManifest(self.path, "v1")
+        manifest.load()
+
+        self.assertEqual(manifest.pages, {})
+
+    def test_stale_pages(self):
+        manifest = BuildManifest(self.path, "v1")
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+        manifest.record("content/gone.md", "abc", "template.html", "def", self.output)
+
+        self.assertListEqual(manifest.stale_pages({"content/index.md"}), ["content/gone.md"])
+        self.assertEqual(manifest.remove("content/gone.md"), self.output)
+        self.assertNotIn("content/gone.md", manifest.pages)
+
+    def test_listing_outputs(self):
+        manifest = BuildManifest(self.path, "v1")
+        pages = [os.path.join("public", "blog", "page", "2", "index.html")]
+        manifest.record("content/blog/index.md", "abc", "template.html", "def", self.output, listing_outputs=pages)
+        manifest.record("content/index.md", "abc", "template.html", "def", self.output)
+
+        self.assertEqual(manifest.listing_outputs("content/blog/index.md"), pages)
+        self.assertEqual(manifest.listing_outputs("content/index.md"), [])
+        self.assertNotIn("listing", manifest.pages["content/index.md"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
+import os
+import struct
+import tempfile
 import unittest
 from markdown_parser import (
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    markdown_to_document,
+    stream_document,
+    scan_blocks,
     extract_title,
+    set_fragment_memo,
+    PageReferences,
     block_type_paragraph,
     block_type_header,
     block_type_code,
@@ -12,6 +20,7 @@ from markdown_parser import (
     block_type_ordered_list
 )
 from htmlnode import HTMLNode, ParentNode, LeafNode
+import markdown_parser
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_new_line(self):
@@ -41,6 +50,72 @@ class TestMarkdownToBlocks(unittest.TestCase):
 
         self.assertListEqual(markdown_to_blocks(text), expected)
 
+    def test_whitespace_only_separator(self):
+        text = "First block\n  \t\nSecond block"
+        expected = [
+            "First block",
+            "Second block"
+        ]
+
+        self.assertListEqual(markdown_to_blocks(text), expected)
+
+    def test_many_newlines(self):
+        text = "First block\n\n\n\n\nSecond block\n\n"
+        expected = [
+            "First block",
+            "Second block"
+        ]
+
+        self.assertListEqual(markdown_to_blocks(text), expected)
+
+    def test_code_block_with_blank_lines(self):
+        text = "```\nfirst()\n\nsecond()\n```\n\nAfter"
+        expected = [
+            "```\nfirst()\n\nsecond()\n```",
+            "After"
+        ]
+
+        self.assertListEqual(markdown_to_blocks(text), expected)
+
+    def test_unclosed_code_fence(self):
+        text = "```not code\n\nplain text\n\n> quote"
+        expected = [
+            "```not code",
+            "plain text",
+            "> quote"
+        ]
+
+        self.assertListEqual(markdown_to_blocks(text), expected)
+
+class TestScanBlocks(unittest.TestCase):
+    def test_content_and_line_numbers(self):
+        lines = "# Title\n\n> quoted\n> twice\n\n\n* one\n* two\n\n3. three".split("\n")
+        expected = [
+            (block_type_header, (1, "Title"), 1, "# Title"),
+            (block_type_quote, "quoted\ntwice", 3, "> quoted\n> twice"),
+            (block_type_unordered_list, ["one", "two"], 7, "* one\n* two"),
+            (block_type_ordered_list, ["three"], 10, "3. three"),
+        ]
+
+        self.assertListEqual(list(scan_blocks(lines)), expected)
+
+    def test_list_missing_marker_is_paragraph(self):
+        lines = ["* one", "two"]
+        expected = [
+            (block_type_paragraph, "* one\ntwo", 1, "* one\ntwo"),
+        ]
+
+        self.assertListEqual(list(scan_blocks(lines)), expected)
+
+    def test_header_ends_block(self):
+        lines = ["# Title", "Body text"]
+        expected = [
+            (block_type_header, (1, "Title"), 1, "# Title"),
+            (block_type_paragraph, "Body text", 2, "Body text"),
+        ]
+
+        self.assertListEqual(list(scan_blocks(lines)), expected)
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_header_1(self):
         block = "# header 1"
@@ -229,6 +304,113 @@ class TestMarkdownToHTMLNodes(unittest.TestCase):
 
         self.assertEqual(result, expected)
 
+    def test_code_is_literal(self):
+        markdown = "```\nint *pointer;\n```"
+        expected = ParentNode("div", [
+            ParentNode("code", [
+                LeafNode("\nint *pointer;\n")
+            ])
+        ])
+
+        self.assertEqual(markdown_to_html_node(markdown), expected)
+
+    def test_document_title(self):
+        markdown = "Intro\n\n## Section\n\n# Title"
+
+        node, title = markdown_to_document(markdown)
+
+        self.assertEqual(title, "Title")
+        self.assertEqual(node, markdown_to_html_node(markdown))
+
+class TestStreamDocument(unittest.TestCase):
+    def test_matches_markdown_to_document(self):
+        markdown = "# Title\n\nSome *text*\n\n```\ncode\n\nmore\n```\n\n* one\n* two\n\n> quote"
+        pieces = list(stream_document(iter(markdown.split("\n"))))
+
+        self.assertEqual(pieces[0], "<div>")
+        self.assertEqual(pieces[-1], "</div>")
+        self.assertEqual("".join([piece if isinstance(piece, str) else piece.to_html() for piece in pieces]), markdown_to_html_node(markdown).to_html())
+
+    def test_empty_document(self):
+        with self.assertRaises(ValueError):
+            list(stream_document(iter([""])))
+
+class TestFragmentMemo(unittest.TestCase):
+    def tearDown(self):
+        set_fragment_memo(0)
+
+    def test_memoized_blocks_render_the_same(self):
+        disclaimer = "This page is provided **as is** and may be out of date, see [the archive](/archive) for more."
+        markdown = f"# Title\n\n{disclaimer}\n\n* a list item that is long enough to be memoized\n* and a *second* one\n\nshort"
+        expected = markdown_to_html_node(markdown).to_html()
+        set_fragment_memo(1 << 20)
+
+        first, _ = markdown_to_document(markdown)
+        second, title = markdown_to_document(markdown.replace("# Title", "# Other"))
+
+        self.assertEqual(first.to_html(), expected)
+        self.assertEqual(second.to_html(), expected.replace("Title", "Other"))
+        self.assertEqual(title, "Other")
+        self.assertEqual(markdown_parser.fragment_memo.take_stats(), (2, 2, 0))
+
+    def test_memoized_blocks_keep_search_terms(self):
+        disclaimer = "This page is provided as is and may be out of date, see the archive for more."
+        set_fragment_memo(1 << 20)
+        first, second = set(), set()
+        markdown_to_document(f"# First\n\n{disclaimer}", terms=first)
+        markdown_to_document(f"# Second\n\n{disclaimer}", terms=second)
+
+        self.assertEqual(first - {"first"}, second - {"second"})
+        self.assertIn("archive", second)
+        self.assertEqual(markdown_parser.fragment_memo.take_stats(), (1, 1, 0))
+
+    def test_memo_is_bounded(self):
+        set_fragment_memo(300)
+        for index in range(10):
+            markdown_to_document(f"paragraph number {index} " + "with filler text " * 5)
+
+        memo = markdown_parser.fragment_memo
+        self.assertLessEqual(memo.size, 300)
+        self.assertGreater(memo.evictions, 0)
+        self.assertIn("0 hits, 10 misses", memo.summary())
+
+class TestPageReferences(unittest.TestCase):
+    def test_sizes_and_lazy_loading(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "images"))
+            with open(os.path.join(directory, "images", "a b.gif"), "wb") as file:
+                file.write(b"GIF89a" + struct.pack("<HH", 32, 16))
+            images = PageReferences(directory)
+            markdown = "# Title\n\n![first](/images/a%20b.gif)\n\n* ![second](https://example.com/b.png)\n\n![third](/../secret.png) and ![fourth](/images/missing.png)"
+
+            node, _ = markdown_to_document(markdown, images)
+
+        self.assertEqual(node.to_html(), (
+            "<div><h1>Title</h1>"
+            "<p><img src=\"/images/a%20b.gif\" alt=\"first\" width=\"32\" height=\"16\"></img></p>"
+            "<ul><li><img src=\"https://example.com/b.png\" alt=\"second\" loading=\"lazy\" decoding=\"async\"></img></li></ul>"
+            "<p><img src=\"/../secret.png\" alt=\"third\" loading=\"lazy\" decoding=\"async\"></img>"
+            " and <img src=\"/images/missing.png\" alt=\"fourth\" loading=\"lazy\" decoding=\"async\"></img></p></div>"
+        ))
+        self.assertEqual(images.files, [os.path.join(directory, "images", "a b.gif"), os.path.join(directory, "images", "missing.png")])
+
+    def test_links_with_lines(self):
+        footer = "See [the archive](/archive/) for older posts, or go back to the\n[front page](/) and [about](/about/)."
+        markdown = f"# Title\n\n![photo](/photo.png)\n\n{footer}"
+        set_fragment_memo(1 << 20)
+        try:
+            first = PageReferences("static")
+            markdown_to_document(markdown, first)
+            second = PageReferences("static")
+            markdown_to_document(f"# Title\n\nIntro\n\nMore\n\n{footer}", second)
+            stats = markdown_parser.fragment_memo.take_stats()
+        finally:
+            set_fragment_memo(0)
+
+        self.assertEqual(first.links, [["/photo.png", 3], ["/archive/", 5], ["/", 6], ["/about/", 6]])
+        self.assertEqual(second.links, [["/archive/", 7], ["/", 8], ["/about/", 8]])
+        self.assertEqual(stats[0], 1)
+
 class TestExtractTitle(unittest.TestCase):
     def test_one_title(self):
         markdown = "# Title"
@@ -250,3 +432,24 @@ class TestExtractTitle(unittest.TestCase):
 
         result = extract_title(markdown)
         self.assertEqual(result, expected)
+
+    def test_title_skips_other_headers(self):
+        markdown = "## Subtitle\n\n```\n# not a title\n```\n\n# Title"
+        expected = "Title"
+
+        result = extract_title(markdown)
+        self.assertEqual(result, expected)
+
+    def test_title_inside_paragraph(self):
+        # A "# " line right after paragraph text is part of the paragraph,
+        # as it renders, so it isn't the title
+        markdown = "Here is some pretext\n# Not a title\n\n# Title"
+        expected = "Title"
+
+        result = extract_title(markdown)
+        self.assertEqual(result, expected)
+        self.assertEqual(markdown_to_document(markdown)[1], expected)
+        self.assertRaises(Exception, extract_title, "Here is some pretext\n# Not a title")
+
+    def test_no_title(self):
+        self.assertRaises(Exception, extract_title, "## Subtitle")
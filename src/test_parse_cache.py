@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from parse_cache import ParseCache
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.directory.name, 1 << 20, "v1")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("# Home"))
+        self.cache.put("# Home", "<div><h1>Home</h1></div>", "Home")
+
+        self.assertEqual(self.cache.get("# Home"), ("<div><h1>Home</h1></div>", "Home", [], None, []))
+        self.assertIsNone(self.cache.get("# Other"))
+
+    def test_untitled_page(self):
+        self.cache.put("text", "<div><p>text</p></div>", None)
+
+        self.assertEqual(self.cache.get("text"), ("<div><p>text</p></div>", None, [], None, []))
+
+    def test_search_terms(self):
+        self.cache.put("# Home page", "<div><h1>Home page</h1></div>", "Home page", terms={"page", "home"})
+
+        self.assertEqual(self.cache.get("# Home page")[3], ["home", "page"])
+
+    def test_links(self):
+        self.cache.put("[home](/)", "<div><p><a href=\"/\">home</a></p></div>", None, links=[["/", 1]])
+
+        self.assertEqual(self.cache.get("[home](/)")[4], [["/", 1]])
+
+    def test_changed_file_is_a_miss(self):
+        image = os.path.join(self.directory.name, "photo.png")
+        with open(image, "wb") as file:
+            file.write(b"one")
+        self.cache.put("![photo](/photo.png)", "<div><img></div>", None, [image])
+
+        self.assertEqual(self.cache.get("![photo](/photo.png)"), ("<div><img></div>", None, [image], None, []))
+
+        with open(image, "wb") as file:
+            file.write(b"three")
+        self.assertIsNone(self.cache.get("![photo](/photo.png)"))
+
+    def test_version_is_part_of_the_key(self):
+        self.cache.put("# Home", "<div><h1>Home</h1></div>", "Home")
+
+        self.assertIsNone(ParseCache(self.directory.name, 1 << 20, "v2").get("# Home"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.put("# Home", "<div><h1>Home</h1></div>", "Home")
+        path = self.cache.entry_path("# Home")
+        with open(path, "w") as file:
+            file.write("{\"html\": ")
+
+        self.assertIsNone(self.cache.get("# Home"))
+        self.assertFalse(os.path.exists(path))
+
+    def test_trim_removes_least_recently_used(self):
+        self.cache.max_bytes = 0
+        for index, markdown in enumerate(["old", "used", "new"]):
+            self.cache.put(markdown, markdown * 100, None)
+            os.utime(self.cache.entry_path(markdown), ns=(index * 10**9, index * 10**9))
+        self.cache.get("old")
+        size = os.path.getsize(self.cache.entry_path("old"))
+        self.cache.max_bytes = size * 2
+
+        self.assertEqual(self.cache.trim(), 1)
+        self.assertIsNone(self.cache.get("used"))
+        self.assertIsNotNone(self.cache.get("old"))
+        self.assertIsNotNone(self.cache.get("new"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import profiler
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.set_enabled(False)
+        profiler.take_events()
+
+    def test_disabled_records_nothing(self):
+        with profiler.span("stage") as span:
+            span.set(size=1)
+
+        self.assertIs(span, profiler.null_span)
+        self.assertEqual(profiler.take_events(), [])
+
+    def test_records_spans_with_args(self):
+        profiler.set_enabled(True)
+        with profiler.span("generate_page", page="index.md") as span:
+            span.set(bytes_in=10)
+
+        events = profiler.take_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], "generate_page")
+        self.assertEqual(events[0][5], {"page": "index.md", "bytes_in": 10})
+        self.assertEqual(profiler.take_events(), [])
+
+    def test_self_time_excludes_nested_spans(self):
+        events = [
+            ("page", 0, 100, 1, 1, {}),
+            ("parse", 10, 30, 1, 1, {}),
+            ("inline", 15, 5, 1, 1, {}),
+            ("write", 50, 20, 1, 1, {}),
+            ("page", 0, 40, 2, 1, {}),
+        ]
+        totals = profiler.stage_totals(events)
+
+        self.assertEqual(totals["page"], (2, 140, 90))
+        self.assertEqual(totals["parse"], (1, 30, 25))
+        self.assertEqual(totals["inline"], (1, 5, 5))
+
+    def test_report_lists_slowest_pages(self):
+        events = [
+            ("generate_page", 0, 2000000, 1, 1, {"page": "fast.md", "bytes_in": 1, "bytes_out": 2}),
+            ("generate_page", 0, 9000000, 2, 1, {"page": "slow.md", "bytes_in": 3, "bytes_out": 4}),
+        ]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            profiler.print_report(events, 1)
+
+        self.assertIn("Pages: 2, 4 bytes in, 6 bytes out", output.getvalue())
+        self.assertIn("slow.md", output.getvalue())
+        self.assertNotIn("fast.md", output.getvalue())
+
+    def test_write_trace(self):
+        events = [("parse", 5000, 2000, 1, 7, {"page": "index.md"})]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache", "trace.json")
+            profiler.write_trace(path, events)
+            with open(path) as file:
+                trace = json.load(file)
+
+        self.assertEqual(trace["traceEvents"], [
+            {"name": "parse", "ph": "X", "ts": 0, "dur": 2, "pid": 1, "tid": 7, "args": {"page": "index.md"}},
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+from htmlnode import ParentNode, LeafNode
+from search import text_terms, node_terms, SearchIndex
+
+class TestTerms(unittest.TestCase):
+    def test_text_terms(self):
+        self.assertEqual(text_terms("The Quick brown fox, and the lazy dog's 42 bones"), {"quick", "brown", "fox", "lazy", "dog", "42", "bones"})
+
+    def test_node_terms(self):
+        node = ParentNode("p", [
+            LeafNode("Read the "),
+            LeafNode("docs", "a", {"href": "https://example.com/manual"}),
+            LeafNode("", "img", {"src": "/cat.png", "alt": "Sleeping cat"}),
+        ])
+
+        self.assertEqual(node_terms(node), {"read", "docs", "sleeping", "cat"})
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "search")
+        self.index = SearchIndex(os.path.join(self.directory.name, "search.json"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.output, name)) as file:
+            return json.load(file)
+
+    def test_writes_shards(self):
+        self.index.update("index.md", "/", "Home", {"welcome", "home"})
+        self.index.update("about.md", "/about/", "About", {"about", "home"})
+        self.index.write(self.output)
+
+        self.assertEqual(self.read("pages.json"), {"pages": [["/", "Home"], ["/about/", "About"]], "shards": ["ab", "ho", "we"]})
+        self.assertEqual(self.read("ho.json"), {"home": [0, 1]})
+        self.assertEqual(self.read("we.json"), {"welcome": [0]})
+
+    def test_ids_are_stable(self):
+        self.index.update("a.md", "/a/", "A", {"first"})
+        self.index.update("b.md", "/b/", "B", {"second"})
+        self.index.remove("a.md")
+        self.index.update("b.md", "/b/", "B", {"changed"})
+        self.index.update("c.md", "/c/", "C", {"third"})
+
+        self.assertEqual(self.index.pages["b.md"]["id"], 1)
+        self.assertEqual(self.index.pages["c.md"]["id"], 0)
+
+    def test_unchanged_shards_are_kept(self):
+        self.index.update("a.md", "/a/", "A", {"alpha", "beta"})
+        self.index.write(self.output)
+        alpha = os.path.join(self.output, "al.json")
+        os.utime(alpha, ns=(10**9, 10**9))
+
+        self.index.update("a.md", "/a/", "A", {"alpha", "gamma"})
+        self.index.write(self.output)
+
+        self.assertEqual(os.stat(alpha).st_mtime_ns, 10**9)
+        self.assertFalse(os.path.exists(os.path.join(self.output, "be.json")))
+        self.assertEqual(self.read("ga.json"), {"gamma": [0]})
+
+    def test_save_and_load(self):
+        self.index.update("a.md", "/a/", "A", {"alpha"})
+        self.index.save()
+        loaded = SearchIndex(self.index.path)
+        loaded.load()
+
+        self.assertEqual(loaded.pages, self.index.pages)
+
+if __name__ == "__main__":
+    unittest.main()
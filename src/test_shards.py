@@ -0,0 +1,85 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from shards import parse_shard, assign_shards, merge_manifest, merge_outputs
+from manifest import BuildManifest
+
+class TestAssignShards(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ["0/4", "5/4", "2", "a/b", "1/0"]:
+            self.assertRaises(Exception, parse_shard, text)
+
+    def test_balanced_by_size(self):
+        sizes = {"big.md": 900, "a.md": 300, "b.md": 300, "c.md": 300, "d.md": 100}
+        shards = assign_shards(sizes, 2)
+
+        self.assertEqual(shards, {"big.md": 1, "a.md": 2, "b.md": 2, "c.md": 2, "d.md": 1})
+        self.assertEqual(assign_shards(dict(reversed(list(sizes.items()))), 2), shards)
+
+    def test_more_shards_than_pages(self):
+        self.assertEqual(assign_shards({"a.md": 1}, 3), {"a.md": 1})
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.directory.name, "public")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def shard_manifest(self, index, source, route):
+        manifest = BuildManifest(os.path.join(self.directory.name, str(index), "manifest.json"), "test")
+        output = os.path.join(self.directory.name, str(index), "public", route, "index.html")
+        manifest.record(source, "a", "template.html", "b", os.path.normpath(output))
+        manifest.assets[os.path.join(self.directory.name, str(index), "public", "index.css")] = "static/index.css"
+        return manifest
+
+    def test_merge_manifest(self):
+        manifest = BuildManifest(os.path.join(self.directory.name, "manifest.json"), "test")
+        routes = {}
+        for index, source, route in [(1, "content/index.md", ""), (2, "content/about.md", "about")]:
+            merge_manifest(manifest, self.shard_manifest(index, source, route), os.path.join(self.directory.name, str(index), "public"), self.public, routes)
+
+        self.assertEqual(manifest.pages["content/about.md"]["output"], os.path.join(self.public, "about", "index.html"))
+        self.assertEqual(list(manifest.assets), [os.path.join(self.public, "index.css")])
+
+    def test_route_collision(self):
+        manifest = BuildManifest(os.path.join(self.directory.name, "manifest.json"), "test")
+        routes = {}
+        merge_manifest(manifest, self.shard_manifest(1, "content/about.md", "about"), os.path.join(self.directory.name, "1", "public"), self.public, routes)
+
+        with self.assertRaises(Exception) as context:
+            merge_manifest(manifest, self.shard_manifest(2, "content/about/index.md", "about"), os.path.join(self.directory.name, "2", "public"), self.public, routes)
+        self.assertIn("Route collision", str(context.exception))
+
+    def test_merge_outputs(self):
+        first, second = os.path.join(self.directory.name, "1"), os.path.join(self.directory.name, "2")
+        self.write(os.path.join(first, "index.html"), "home")
+        self.write(os.path.join(first, "index.css"), "css")
+        self.write(os.path.join(second, "about", "index.html"), "about")
+        self.write(os.path.join(second, "index.css"), "css")
+        self.write(os.path.join(self.public, "old", "index.html"), "old")
+        self.write(os.path.join(self.public, "search", "pages.json"), "{}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            merge_outputs([first, second], self.public, ["search"])
+
+        self.assertTrue(os.path.exists(os.path.join(self.public, "about", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "search", "pages.json")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "old")))
+
+        self.write(os.path.join(second, "index.css"), "other css")
+        with self.assertRaises(Exception) as context:
+            merge_outputs([first, second], self.public)
+        self.assertIn("Shards disagree on index.css", str(context.exception))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from manifest import BuildManifest
+from sync import (
+    sync_directory,
+    files_match,
+    link_mode_copy,
+    link_mode_hardlink,
+    link_mode_reflink,
+    replace_if_changed
+)
+
+class TestSyncDirectory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.directory.name, "static")
+        self.public = os.path.join(self.directory.name, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.manifest = BuildManifest(os.path.join(self.directory.name, "manifest.json"), "test")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.public, *parts)) as file:
+            return file.read()
+
+    def sync(self, checksum=False, link_mode=link_mode_copy):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sync_directory(self.static, self.public, self.manifest, checksum, link_mode)
+        return output.getvalue()
+
+    def test_copies_tree(self):
+        self.sync()
+
+        self.assertEqual(self.read("index.css"), "body {}")
+        self.assertEqual(self.read("images", "logo.png"), "png")
+
+    def test_unchanged_files_are_not_copied(self):
+        self.sync()
+        log = self.sync()
+
+        self.assertNotIn("Copying file", log)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        log = self.sync()
+
+        self.assertIn("index.css", log)
+        self.assertNotIn("logo.png", log)
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_checksum_detects_same_size_change(self):
+        self.sync()
+        path = os.path.join(self.static, "index.css")
+        stat = os.stat(path)
+        self.write(path, "body []")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertTrue(files_match(path, os.path.join(self.public, "index.css")))
+        self.assertFalse(files_match(path, os.path.join(self.public, "index.css"), True))
+
+    def test_orphans_are_removed(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "logo.png"))
+        self.sync()
+
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+    def test_generated_files_are_kept(self):
+        self.sync()
+        self.write(os.path.join(self.public, "index.html"), "<p>page</p>")
+        self.sync()
+
+        self.assertEqual(self.read("index.html"), "<p>page</p>")
+
+    def test_hardlink_mode(self):
+        self.sync(link_mode=link_mode_hardlink)
+
+        source = os.stat(os.path.join(self.static, "index.css"))
+        destination = os.stat(os.path.join(self.public, "index.css"))
+        self.assertEqual(source.st_ino, destination.st_ino)
+
+    def test_reflink_mode_falls_back_to_copy(self):
+        self.sync(link_mode=link_mode_reflink)
+
+        self.assertEqual(self.read("images", "logo.png"), "png")
+
+    def test_invalid_link_mode(self):
+        self.assertRaises(ValueError, sync_directory, self.static, self.public, None, False, "symlink")
+
+class TestReplaceIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.destination = os.path.join(self.directory.name, "index.html")
+        self.temporary = f"{self.destination}.tmp"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def test_new_file_is_moved_into_place(self):
+        self.write(self.temporary, "<p>new</p>")
+
+        self.assertTrue(replace_if_changed(self.temporary, self.destination))
+        self.assertFalse(os.path.exists(self.temporary))
+
+    def test_identical_file_keeps_mtime(self):
+        self.write(self.destination, "<p>same</p>")
+        os.utime(self.destination, ns=(1000000000, 1000000000))
+        self.write(self.temporary, "<p>same</p>")
+
+        self.assertFalse(replace_if_changed(self.temporary, self.destination))
+        self.assertFalse(os.path.exists(self.temporary))
+        self.assertEqual(os.stat(self.destination).st_mtime_ns, 1000000000)
+
+    def test_changed_file_replaces(self):
+        self.write(self.destination, "<p>old</p>")
+        self.write(self.temporary, "<p>new</p>")
+
+        self.assertTrue(replace_if_changed(self.temporary, self.destination))
+        with open(self.destination) as file:
+            self.assertEqual(file.read(), "<p>new</p>")
+
+if __name__ == "__main__":
+    unittest.main()
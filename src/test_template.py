@@ -0,0 +1,159 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from template import Template, load_template, layout_path, expand_includes, expand_line_includes, line_origin
+from htmlnode import ParentNode, LeafNode
+
+class TestTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{Content}}</main>")
+
+        self.assertListEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+        self.assertListEqual(template.slots, ["title", "content"])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        values = {"title": "Home", "content": ParentNode("p", [LeafNode("Hi")])}
+
+        self.assertEqual(template.render(values), "<title>Home</title><p>Hi</p>")
+
+    def test_write_matches_render(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}<footer>{{ Author }}</footer>")
+        values = {"title": "Home", "content": ParentNode("p", [LeafNode("Hi")]), "author": "Bilbo"}
+        stream = io.StringIO()
+        template.write(stream, values)
+
+        self.assertEqual(stream.getvalue(), template.render(values))
+
+    def test_write_streamed_value(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}")
+        values = {"title": "Home", "content": iter(["<div>", ParentNode("p", [LeafNode("Hi")]), "</div>"])}
+
+        self.assertEqual(template.render(values), "<h1>Home</h1><div><p>Hi</p></div>")
+
+    def test_missing_slot_is_empty(self):
+        template = Template("<p>{{ Date }}</p>")
+
+        self.assertEqual(template.render({}), "<p></p>")
+
+    def test_repeated_slot(self):
+        template = Template("{{ Title }} | {{ Title }}")
+
+        self.assertEqual(template.render({"title": "Home"}), "Home | Home")
+
+    def test_no_slots(self):
+        template = Template("<p>static</p>")
+
+        self.assertEqual(template.render({"title": "Home"}), "<p>static</p>")
+
+class TestLoadTemplate(unittest.TestCase):
+    def test_cached_until_modified(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "template.html")
+            with open(path, "w") as file:
+                file.write("{{ Title }}")
+
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as file:
+                file.write("<h1>{{ Title }}</h1>")
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1000000))
+
+            self.assertEqual(load_template(path).render({"title": "Home"}), "<h1>Home</h1>")
+
+    def test_missing_template(self):
+        self.assertRaises(Exception, load_template, "/nonexistent/template.html")
+
+    def test_layout_path(self):
+        self.assertEqual(layout_path("./template.html", "post"), "./layouts/post.html")
+
+    def test_partial_change_reloads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "template.html")
+            partials = os.path.join(directory, "partials")
+            os.mkdir(partials)
+            with open(path, "w") as file:
+                file.write("{{> nav }}{{ Content }}")
+            with open(os.path.join(partials, "nav.html"), "w") as file:
+                file.write("<nav>{{ Title }}</nav>")
+
+            first = load_template(path, partials)
+            self.assertEqual(first.render({"title": "Home", "content": "Hi"}), "<nav>Home</nav>Hi")
+            self.assertEqual(first.dependencies, [os.path.join(partials, "nav.html")])
+            self.assertIs(load_template(path, partials), first)
+
+            with open(os.path.join(partials, "nav.html"), "w") as file:
+                file.write("<nav>Site</nav>")
+            os.utime(os.path.join(partials, "nav.html"), ns=(time.time_ns(), time.time_ns() + 1000000))
+
+            self.assertEqual(load_template(path, partials).render({"content": "Hi"}), "<nav>Site</nav>Hi")
+
+class TestExpandIncludes(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.partials = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.partials, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_no_includes(self):
+        self.assertEqual(expand_includes("# Title", self.partials, ".md"), ("# Title", []))
+
+    def test_nested_includes(self):
+        footer = self.write("footer.md", "Footer {{> legal/notice }}")
+        notice = self.write(os.path.join("legal", "notice.md"), "notice")
+
+        text, dependencies = expand_includes("Body\n\n{{> footer }}\n\n{{>footer.md}}", self.partials, ".md")
+
+        self.assertEqual(text, "Body\n\nFooter notice\n\nFooter notice")
+        self.assertEqual(dependencies, [footer, notice])
+
+    def test_line_includes(self):
+        footer = self.write("footer.md", "Footer\n\n{{> notice }}")
+        notice = self.write("notice.md", "notice")
+        dependencies = []
+
+        lines = list(expand_line_includes(["Body\n", "\n", "{{> footer }}\n"], self.partials, ".md", ("page.md",), dependencies))
+
+        self.assertEqual(lines, ["Body", "", "Footer", "", "notice"])
+        self.assertEqual(dependencies, [footer, notice])
+
+    def test_line_map(self):
+        footer = self.write("footer.md", "Footer\n\n{{> notice }}\nEnd")
+        notice = self.write("notice.md", "notice\n")
+        source = "Body\n\n{{> footer }}\nAfter"
+        line_map = []
+        text, _ = expand_includes(source, self.partials, ".md", ("page.md",), line_map)
+
+        origins = [line_origin(line_map, line) for line in range(1, text.count("\n") + 2)]
+        self.assertEqual(origins, [("page.md", 1), ("page.md", 2), (footer, 1), (footer, 2), (notice, 1), (footer, 3), (footer, 4), ("page.md", 4)])
+
+        # Streamed pages map their lines the same way
+        streamed_map = []
+        list(expand_line_includes(source.splitlines(keepends=True), self.partials, ".md", ("page.md",), [], streamed_map))
+        self.assertEqual([line_origin(streamed_map, line) for line in range(1, 9)], origins)
+
+    def test_include_cycle(self):
+        self.write("a.md", "{{> b }}")
+        self.write("b.md", "{{> a }}")
+
+        with self.assertRaises(Exception) as context:
+            expand_includes("{{> a }}", self.partials, ".md", ("page.md",))
+
+        self.assertIn("Include cycle", str(context.exception))
+
+    def test_missing_partial(self):
+        with self.assertRaises(Exception) as context:
+            expand_includes("{{> missing }}", self.partials, ".md", ("page.md",))
+
+        self.assertIn("included from page.md", str(context.exception))
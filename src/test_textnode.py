@@ -5,6 +5,11 @@ from textnode import (
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
+    text_to_textnodes_split,
+    scan_inline,
+    set_inline_parser,
+    inline_parser_scanner,
+    inline_parser_split,
     text_type_text,
     text_type_bold,
     text_type_italic,
@@ -12,7 +17,7 @@ from textnode import (
     text_type_image,
     text_type_link
 )
-from htmlnode import LeafNode
+from htmlnode import LeafNode, ParentNode
 
 class TestTextNode(unittest.TestCase):
 
@@ -36,6 +41,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text", text_type_bold, "https://www.example.com")
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", text_type_bold)
+
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(repr(node), "TextNode(This is a text node, bold, None)")
+
     def test_text_to_html_node(self):
         text_node = TextNode("hello world", text_type_text)
         expected = LeafNode("hello world") 
@@ -276,5 +287,101 @@ class TestTextToTextNodes(unittest.TestCase):
         result = text_to_textnodes(text)
         self.assertListEqual(result, expected)
 
+class TestScanInline(unittest.TestCase):
+    def test_matches_split_pipeline(self):
+        texts = [
+            "This is **text** with an *italic* word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+            "This is some text!",
+            "**Bold start** and *italic end*",
+            "Two [links](/one) in [one](/two) line",
+            "An ![image](/a.png)![next to](/b.png) another",
+            "",
+        ]
+        for text in texts:
+            self.assertListEqual(scan_inline(text), text_to_textnodes_split(text))
+
+    def test_emphasis_around_links(self):
+        # The split pipeline is kept as it was for comparison, so only the
+        # scanner keeps links inside bold and italic text
+        one = TextNode("one", text_type_link, "/1")
+        two = TextNode("two", text_type_link, "/2")
+        self.assertListEqual(scan_inline("Before **[one](/1)** between *[two](/2)* after"), [
+            TextNode("Before ", text_type_text),
+            TextNode("one", text_type_bold, None, [one]),
+            TextNode(" between ", text_type_text),
+            TextNode("two", text_type_italic, None, [two]),
+            TextNode(" after", text_type_text),
+        ])
+        self.assertListEqual(scan_inline("**a ![image](/i.png) and [link](/l)**"), [
+            TextNode("a image and link", text_type_bold, None, [
+                TextNode("a ", text_type_text),
+                TextNode("image", text_type_image, "/i.png"),
+                TextNode(" and ", text_type_text),
+                TextNode("link", text_type_link, "/l"),
+            ]),
+        ])
+
+    def test_link_inside_bold_to_html_node(self):
+        node = scan_inline("**[Read more](/x)**")[0]
+        expected = ParentNode("b", [LeafNode("Read more", "a", {"href": "/x"})])
+
+        self.assertEqual(node.to_html_node(), expected)
+        self.assertEqual(scan_inline("*see [docs](/d)*")[0].to_html_node().to_html(), '<i>see <a href="/d">docs</a></i>')
+
+    def test_bold_without_links_has_no_children(self):
+        self.assertListEqual(scan_inline("**a [b] c**"), [TextNode("a [b] c", text_type_bold)])
+
+    def test_missing_closing_delimiter(self):
+        self.assertRaises(Exception, scan_inline, "This text is **bold")
+
+    def test_unclosed_link_is_text(self):
+        expected = [
+            TextNode("A [broken link](/nowhere and ", text_type_text),
+            TextNode("bold", text_type_bold),
+        ]
+
+        self.assertListEqual(scan_inline("A [broken link](/nowhere and **bold**"), expected)
+
+    def test_code_is_literal(self):
+        expected = [
+            TextNode("a * b", text_type_code),
+            TextNode(" is multiplication", text_type_text),
+        ]
+
+        self.assertListEqual(scan_inline("`a * b` is multiplication"), expected)
+
+    def test_bold_inside_link(self):
+        children = [
+            TextNode("read ", text_type_text),
+            TextNode("this", text_type_bold),
+        ]
+        expected = [
+            TextNode("Please ", text_type_text),
+            TextNode("read this", text_type_link, "/post", children),
+        ]
+
+        self.assertListEqual(scan_inline("Please [read **this**](/post)"), expected)
+
+    def test_nested_link_to_html_node(self):
+        node = scan_inline("[*see* `code`](/docs)")[0]
+        expected = ParentNode("a", [
+            LeafNode("see", "i"),
+            LeafNode(" "),
+            LeafNode("code", "code"),
+        ], {"href": "/docs"})
+
+        self.assertEqual(node.to_html_node(), expected)
+
+    def test_select_split_pipeline(self):
+        text = "A [link](/a) at the end"
+        try:
+            set_inline_parser(inline_parser_split)
+            self.assertListEqual(text_to_textnodes(text), text_to_textnodes_split(text))
+        finally:
+            set_inline_parser(inline_parser_scanner)
+
+    def test_invalid_inline_parser(self):
+        self.assertRaises(ValueError, set_inline_parser, "regex")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from watcher import PollingWatcher, InotifyWatcher, watch
+
+class WatcherTests:
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.directory.name, "content")
+        self.template = os.path.join(self.directory.name, "template.html")
+        os.mkdir(self.content)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(self.template, "{{ Content }}")
+        self.watcher = self.create_watcher([self.content, self.template])
+
+    def tearDown(self):
+        self.watcher.close()
+        self.directory.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read_changes(self):
+        changes = set()
+        for _ in range(10):
+            changes.update(self.watcher.read_changes(0.05))
+            if len(changes) > 0:
+                break
+        return changes
+
+    def test_modified_file(self):
+        path = os.path.join(self.content, "index.md")
+        self.write(path, "# Changed")
+
+        self.assertIn(path, self.read_changes())
+
+    def test_new_file_in_new_directory(self):
+        os.mkdir(os.path.join(self.content, "blog"))
+        path = os.path.join(self.content, "blog", "post.md")
+        self.write(path, "# Post")
+
+        self.assertIn(path, self.read_changes())
+
+    def test_deleted_file(self):
+        path = os.path.join(self.content, "index.md")
+        os.remove(path)
+
+        self.assertIn(path, self.read_changes())
+
+    def test_moved_directory(self):
+        os.mkdir(os.path.join(self.content, "blog"))
+        old_path = os.path.join(self.content, "blog", "post.md")
+        self.write(old_path, "# Post")
+        self.read_changes()
+        os.rename(os.path.join(self.content, "blog"), os.path.join(self.content, "news"))
+
+        # Either the old page or the whole tree is reported, so the old
+        # output is removed
+        changes = self.read_changes()
+        self.assertTrue(old_path in changes or self.content in changes, changes)
+
+        # Changes inside the moved directory are reported at its new path
+        new_path = os.path.join(self.content, "news", "post.md")
+        self.write(new_path, "# Changed")
+        changes = self.read_changes()
+        self.assertIn(new_path, changes)
+        self.assertNotIn(old_path, changes)
+
+    def test_root_created_after_start(self):
+        partials = os.path.join(self.directory.name, "partials")
+        self.watcher.close()
+        self.watcher = self.create_watcher([self.content, self.template, partials])
+        os.mkdir(partials)
+        self.read_changes()
+
+        path = os.path.join(partials, "note.md")
+        self.write(path, "A note")
+        self.assertIn(path, self.read_changes())
+
+    def test_watched_file(self):
+        self.write(self.template, "<p>{{ Content }}</p>")
+
+        self.assertIn(self.template, self.read_changes())
+
+    def test_sibling_of_watched_file_is_ignored(self):
+        self.write(os.path.join(self.directory.name, "notes.txt"), "ignored")
+
+        self.assertEqual(self.read_changes(), set())
+
+    def test_no_changes_times_out(self):
+        self.assertEqual(self.watcher.read_changes(0.05), set())
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def create_watcher(self, paths):
+        return PollingWatcher(paths, 0.01)
+
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def create_watcher(self, paths):
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            self.skipTest("inotify is not available")
+
+class TestWatch(unittest.TestCase):
+    def test_burst_is_debounced(self):
+        with tempfile.TemporaryDirectory() as directory:
+            watcher = PollingWatcher([directory], 0.01)
+            for name in ["a.md", "b.md", "c.md"]:
+                with open(os.path.join(directory, name), "w") as file:
+                    file.write(name)
+
+            changes = next(watch([directory], 0.05, watcher))
+
+            self.assertEqual(len(changes), 3)
+
+if __name__ == "__main__":
+    unittest.main()
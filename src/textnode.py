@@ -1,4 +1,6 @@
-from htmlnode import LeafNode
+import re
+import profiler
+from htmlnode import LeafNode, ParentNode
 from extraction import extract_markdown_images, extract_markdown_links
 
 text_type_text = "text"
@@ -8,17 +10,35 @@ text_type_code = "code"
 text_type_link = "link"
 text_type_image = "image"
 
+inline_parser_scanner = "scanner"
+inline_parser_split = "split"
+inline_parsers = [inline_parser_scanner, inline_parser_split]
+inline_parser = inline_parser_scanner
+
+inline_token_pattern = re.compile(r"\*\*|\*|`|!\[|\[")
+delimiter_types = {
+    "**": text_type_bold,
+    "*": text_type_italic,
+    "`": text_type_code,
+}
+
 class TextNode:
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(self, text, text_type, url=None, children=None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        # Formatted text nested inside a link, e.g. [**bold**](url), or links
+        # and images nested inside bold or italic text, e.g. **[text](url)**
+        self.children = children
 
     def __eq__(self, other):
         return (
             self.text == other.text and
             self.text_type == other.text_type and
-            self.url == other.url
+            self.url == other.url and
+            self.children == other.children
         )
     
     def  __repr__(self):
@@ -28,12 +48,18 @@ class TextNode:
         if self.text_type == text_type_text:
             return LeafNode(self.text)
         if self.text_type == text_type_bold:
+            if self.children is not None:
+                return ParentNode("b", [child.to_html_node() for child in self.children])
             return LeafNode(self.text, "b")
         if self.text_type == text_type_italic:
+            if self.children is not None:
+                return ParentNode("i", [child.to_html_node() for child in self.children])
             return LeafNode(self.text, "i")
         if self.text_type == text_type_code:
             return LeafNode(self.text, "code")
         if self.text_type == "link":
+            if self.children is not None:
+                return ParentNode("a", [child.to_html_node() for child in self.children], {"href": self.url})
             return LeafNode(self.text, "a", {"href": self.url})
         if self.text_type == "image":
             return LeafNode("", "img", {"src": self.url, "alt": self.text})
@@ -100,7 +126,103 @@ def split_nodes_link(old_nodes):
             new_nodes.append(TextNode(text, text_type_text))
     return new_nodes
 
+def set_inline_parser(name):
+    global inline_parser
+    if name not in inline_parsers:
+        raise ValueError(f"Invalid inline parser: {name}")
+    inline_parser = name
+
 def text_to_textnodes(text):
+    with profiler.span("text_to_textnodes"):
+        if inline_parser == inline_parser_split:
+            return text_to_textnodes_split(text)
+        return scan_inline(text)
+
+def scan_inline(text, allow_links=True, allow_delimiters=True):
+    # Single left-to-right pass: jump to the next character that can start
+    # markup, then find its closer with str.find. Every position is passed
+    # over a bounded number of times, so the scan is linear in len(text)
+    nodes = []
+    plain_start = 0
+    position = 0
+    # Position of the next "](" and the ")" after it, reused while the scan is
+    # still before them so runs of "[" don't rescan the rest of the text
+    label_end = None
+    url_end = -1
+
+    while True:
+        match = inline_token_pattern.search(text, position)
+        if match is None:
+            break
+
+        token = match.group()
+        start = match.start()
+        end = match.end()
+
+        if token in delimiter_types and not allow_delimiters:
+            position = end
+            continue
+
+        if token in delimiter_types:
+            closing = text.find(token, end)
+            if closing == -1:
+                raise Exception("Invalid markdown: missing closing delimiter")
+            if start > plain_start:
+                nodes.append(TextNode(text[plain_start:start], text_type_text))
+            if closing > end:
+                nodes.append(delimited_node(text[end:closing], delimiter_types[token]))
+            position = plain_start = closing + len(token)
+            continue
+
+        if token == "[" and not allow_links:
+            position = end
+            continue
+
+        if label_end is None or (label_end != -1 and label_end < end):
+            label_end = text.find("](", end)
+            if label_end != -1:
+                url_end = text.find(")", label_end + 2)
+        if label_end == -1 or url_end == -1:
+            position = end
+            continue
+
+        label = text[end:label_end]
+        url = text[label_end + 2:url_end]
+        if "\n" in label or "\n" in url:
+            position = end
+            continue
+
+        if start > plain_start:
+            nodes.append(TextNode(text[plain_start:start], text_type_text))
+        if token == "![":
+            nodes.append(TextNode(label, text_type_image, url))
+        else:
+            nodes.append(link_node(label, url))
+        position = plain_start = url_end + 1
+
+    if plain_start < len(text):
+        nodes.append(TextNode(text[plain_start:], text_type_text))
+    return nodes
+
+def delimited_node(content, text_type):
+    # Links and images inside bold or italic text are kept as links, the
+    # same way link labels keep their formatting. Code stays literal
+    if text_type == text_type_code or "[" not in content:
+        return TextNode(content, text_type)
+    children = scan_inline(content, True, False)
+    if len(children) == 1 and children[0].text_type == text_type_text:
+        return TextNode(content, text_type)
+    text = "".join([child.text for child in children])
+    return TextNode(text, text_type, None, children)
+
+def link_node(label, url):
+    children = scan_inline(label, False)
+    if len(children) == 0 or (len(children) == 1 and children[0].text_type == text_type_text):
+        return TextNode(label, text_type_link, url)
+    text = "".join([child.text for child in children])
+    return TextNode(text, text_type_link, url, children)
+
+def text_to_textnodes_split(text):
     result = TextNode(text, text_type_text)
     result = split_nodes_delimiter([result], "**", text_type_bold)
     result = split_nodes_delimiter(result, "*", text_type_italic)
@@ -0,0 +1,236 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+in_modify = 0x00000002
+in_attrib = 0x00000004
+in_close_write = 0x00000008
+in_moved_from = 0x00000040
+in_moved_to = 0x00000080
+in_create = 0x00000100
+in_delete = 0x00000200
+in_delete_self = 0x00000400
+in_move_self = 0x00000800
+in_q_overflow = 0x00004000
+in_ignored = 0x00008000
+in_isdir = 0x40000000
+in_cloexec = 0o2000000
+in_nonblock = 0o4000
+
+watch_mask = (
+    in_modify | in_attrib | in_close_write | in_moved_from | in_moved_to |
+    in_create | in_delete | in_delete_self | in_move_self
+)
+event_header = struct.Struct("iIII")
+
+class PollingWatcher:
+    def __init__(self, paths, interval=0.25):
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                self.scan_directory(path, snapshot)
+            elif os.path.exists(path):
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def scan_directory(self, path, snapshot):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.scan_directory(entry.path, snapshot)
+                    continue
+                stat = entry.stat()
+                snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+    def read_changes(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = max(0, min(delay, deadline - time.monotonic()))
+            time.sleep(delay)
+
+            snapshot = self.scan()
+            changes = set()
+            for path, signature in snapshot.items():
+                if self.snapshot.get(path) != signature:
+                    changes.add(path)
+            for path in self.snapshot:
+                if path not in snapshot:
+                    changes.add(path)
+            self.snapshot = snapshot
+
+            if len(changes) > 0 or (deadline is not None and time.monotonic() >= deadline):
+                return changes
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    def __init__(self, paths):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self.fd = self.libc.inotify_init1(in_cloexec | in_nonblock)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.paths = paths
+        self.directories = {}
+        # Files are watched through their parent directory so editors that
+        # save by renaming a new file into place are still seen
+        self.files = {}
+        for path in paths:
+            if os.path.isdir(path):
+                self.add_directory(path)
+            else:
+                directory = os.path.dirname(path) or "."
+                self.files.setdefault(directory, set()).add(os.path.basename(path))
+                self.add_watch(directory)
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), watch_mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+        self.directories[wd] = directory
+
+    def add_directory(self, directory):
+        self.add_watch(directory)
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.add_directory(entry.path)
+
+    def remove_directory(self, directory):
+        # A directory moved away keeps its watches under its old path
+        for wd, path in list(self.directories.items()):
+            if path == directory or path.startswith(directory + os.sep):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.directories[wd]
+
+    def files_in(self, directory):
+        files = set()
+        for root, _, names in os.walk(directory):
+            for name in names:
+                files.add(os.path.join(root, name))
+        return files
+
+    def read_changes(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if len(readable) == 0:
+            return set()
+
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = event_header.unpack_from(data, offset)
+            offset += event_header.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & in_q_overflow:
+                # Events were dropped, so report every watched path
+                changes.update(self.paths)
+                continue
+
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            if mask & in_ignored:
+                del self.directories[wd]
+                continue
+            if name == "":
+                continue
+
+            in_tree = self.is_watched_tree(directory)
+            if not in_tree and name not in self.files.get(directory, ()):
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & in_isdir:
+                root = self.root_named(directory, name)
+                if root is not None and mask & (in_create | in_moved_to) and os.path.isdir(root):
+                    # A watched root that didn't exist when watching started
+                    # is watched through its parent until it appears
+                    self.add_directory(root)
+                    changes.add(root)
+                    changes.update(self.files_in(root))
+                elif root is not None and mask & (in_moved_from | in_delete):
+                    self.remove_directory(root)
+                    changes.add(root)
+                elif in_tree and mask & (in_create | in_moved_to) and os.path.isdir(path):
+                    self.add_directory(path)
+                    changes.update(self.files_in(path))
+                elif in_tree and mask & (in_moved_from | in_delete):
+                    # The files that were in it are no longer known, so the
+                    # whole tree is reported for a full pass
+                    self.remove_directory(path)
+                    changes.add(self.watched_root(directory))
+                continue
+            changes.add(path)
+
+        return changes
+
+    def root_named(self, directory, name):
+        # The watched root that is the entry name of directory, if any
+        for path in self.paths:
+            if (os.path.dirname(path) or ".") == directory and os.path.basename(path) == name:
+                return path
+        return None
+
+    def watched_root(self, directory):
+        for path in self.paths:
+            if directory == path or directory.startswith(path + os.sep):
+                return path
+        return None
+
+    def is_watched_tree(self, directory):
+        root = self.watched_root(directory)
+        return root is not None and os.path.isdir(root)
+
+    def close(self):
+        os.close(self.fd)
+
+def create_watcher(paths):
+    try:
+        return InotifyWatcher(paths)
+    except (OSError, AttributeError):
+        print("inotify is not available, polling for changes")
+        return PollingWatcher(paths)
+
+def watch(paths, debounce=0.1, watcher=None):
+    if watcher is None:
+        watcher = create_watcher(paths)
+
+    try:
+        while True:
+            changes = watcher.read_changes()
+            # Editors often save in several steps; wait for a quiet period so a
+            # burst of events turns into a single rebuild
+            while True:
+                more = watcher.read_changes(debounce)
+                if len(more) == 0:
+                    break
+                changes.update(more)
+            if len(changes) > 0:
+                yield changes
+    finally:
+        watcher.close()